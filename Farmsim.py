@@ -1,16 +1,31 @@
+import argparse
+import numpy as np
+import os
 import pygame
-import random
 import sys
 
-# Initialize Pygame
-pygame.init()
+from chunked_world import CHUNK_SIZE, WORLD_FILE, ChunkedWorld, WorldSaver, load_world, save_world
+from farm_core import FarmSimulation, GRID_SIZE, FPS
+from farm_grid import CROPS, CROP_BY_CODE, MERCHANT, SHED
+from frame_profiler import FrameProfiler
+from replay import InputRecorder
+from savegame import Autosaver, save_game, load_game
 
 # Constants
-GRID_SIZE = 20
 CELL_SIZE = 40
-WINDOW_WIDTH = GRID_SIZE * CELL_SIZE + 300  # Extra space for UI
-WINDOW_HEIGHT = GRID_SIZE * CELL_SIZE + 100
-FPS = 60
+VIEW_SIZE = GRID_SIZE  # cells shown on screen in each direction
+WINDOW_WIDTH = VIEW_SIZE * CELL_SIZE + 300  # Extra space for UI
+WINDOW_HEIGHT = VIEW_SIZE * CELL_SIZE + 100
+SAVE_PATH = "farm.sav"
+AUTOSAVE_PATH = "autosave.sav"
+
+# Farm size in cells. Farms bigger than one chunk are kept as a chunked
+# world in WORLD_DIR, with only the recently used chunks in memory.
+WORLD_SIZE = GRID_SIZE
+WORLD_DIR = "world"
+
+# Frames between refreshes of the frame time overlay (F3)
+PROFILER_REFRESH = 30
 
 # Colors
 BLACK = (0, 0, 0)
@@ -27,291 +42,400 @@ BROWN = (139, 69, 19)
 BLUE = (0, 100, 255)
 RED = (255, 50, 50)
 
-class FarmGame:
+# Movement keys by name, in the order they win when several are held
+MOVE_KEYS = [('w', pygame.K_w), ('s', pygame.K_s), ('a', pygame.K_a), ('d', pygame.K_d)]
+
+class GridRenderer:
+    # Keeps the visible part of the field on its own surface and only
+    # redraws cells whose type or growth changed since the last frame.
+    # Cells are read with grid.region(), so on a chunked world only the
+    # chunks on screen are touched. Cell images are cached by
+    # (type, growth) and text glyphs by (text, color, font).
+    def __init__(self, grid, cell_color, font, symbol_font, cols, rows):
+        self.grid = grid
+        self.cell_color = cell_color
+        self.font = font
+        self.symbol_font = symbol_font
+        self.cols = cols
+        self.rows = rows
+        self.surface = pygame.Surface((cols * CELL_SIZE, rows * CELL_SIZE))
+        self.cells_drawn = 0  # cells redrawn by the last update
+        self._cells = {}
+        self._glyphs = {}
+        self._drawn_origin = None
+        self._drawn_types = None
+        self._drawn_growth = None
+
+    def glyph(self, text, color, font):
+        key = (text, color, font)
+        surface = self._glyphs.get(key)
+        if surface is None:
+            surface = self._glyphs[key] = font.render(text, True, color)
+        return surface
+
+    def cell_surface(self, type_code, growth):
+        key = (type_code, growth)
+        surface = self._cells.get(key)
+        if surface is not None:
+            return surface
+
+        surface = pygame.Surface((CELL_SIZE, CELL_SIZE))
+        rect = surface.get_rect()
+        pygame.draw.rect(surface, self.cell_color(type_code, growth), rect)
+        pygame.draw.rect(surface, BLACK, rect, 1)
+
+        # Growth percentage for growing crops, symbols for mature crops,
+        # merchant and shed
+        crop = CROP_BY_CODE[type_code]
+        label = None
+        if crop is not None and growth < 100:
+            label = self.glyph(f"{growth}%", WHITE, self.font)
+        elif crop is not None:
+            label = self.glyph(crop.symbol, WHITE, self.font)
+        elif type_code == MERCHANT:
+            label = self.glyph("M", WHITE, self.symbol_font)
+        elif type_code == SHED:
+            label = self.glyph("S", WHITE, self.symbol_font)
+        if label is not None:
+            surface.blit(label, label.get_rect(center=rect.center))
+
+        self._cells[key] = surface
+        return surface
+
+    def invalidate(self):
+        # Force a full redraw on the next update
+        self._drawn_types = None
+
+    def scroll(self, origin):
+        # Move what is already drawn along with the view. Cells that scroll
+        # into view get an impossible type so the next diff redraws them.
+        dx = origin[0] - self._drawn_origin[0]
+        dy = origin[1] - self._drawn_origin[1]
+        self._drawn_origin = origin
+        if abs(dx) >= self.cols or abs(dy) >= self.rows:
+            self.invalidate()
+            return
+        self.surface.scroll(-dx * CELL_SIZE, -dy * CELL_SIZE)
+        for name in ('_drawn_types', '_drawn_growth'):
+            plane = getattr(self, name)
+            shifted = np.full_like(plane, 255)
+            shifted[max(-dy, 0):self.rows - max(dy, 0), max(-dx, 0):self.cols - max(dx, 0)] = \
+                plane[max(dy, 0):self.rows - max(-dy, 0), max(dx, 0):self.cols - max(-dx, 0)]
+            setattr(self, name, shifted)
+
+    def update(self, origin=(0, 0)):
+        # origin is the world cell shown in the top-left corner
+        types, growth = self.grid.region(origin[0], origin[1], self.cols, self.rows)
+        if self._drawn_types is not None and origin != self._drawn_origin:
+            self.scroll(origin)
+
+        if self._drawn_types is None:
+            ys, xs = np.indices(types.shape)
+            ys, xs = ys.ravel(), xs.ravel()
+            self._drawn_origin = origin
+            self._drawn_types = types.copy()
+            self._drawn_growth = growth.copy()
+        else:
+            changed = (types != self._drawn_types) | (growth != self._drawn_growth)
+            ys, xs = np.nonzero(changed)
+            self._drawn_types[ys, xs] = types[ys, xs]
+            self._drawn_growth[ys, xs] = growth[ys, xs]
+
+        for x, y, type_code, cell_growth in zip(xs.tolist(), ys.tolist(),
+                                                types[ys, xs].tolist(), growth[ys, xs].tolist()):
+            self.surface.blit(self.cell_surface(type_code, cell_growth), (x * CELL_SIZE, y * CELL_SIZE))
+        self.cells_drawn = len(xs)
+
+    def draw(self, screen, origin=(0, 0)):
+        self.update(origin)
+        screen.blit(self.surface, (0, 0))
+
+class TextCache:
+    # Keeps the last surface rendered for each named text slot and only
+    # renders again when that slot's text or color changes
     def __init__(self):
+        self._slots = {}
+
+    def render(self, slot, font, text, color):
+        cached = self._slots.get(slot)
+        if cached is not None and cached[0] == text and cached[1] == color:
+            return cached[2]
+        surface = font.render(text, True, color)
+        self._slots[slot] = (text, color, surface)
+        return surface
+
+class FarmGame(FarmSimulation):
+    # resume=False starts a new farm instead of loading the autosave, and
+    # saves=False leaves every save file alone (no autosave, F5 and F9 do
+    # nothing), e.g. when replaying a recording
+    def __init__(self, seed=None, resume=True, saves=True):
+        if WORLD_SIZE > CHUNK_SIZE:
+            super().__init__(WORLD_SIZE, grid=ChunkedWorld(WORLD_DIR, WORLD_SIZE), seed=seed)
+        else:
+            super().__init__(WORLD_SIZE, seed=seed)
+        # The window and fonts are only set up once something is drawn (see
+        # open_display()), so a game stepped without drawing, e.g. a replay
+        # check, starts no pygame subsystem at all
+        self.screen = None
+        self.font = None
+        self.title_font = None
+        self.clock = pygame.time.Clock()
+        self.invalidate_ui_cache()
+
+        # Where each frame's time goes; F3 shows it over the field
+        self.profiler = FrameProfiler()
+        self.show_profiler = False
+        self._profiler_overlay = None
+        self._profiler_font = None
+
+        # Screen position where a right-button drag started
+        self.drag_start = None
+
+        # Pick up where the last session left off, with the crops and
+        # helpers caught up on the time the game was closed. Chunked worlds
+        # save into their own directory instead of a single file.
+        self.saves = saves
+        self.autosaver = None
+        if isinstance(self.grid, ChunkedWorld):
+            if saves:
+                self.autosaver = WorldSaver()
+            if resume and os.path.exists(os.path.join(WORLD_DIR, WORLD_FILE)):
+                load_world(self, WORLD_DIR, catch_up=True)
+        else:
+            if saves:
+                self.autosaver = Autosaver(AUTOSAVE_PATH)
+            if resume and os.path.exists(AUTOSAVE_PATH):
+                load_game(self, AUTOSAVE_PATH, catch_up=True)
+        self.reset_view()
+
+    def open_display(self):
+        # Open the window and load the fonts, the first time they are
+        # needed. Only the display and font modules are started: the game
+        # plays no sound, so the mixer and the rest of pygame.init() are
+        # never paid for.
+        if self.screen is not None:
+            return
+        pygame.display.init()
+        pygame.font.init()
         self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
         pygame.display.set_caption("Farm Simulator")
-        self.clock = pygame.time.Clock()
         self.font = pygame.font.Font(None, 24)
         self.title_font = pygame.font.Font(None, 36)
-        
-        # Game state
-        self.player_x = 10
-        self.player_y = 10
-        self.gold = 200
-    
-        self.inventory = {'corn': 0, 'turnips': 0}
-        self.shed_storage = {'corn': 0, 'turnips': 0}
-        self.grid = [[{'type': 'empty', 'growth': 0} for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
-        self.merchant_open = False
-        self.merchant_menu = 'main'  # 'main', 'buy', 'sell'
-        self.growth_timer = 0
-        self.move_timer = 0
-        self.move_delay = 8  # frames between moves when holding key
-        
-        # AI Helper
-        self.has_ai_helper = False
-        self.ai_x = 3
-        self.ai_y = 3
-        self.ai_harvest_timer = 0
-        self.ai_harvest_interval = 120  # frames between AI harvests
-        
-        # Place merchant
-        self.merchant_x = 5
-        self.merchant_y = 5
-        self.grid[self.merchant_y][self.merchant_x] = {'type': 'merchant', 'growth': 0}
-        
-        # Place shed
-        self.shed_x = 15
-        self.shed_y = 15
-        self.grid[self.shed_y][self.shed_x] = {'type': 'shed', 'growth': 0}
-        
-        # Initialize crops
-        for _ in range(15):
-            x = random.randint(0, GRID_SIZE - 1)
-            y = random.randint(0, GRID_SIZE - 1)
-            if self.grid[y][x]['type'] == 'empty':
-                crop_type = random.choice(['corn', 'turnip'])
-                self.grid[y][x] = {'type': crop_type, 'growth': random.randint(0, 100)}
-    
-    def get_cell_color(self, cell):
-        if cell['type'] == 'merchant':
+        self.invalidate_ui_cache()
+        self.reset_view()
+
+    def reset_view(self):
+        # Camera and renderer for the current grid; the renderer waits for
+        # the window to be open
+        self.view_cols = min(VIEW_SIZE, self.grid.width)
+        self.view_rows = min(VIEW_SIZE, self.grid.height)
+        self.grid_renderer = None
+        if self.screen is not None:
+            self.grid_renderer = GridRenderer(self.grid, self.get_cell_color, self.font, self.title_font,
+                                              self.view_cols, self.view_rows)
+        self.update_camera()
+
+    def update_camera(self):
+        # Keep the player centred without scrolling past the edge of the farm
+        self.camera_x = max(0, min(self.grid.width - self.view_cols, self.player_x - self.view_cols // 2))
+        self.camera_y = max(0, min(self.grid.height - self.view_rows, self.player_y - self.view_rows // 2))
+
+    def is_visible(self, x, y):
+        return (self.camera_x <= x < self.camera_x + self.view_cols and
+                self.camera_y <= y < self.camera_y + self.view_rows)
+
+    def get_cell_color(self, type_code, growth):
+        crop = CROP_BY_CODE[type_code]
+        if crop is not None:
+            return crop.colors[growth]
+        elif type_code == MERCHANT:
             return ORANGE
-        elif cell['type'] == 'shed':
+        elif type_code == SHED:
             return BROWN
-        elif cell['type'] == 'corn':
-            intensity = 100 + int(cell['growth'] * 1.55)
-            return (intensity, intensity, 0)
-        elif cell['type'] == 'turnip':
-            intensity = 100 + int(cell['growth'] * 1.55)
-            return (intensity, 0, intensity)
         else:
             return DARK_GREEN
     
     def draw_grid(self):
-        for y in range(GRID_SIZE):
-            for x in range(GRID_SIZE):
-                cell = self.grid[y][x]
-                color = self.get_cell_color(cell)
-                rect = pygame.Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-                pygame.draw.rect(self.screen, color, rect)
-                pygame.draw.rect(self.screen, BLACK, rect, 1)
-                
-                # Draw growth percentage for growing crops
-                if cell['type'] in ['corn', 'turnip'] and cell['growth'] < 100:
-                    growth_text = self.font.render(f"{cell['growth']}%", True, WHITE)
-                    text_rect = growth_text.get_rect(center=(x * CELL_SIZE + CELL_SIZE // 2, 
-                                                              y * CELL_SIZE + CELL_SIZE // 2))
-                    self.screen.blit(growth_text, text_rect)
-                
-                # Draw symbols for mature crops, merchant, and shed
-                if cell['type'] == 'corn' and cell['growth'] == 100:
-                    symbol = self.font.render("C", True, WHITE)
-                    symbol_rect = symbol.get_rect(center=(x * CELL_SIZE + CELL_SIZE // 2,
-                                                          y * CELL_SIZE + CELL_SIZE // 2))
-                    self.screen.blit(symbol, symbol_rect)
-                elif cell['type'] == 'turnip' and cell['growth'] == 100:
-                    symbol = self.font.render("T", True, WHITE)
-                    symbol_rect = symbol.get_rect(center=(x * CELL_SIZE + CELL_SIZE // 2,
-                                                          y * CELL_SIZE + CELL_SIZE // 2))
-                    self.screen.blit(symbol, symbol_rect)
-                elif cell['type'] == 'merchant':
-                    symbol = self.title_font.render("M", True, WHITE)
-                    symbol_rect = symbol.get_rect(center=(x * CELL_SIZE + CELL_SIZE // 2,
-                                                          y * CELL_SIZE + CELL_SIZE // 2))
-                    self.screen.blit(symbol, symbol_rect)
-                elif cell['type'] == 'shed':
-                    symbol = self.title_font.render("S", True, WHITE)
-                    symbol_rect = symbol.get_rect(center=(x * CELL_SIZE + CELL_SIZE // 2,
-                                                          y * CELL_SIZE + CELL_SIZE // 2))
-                    self.screen.blit(symbol, symbol_rect)
-        
-        # Draw AI helper
-        if self.has_ai_helper:
-            ai_rect = pygame.Rect(self.ai_x * CELL_SIZE + 5, 
-                                 self.ai_y * CELL_SIZE + 5,
-                                 CELL_SIZE - 10, CELL_SIZE - 10)
+        # Cells are cached on the renderer's field surface; only cells that
+        # changed since the last frame are redrawn
+        self.grid_renderer.draw(self.screen, (self.camera_x, self.camera_y))
+
+        # Draw AI helpers that are on screen
+        for helper in self.helpers:
+            if not self.is_visible(helper.x, helper.y):
+                continue
+            screen_x = (helper.x - self.camera_x) * CELL_SIZE
+            screen_y = (helper.y - self.camera_y) * CELL_SIZE
+            ai_rect = pygame.Rect(screen_x + 5, screen_y + 5, CELL_SIZE - 10, CELL_SIZE - 10)
             pygame.draw.rect(self.screen, BLUE, ai_rect, 3)
-            ai_text = self.title_font.render("A", True, BLUE)
-            ai_text_rect = ai_text.get_rect(center=(self.ai_x * CELL_SIZE + CELL_SIZE // 2,
-                                                    self.ai_y * CELL_SIZE + CELL_SIZE // 2))
+            ai_text = self.grid_renderer.glyph("A", BLUE, self.title_font)
+            ai_text_rect = ai_text.get_rect(center=(screen_x + CELL_SIZE // 2, screen_y + CELL_SIZE // 2))
             self.screen.blit(ai_text, ai_text_rect)
-        
+
         # Draw player
-        player_rect = pygame.Rect(self.player_x * CELL_SIZE + 5, 
-                                 self.player_y * CELL_SIZE + 5,
-                                 CELL_SIZE - 10, CELL_SIZE - 10)
+        screen_x = (self.player_x - self.camera_x) * CELL_SIZE
+        screen_y = (self.player_y - self.camera_y) * CELL_SIZE
+        player_rect = pygame.Rect(screen_x + 5, screen_y + 5, CELL_SIZE - 10, CELL_SIZE - 10)
         pygame.draw.rect(self.screen, WHITE, player_rect, 3)
-        player_text = self.title_font.render("@", True, WHITE)
-        player_text_rect = player_text.get_rect(center=(self.player_x * CELL_SIZE + CELL_SIZE // 2,
-                                                        self.player_y * CELL_SIZE + CELL_SIZE // 2))
+        player_text = self.grid_renderer.glyph("@", WHITE, self.title_font)
+        player_text_rect = player_text.get_rect(center=(screen_x + CELL_SIZE // 2, screen_y + CELL_SIZE // 2))
         self.screen.blit(player_text, player_text_rect)
     
-    def draw_ui(self):
-        ui_x = GRID_SIZE * CELL_SIZE + 20
+    def invalidate_ui_cache(self):
+        # Drop every cached panel, window and text surface
+        self._ui_panel = None
+        self._overlay = None
+        self._window_frames = {}
+        self.text_cache = TextCache()
+    
+    def build_ui_panel(self):
+        # Static side panel: title, headings, controls and legend
+        panel = pygame.Surface((WINDOW_WIDTH - VIEW_SIZE * CELL_SIZE, WINDOW_HEIGHT))
+        panel.fill(BLACK)
+        ui_x = 20
         ui_y = 20
         
         # Title
         title = self.title_font.render("FARM SIMULATOR", True, GOLD)
-        self.screen.blit(title, (ui_x, ui_y))
+        panel.blit(title, (ui_x, ui_y))
         
-        # Stats
         stats_y = ui_y + 60
-        gold_text = self.font.render(f"Gold: {self.gold}", True, GOLD)
-        self.screen.blit(gold_text, (ui_x, stats_y))
-        
         inv_title = self.font.render("Inventory:", True, WHITE)
-        self.screen.blit(inv_title, (ui_x, stats_y + 30))
-        
-        corn_text = self.font.render(f"  Corn: {self.inventory['corn']}", True, YELLOW)
-        self.screen.blit(corn_text, (ui_x, stats_y + 55))
-        
-        turnip_text = self.font.render(f"  Turnips: {self.inventory['turnips']}", True, LIGHT_PURPLE)
-        self.screen.blit(turnip_text, (ui_x, stats_y + 80))
+        panel.blit(inv_title, (ui_x, stats_y + 30))
         
-        # Shed storage
         shed_title = self.font.render("Shed Storage:", True, WHITE)
-        self.screen.blit(shed_title, (ui_x, stats_y + 110))
-        
-        shed_corn = self.font.render(f"  Corn: {self.shed_storage['corn']}", True, YELLOW)
-        self.screen.blit(shed_corn, (ui_x, stats_y + 135))
-        
-        shed_turnip = self.font.render(f"  Turnips: {self.shed_storage['turnips']}", True, LIGHT_PURPLE)
-        self.screen.blit(shed_turnip, (ui_x, stats_y + 160))
-        
-        # AI Helper status
-        ai_y = stats_y + 195
-        if self.has_ai_helper:
-            ai_status = self.font.render("AI Helper: Active", True, BLUE)
-        else:
-            ai_status = self.font.render("AI Helper: None", True, GRAY)
-        self.screen.blit(ai_status, (ui_x, ai_y))
+        panel.blit(shed_title, (ui_x, stats_y + 110))
         
         # Controls
-        controls_y = ai_y + 40
+        controls_y = stats_y + 195 + 40
         control_lines = [
             "CONTROLS:",
             "WASD - Move (hold)",
             "Left Click - Harvest/Plant",
             "Walk to M - Merchant",
             "Walk to S - Shed",
+            "F5/F9 - Save/Load",
             "ESC - Quit"
         ]
         
         for i, line in enumerate(control_lines):
             text = self.font.render(line, True, WHITE)
-            self.screen.blit(text, (ui_x, controls_y + i * 22))
+            panel.blit(text, (ui_x, controls_y + i * 22))
         
         # Legend
-        legend_y = controls_y + 150
+        legend_y = controls_y + 172
         legend_lines = [
             "LEGEND:",
             "@ - You",
             "A - AI Helper",
             "M - Merchant",
             "S - Shed",
-            "C/T - Ripe crops"
+            "/".join(crop.symbol for crop in CROPS) + " - Ripe crops"
         ]
         
         for i, line in enumerate(legend_lines):
             text = self.font.render(line, True, GRAY)
-            self.screen.blit(text, (ui_x, legend_y + i * 22))
+            panel.blit(text, (ui_x, legend_y + i * 22))
+        
+        return panel
     
-    def draw_merchant_window(self):
-        # Draw semi-transparent overlay
-        overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-        overlay.set_alpha(200)
-        overlay.fill(BLACK)
-        self.screen.blit(overlay, (0, 0))
+    def draw_ui(self):
+        ui_x = VIEW_SIZE * CELL_SIZE + 20
+        ui_y = 20
+        text = self.text_cache
         
-        # Draw merchant window
-        window_width = 500
-        window_height = 450
+        if self._ui_panel is None:
+            self._ui_panel = self.build_ui_panel()
+        self.screen.blit(self._ui_panel, (VIEW_SIZE * CELL_SIZE, 0))
+        
+        # Stats
+        stats_y = ui_y + 60
+        gold_text = text.render('ui_gold', self.font, f"Gold: {self.gold}", GOLD)
+        self.screen.blit(gold_text, (ui_x, stats_y))
+        
+        for i, crop in enumerate(CROPS):
+            item_text = text.render('ui_' + crop.item, self.font, f"  {crop.label}: {self.inventory[crop.item]}",
+                                    crop.ui_color)
+            self.screen.blit(item_text, (ui_x, stats_y + 55 + i * 25))
+        
+        # Shed storage
+        for i, crop in enumerate(CROPS):
+            shed_text = text.render('ui_shed_' + crop.item, self.font,
+                                    f"  {crop.label}: {self.shed_storage[crop.item]}", crop.ui_color)
+            self.screen.blit(shed_text, (ui_x, stats_y + 135 + i * 25))
+        
+        # AI Helper status
+        ai_y = stats_y + 195
+        helpers = self.helper_count()
+        if helpers > 1:
+            ai_status = text.render('ui_ai', self.font, f"AI Helpers: {helpers}", BLUE)
+        elif helpers:
+            ai_status = text.render('ui_ai', self.font, "AI Helper: Active", BLUE)
+        else:
+            ai_status = text.render('ui_ai', self.font, "AI Helper: None", GRAY)
+        self.screen.blit(ai_status, (ui_x, ai_y))
+    
+    def draw_overlay(self):
+        # Semi-transparent overlay, built once
+        if self._overlay is None:
+            self._overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+            self._overlay.set_alpha(200)
+            self._overlay.fill(BLACK)
+        self.screen.blit(self._overlay, (0, 0))
+    
+    def build_window_frame(self, menu, window_width, window_height):
+        # Static parts of a menu window: background, border and fixed text
+        frame = pygame.Surface((window_width, window_height))
+        frame.fill(BROWN)
+        pygame.draw.rect(frame, GOLD, (0, 0, window_width, window_height), 3)
         window_x = (WINDOW_WIDTH - window_width) // 2
         window_y = (WINDOW_HEIGHT - window_height) // 2
+        center_x = WINDOW_WIDTH // 2 - window_x
+        
+        def blit(surface, pos):
+            frame.blit(surface, pos)
         
-        pygame.draw.rect(self.screen, BROWN, (window_x, window_y, window_width, window_height))
-        pygame.draw.rect(self.screen, GOLD, (window_x, window_y, window_width, window_height), 3)
+        def blit_centered(surface, center):
+            frame.blit(surface, surface.get_rect(center=center))
         
-        if self.merchant_menu == 'main':
+        if menu == 'main':
             # Title
             title = self.title_font.render("MERCHANT SHOP", True, GOLD)
-            title_rect = title.get_rect(center=(WINDOW_WIDTH // 2, window_y + 30))
-            self.screen.blit(title, title_rect)
-            
-            # Current gold
-            gold_text = self.font.render(f"Your Gold: {self.gold}", True, WHITE)
-            self.screen.blit(gold_text, (window_x + 30, window_y + 80))
+            blit_centered(title, (center_x, 30))
             
             # Menu options
-            menu_y = window_y + 140
-            menu_text = self.font.render("What would you like to do?", True, WHITE)
-            self.screen.blit(menu_text, (window_x + 30, menu_y))
-            
-            option1 = self.font.render("1 - Sell Crops", True, GREEN)
-            self.screen.blit(option1, (window_x + 50, menu_y + 50))
-            
-            option2 = self.font.render("2 - Buy Items", True, GREEN)
-            self.screen.blit(option2, (window_x + 50, menu_y + 90))
-            
-            option3 = self.font.render("ESC - Close", True, GRAY)
-            self.screen.blit(option3, (window_x + 50, menu_y + 130))
+            menu_y = 140
+            blit(self.font.render("What would you like to do?", True, WHITE), (30, menu_y))
+            blit(self.font.render("1 - Sell Crops", True, GREEN), (50, menu_y + 50))
+            blit(self.font.render("2 - Buy Items", True, GREEN), (50, menu_y + 90))
+            blit(self.font.render("ESC - Close", True, GRAY), (50, menu_y + 130))
         
-        elif self.merchant_menu == 'sell':
+        elif menu == 'sell':
             # Title
             title = self.title_font.render("SELL CROPS", True, GOLD)
-            title_rect = title.get_rect(center=(WINDOW_WIDTH // 2, window_y + 30))
-            self.screen.blit(title, title_rect)
-            
-            # Current gold
-            gold_text = self.font.render(f"Your Gold: {self.gold}", True, WHITE)
-            self.screen.blit(gold_text, (window_x + 30, window_y + 80))
+            blit_centered(title, (center_x, 30))
             
             # Inventory
-            inv_y = window_y + 120
-            inv_text = self.font.render("Your Inventory:", True, WHITE)
-            self.screen.blit(inv_text, (window_x + 30, inv_y))
-            
-            corn_text = self.font.render(f"Corn: {self.inventory['corn']}", True, YELLOW)
-            self.screen.blit(corn_text, (window_x + 50, inv_y + 30))
-            
-            turnip_text = self.font.render(f"Turnips: {self.inventory['turnips']}", True, LIGHT_PURPLE)
-            self.screen.blit(turnip_text, (window_x + 50, inv_y + 60))
+            blit(self.font.render("Your Inventory:", True, WHITE), (30, 120))
             
             # Exchange rates
-            rates_y = window_y + 230
-            rates_text = self.font.render("Exchange Rates:", True, WHITE)
-            self.screen.blit(rates_text, (window_x + 30, rates_y))
-            
-            corn_rate = self.font.render("1 Corn = 1 Gold", True, YELLOW)
-            self.screen.blit(corn_rate, (window_x + 50, rates_y + 30))
-            
-            turnip_rate = self.font.render("1 Turnip = 2 Gold", True, LIGHT_PURPLE)
-            self.screen.blit(turnip_rate, (window_x + 50, rates_y + 60))
+            rates_y = 230
+            blit(self.font.render("Exchange Rates:", True, WHITE), (30, rates_y))
             
             # Buttons
-            button_y = window_y + 350
-            instructions = self.font.render("C: Sell Corn | T: Sell Turnips | ESC: Back", True, WHITE)
-            inst_rect = instructions.get_rect(center=(WINDOW_WIDTH // 2, button_y))
-            self.screen.blit(instructions, inst_rect)
+            keys = [f"{crop.symbol}: Sell {crop.label}" for crop in CROPS]
+            instructions = self.font.render(" | ".join(keys + ["ESC: Back"]), True, WHITE)
+            blit_centered(instructions, (center_x, 350))
         
-        elif self.merchant_menu == 'buy':
+        elif menu == 'buy':
             # Title
             title = self.title_font.render("BUY ITEMS", True, GOLD)
-            title_rect = title.get_rect(center=(WINDOW_WIDTH // 2, window_y + 30))
-            self.screen.blit(title, title_rect)
-            
-            # Current gold
-            gold_text = self.font.render(f"Your Gold: {self.gold}", True, WHITE)
-            self.screen.blit(gold_text, (window_x + 30, window_y + 80))
+            blit_centered(title, (center_x, 30))
             
             # AI Helper item
-            item_y = window_y + 140
-            item_title = self.title_font.render("AI HELPER", True, BLUE)
-            self.screen.blit(item_title, (window_x + 30, item_y))
-            
-            price_text = self.font.render("Price: 200 Gold", True, GOLD)
-            self.screen.blit(price_text, (window_x + 30, item_y + 40))
+            item_y = 140
+            blit(self.title_font.render("AI HELPER", True, BLUE), (30, item_y))
+            blit(self.font.render(f"Price: {self.ai_helper_price} Gold", True, GOLD), (30, item_y + 40))
             
             desc_lines = [
                 "The AI Helper will automatically:",
@@ -321,273 +445,328 @@ class FarmGame:
             ]
             
             for i, line in enumerate(desc_lines):
-                text = self.font.render(line, True, WHITE)
-                self.screen.blit(text, (window_x + 30, item_y + 80 + i * 25))
+                blit(self.font.render(line, True, WHITE), (30, item_y + 80 + i * 25))
+        
+        elif menu == 'shed':
+            # Title
+            title = self.title_font.render("SHED STORAGE", True, GOLD)
+            blit_centered(title, (center_x, 30))
+            
+            blit(self.font.render("Stored Items:", True, WHITE), (30, 100))
+            blit(self.font.render("Your Inventory:", True, WHITE), (30, 230))
             
-            if self.has_ai_helper:
-                status = self.font.render("STATUS: Already Purchased!", True, GREEN)
-                self.screen.blit(status, (window_x + 30, item_y + 200))
-                
-                instructions = self.font.render("ESC - Back", True, WHITE)
+            # Instructions
+            keys = [f"{crop.symbol}: Withdraw {crop.label}" for crop in CROPS]
+            instructions = self.font.render(" | ".join(keys + ["ESC: Close"]), True, WHITE)
+            blit_centered(instructions, (center_x, 350))
+        
+        return frame
+    
+    def draw_window_frame(self, menu, window_width, window_height):
+        frame = self._window_frames.get(menu)
+        if frame is None:
+            frame = self._window_frames[menu] = self.build_window_frame(menu, window_width, window_height)
+        window_x = (WINDOW_WIDTH - window_width) // 2
+        window_y = (WINDOW_HEIGHT - window_height) // 2
+        self.screen.blit(frame, (window_x, window_y))
+        return window_x, window_y
+    
+    def draw_merchant_window(self):
+        self.draw_overlay()
+        text = self.text_cache
+        
+        # Draw merchant window
+        window_x, window_y = self.draw_window_frame(self.merchant_menu, 500, 450)
+        
+        # Current gold
+        gold_text = text.render('window_gold', self.font, f"Your Gold: {self.gold}", WHITE)
+        self.screen.blit(gold_text, (window_x + 30, window_y + 80))
+        
+        if self.merchant_menu == 'sell':
+            # Inventory
+            inv_y = window_y + 120
+            for i, crop in enumerate(CROPS):
+                item_text = text.render('window_' + crop.item, self.font, f"{crop.label}: {self.inventory[crop.item]}",
+                                        crop.ui_color)
+                self.screen.blit(item_text, (window_x + 50, inv_y + 30 + i * 30))
+            
+            # Exchange rates move as crops are sold and recover over time
+            rates_y = window_y + 230
+            for i, crop in enumerate(CROPS):
+                rate = text.render('window_rate_' + crop.item, self.font,
+                                   f"1 {crop.singular} = {self.crop_price(crop):.2f} Gold", crop.ui_color)
+                self.screen.blit(rate, (window_x + 50, rates_y + 30 + i * 30))
+        
+        elif self.merchant_menu == 'buy':
+            item_y = window_y + 140
+            if self.gold >= self.ai_helper_price:
+                if self.helper_count():
+                    status = text.render('window_status', self.font, f"STATUS: {self.helper_count()} owned", GREEN)
+                    self.screen.blit(status, (window_x + 30, item_y + 200))
+                instructions = text.render('window_instructions', self.font, "Press B to Buy | ESC - Back", WHITE)
             else:
-                if self.gold >= 200:
-                    instructions = self.font.render("Press B to Buy | ESC - Back", True, WHITE)
-                else:
-                    need_text = self.font.render(f"Need {200 - self.gold} more gold!", True, RED)
-                    self.screen.blit(need_text, (window_x + 30, item_y + 200))
-                    instructions = self.font.render("ESC - Back", True, WHITE)
+                need_text = text.render('window_status', self.font, f"Need {self.ai_helper_price - self.gold} more gold!", RED)
+                self.screen.blit(need_text, (window_x + 30, item_y + 200))
+                instructions = text.render('window_instructions', self.font, "ESC - Back", WHITE)
             
             inst_rect = instructions.get_rect(center=(WINDOW_WIDTH // 2, window_y + 390))
             self.screen.blit(instructions, inst_rect)
     
     def draw_shed_window(self):
-        # Draw semi-transparent overlay
-        overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-        overlay.set_alpha(200)
-        overlay.fill(BLACK)
-        self.screen.blit(overlay, (0, 0))
+        self.draw_overlay()
+        text = self.text_cache
         
         # Draw shed window
-        window_width = 500
-        window_height = 400
-        window_x = (WINDOW_WIDTH - window_width) // 2
-        window_y = (WINDOW_HEIGHT - window_height) // 2
-        
-        pygame.draw.rect(self.screen, BROWN, (window_x, window_y, window_width, window_height))
-        pygame.draw.rect(self.screen, GOLD, (window_x, window_y, window_width, window_height), 3)
-        
-        # Title
-        title = self.title_font.render("SHED STORAGE", True, GOLD)
-        title_rect = title.get_rect(center=(WINDOW_WIDTH // 2, window_y + 30))
-        self.screen.blit(title, title_rect)
+        window_x, window_y = self.draw_window_frame('shed', 500, 400)
         
         # Shed storage
         storage_y = window_y + 100
-        storage_text = self.font.render("Stored Items:", True, WHITE)
-        self.screen.blit(storage_text, (window_x + 30, storage_y))
-        
-        corn_text = self.font.render(f"Corn: {self.shed_storage['corn']}", True, YELLOW)
-        self.screen.blit(corn_text, (window_x + 50, storage_y + 40))
-        
-        turnip_text = self.font.render(f"Turnips: {self.shed_storage['turnips']}", True, LIGHT_PURPLE)
-        self.screen.blit(turnip_text, (window_x + 50, storage_y + 80))
+        for i, crop in enumerate(CROPS):
+            stored_text = text.render('shed_' + crop.item, self.font, f"{crop.label}: {self.shed_storage[crop.item]}",
+                                      crop.ui_color)
+            self.screen.blit(stored_text, (window_x + 50, storage_y + 40 + i * 40))
         
         # Your inventory
         inv_y = window_y + 230
-        inv_text = self.font.render("Your Inventory:", True, WHITE)
-        self.screen.blit(inv_text, (window_x + 30, inv_y))
-        
-        your_corn = self.font.render(f"Corn: {self.inventory['corn']}", True, YELLOW)
-        self.screen.blit(your_corn, (window_x + 50, inv_y + 40))
-        
-        your_turnip = self.font.render(f"Turnips: {self.inventory['turnips']}", True, LIGHT_PURPLE)
-        self.screen.blit(your_turnip, (window_x + 50, inv_y + 80))
-        
-        # Instructions
-        inst_y = window_y + 350
-        instructions = self.font.render("C: Withdraw Corn | T: Withdraw Turnips | ESC: Close", True, WHITE)
-        inst_rect = instructions.get_rect(center=(WINDOW_WIDTH // 2, inst_y))
-        self.screen.blit(instructions, inst_rect)
+        for i, crop in enumerate(CROPS):
+            item_text = text.render('shed_inv_' + crop.item, self.font, f"{crop.label}: {self.inventory[crop.item]}",
+                                    crop.ui_color)
+            self.screen.blit(item_text, (window_x + 50, inv_y + 40 + i * 40))
     
-    def handle_click(self, mouse_x, mouse_y):
+    def set_state(self, state, grid):
+        super().set_state(state, grid)
+        self.reset_view()
+
+    def helper_count(self):
+        # AI helpers owned, for the side panel and the buy menu
+        return len(self.helpers)
+    
+    def screen_cell(self, mouse_x, mouse_y):
+        # Farm cell under a screen position, or None outside the field
         grid_x = mouse_x // CELL_SIZE
         grid_y = mouse_y // CELL_SIZE
-        
-        # Check if click is within grid
-        if 0 <= grid_x < GRID_SIZE and 0 <= grid_y < GRID_SIZE:
-            # Check if adjacent to player
-            if abs(self.player_x - grid_x) <= 1 and abs(self.player_y - grid_y) <= 1:
-                cell = self.grid[grid_y][grid_x]
-                
-                if cell['type'] == 'corn' and cell['growth'] == 100:
-                    self.inventory['corn'] += 1
-                    self.grid[grid_y][grid_x] = {'type': 'empty', 'growth': 0}
-                elif cell['type'] == 'turnip' and cell['growth'] == 100:
-                    self.inventory['turnips'] += 1
-                    self.grid[grid_y][grid_x] = {'type': 'empty', 'growth': 0}
-                elif cell['type'] == 'empty':
-                    crop_type = random.choice(['corn', 'turnip'])
-                    self.grid[grid_y][grid_x] = {'type': crop_type, 'growth': 0}
-    
-    def move_player(self, dx, dy):
-        new_x = max(0, min(GRID_SIZE - 1, self.player_x + dx))
-        new_y = max(0, min(GRID_SIZE - 1, self.player_y + dy))
-        self.player_x = new_x
-        self.player_y = new_y
-        
-        # Check if on merchant
-        if self.grid[self.player_y][self.player_x]['type'] == 'merchant':
-            self.merchant_open = True
-            self.merchant_menu = 'main'
-        # Check if on shed
-        elif self.grid[self.player_y][self.player_x]['type'] == 'shed':
-            self.merchant_open = True
-            self.merchant_menu = 'shed'
-    
+        if grid_x < self.view_cols and grid_y < self.view_rows:
+            return grid_x + self.camera_x, grid_y + self.camera_y
+        return None
+
+    def screen_area(self, x0, y0, x1, y1):
+        # (x, y, width, height) in farm cells of the part of the field
+        # inside a rectangle with corners (x0, y0) and (x1, y1) on screen,
+        # or None if it misses the field
+        left = min(x0, x1) // CELL_SIZE
+        top = min(y0, y1) // CELL_SIZE
+        if left >= self.view_cols or top >= self.view_rows:
+            return None
+        right = min(max(x0, x1) // CELL_SIZE, self.view_cols - 1)
+        bottom = min(max(y0, y1) // CELL_SIZE, self.view_rows - 1)
+        return left + self.camera_x, top + self.camera_y, right - left + 1, bottom - top + 1
+
+    def handle_click(self, mouse_x, mouse_y):
+        cell = self.screen_cell(mouse_x, mouse_y)
+        if cell is not None:
+            self.interact(*cell)
+
+    def work_area(self, x0, y0, x1, y1):
+        # Right-drag from (x0, y0) to (x1, y1) on screen: harvest every ripe
+        # crop in the rectangle and replant every empty cell
+        area = self.screen_area(x0, y0, x1, y1)
+        if area is not None:
+            self.harvest_area(*area)
+            self.plant_area(*area)
+
+    def draw_drag(self):
+        # Outline of the rectangle being dragged out
+        mouse_x, mouse_y = pygame.mouse.get_pos()
+        start_x, start_y = self.drag_start
+        rect = pygame.Rect(min(start_x, mouse_x), min(start_y, mouse_y),
+                           abs(mouse_x - start_x) + 1, abs(mouse_y - start_y) + 1)
+        pygame.draw.rect(self.screen, WHITE, rect, 2)
+
+    def quick_save(self):
+        if not self.saves:
+            return
+        if isinstance(self.grid, ChunkedWorld):
+            save_world(self)
+        else:
+            save_game(self, SAVE_PATH)
+
+    def quick_load(self):
+        # Chunked worlds are written out as they are played, so there is no
+        # separate quick save to go back to
+        if self.saves and not isinstance(self.grid, ChunkedWorld) and os.path.exists(SAVE_PATH):
+            load_game(self, SAVE_PATH)
+
     def ai_harvest(self):
-        # Find nearest mature crop
-        best_dist = float('inf')
-        target_x, target_y = None, None
-        
-        for y in range(GRID_SIZE):
-            for x in range(GRID_SIZE):
-                cell = self.grid[y][x]
-                if cell['type'] in ['corn', 'turnip'] and cell['growth'] == 100:
-                    dist = abs(x - self.ai_x) + abs(y - self.ai_y)
-                    if dist < best_dist:
-                        best_dist = dist
-                        target_x, target_y = x, y
-        
-        # Move towards target or harvest if adjacent
-        if target_x is not None:
-            if abs(self.ai_x - target_x) <= 1 and abs(self.ai_y - target_y) <= 1:
-                # Harvest
-                cell = self.grid[target_y][target_x]
-                if cell['type'] == 'corn':
-                    self.shed_storage['corn'] += 1
-                elif cell['type'] == 'turnip':
-                    self.shed_storage['turnips'] += 1
-                self.grid[target_y][target_x] = {'type': 'empty', 'growth': 0}
-            else:
-                # Move towards target
-                if abs(self.ai_x - target_x) > abs(self.ai_y - target_y):
-                    if self.ai_x < target_x:
-                        self.ai_x = min(GRID_SIZE - 1, self.ai_x + 1)
-                    else:
-                        self.ai_x = max(0, self.ai_x - 1)
-                else:
-                    if self.ai_y < target_y:
-                        self.ai_y = min(GRID_SIZE - 1, self.ai_y + 1)
-                    else:
-                        self.ai_y = max(0, self.ai_y - 1)
-    
+        # Charge the helpers' work to its own section of the frame
+        self.profiler.lap('sim')
+        super().ai_harvest()
+        self.profiler.lap('ai_harvest')
+
     def grow_crops(self):
-        for y in range(GRID_SIZE):
-            for x in range(GRID_SIZE):
-                cell = self.grid[y][x]
-                if cell['type'] in ['corn', 'turnip'] and cell['growth'] < 100:
-                    cell['growth'] = min(100, cell['growth'] + 2)
-    
-    def sell_corn(self):
-        if self.inventory['corn'] > 0:
-            self.gold += self.inventory['corn']
-            self.inventory['corn'] = 0
-    
-    def sell_turnips(self):
-        if self.inventory['turnips'] > 0:
-            self.gold += self.inventory['turnips'] * 2
-            self.inventory['turnips'] = 0
-    
-    def buy_ai_helper(self):
-        if not self.has_ai_helper and self.gold >= 200:
-            self.gold -= 200
-            self.has_ai_helper = True
-    
-    def withdraw_from_shed(self, crop_type):
-        if crop_type == 'corn' and self.shed_storage['corn'] > 0:
-            self.inventory['corn'] += self.shed_storage['corn']
-            self.shed_storage['corn'] = 0
-        elif crop_type == 'turnip' and self.shed_storage['turnips'] > 0:
-            self.inventory['turnips'] += self.shed_storage['turnips']
-            self.shed_storage['turnips'] = 0
-    
-    def run(self):
+        self.profiler.lap('sim')
+        super().grow_crops()
+        self.profiler.lap('grow_crops')
+
+    def draw_profiler(self):
+        # p50/p99 of each section over the last few seconds. The text is
+        # rebuilt every PROFILER_REFRESH frames, not every frame.
+        if self._profiler_overlay is None or self.profiler.frames % PROFILER_REFRESH == 0:
+            rows = [("ms", "p50", "p99", GOLD)]
+            for name, (p50, p99) in self.profiler.percentiles((50, 99)).items():
+                rows.append((name, f"{p50:.2f}", f"{p99:.2f}", GOLD if name == 'total' else WHITE))
+            rows.append((f"{self.clock.get_fps():.0f} FPS", "", "", GOLD))
+
+            if self._profiler_font is None:
+                self._profiler_font = pygame.font.Font(None, 20)
+            font = self._profiler_font
+            line_height = font.get_linesize()
+            overlay = pygame.Surface((190, len(rows) * line_height + 10), pygame.SRCALPHA)
+            overlay.fill((0, 0, 0, 180))
+            for i, (name, p50, p99, color) in enumerate(rows):
+                y = 5 + i * line_height
+                overlay.blit(font.render(name, True, color), (5, y))
+                # Numbers right-aligned in two columns
+                for text, right in ((p50, 130), (p99, 185)):
+                    surface = font.render(text, True, color)
+                    overlay.blit(surface, (right - surface.get_width(), y))
+            self._profiler_overlay = overlay
+        self.screen.blit(self._profiler_overlay, (5, 5))
+
+    def poll_input(self):
+        # This frame's input as plain values, so it can be recorded and fed
+        # back in later: a list of ('quit',), ('key', name),
+        # ('click', button, x, y) and ('area', x0, y0, x1, y1) events, and
+        # the movement keys held down
+        events = []
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                events.append(('quit',))
+            elif event.type == pygame.KEYDOWN:
+                events.append(('key', pygame.key.name(event.key)))
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                events.append(('click', event.button, event.pos[0], event.pos[1]))
+                if event.button == 3:
+                    self.drag_start = event.pos
+            elif event.type == pygame.MOUSEBUTTONUP and event.button == 3 and self.drag_start is not None:
+                events.append(('area',) + tuple(self.drag_start) + tuple(event.pos))
+                self.drag_start = None
+        keys = pygame.key.get_pressed()
+        held = ''.join(name for name, key in MOVE_KEYS if keys[key])
+        return events, held
+
+    def press_key(self, name):
+        # Returns False when the key quits the game
+        if self.merchant_open:
+            self.menu_key(name)
+        else:
+            if name == 'escape':
+                return False
+            elif name == 'f5':
+                self.quick_save()
+            elif name == 'f9':
+                self.quick_load()
+        if name == 'f3':
+            self.show_profiler = not self.show_profiler
+        return True
+
+    def apply_input(self, events, held):
+        # Returns False once the player has asked to quit
         running = True
-        
-        while running:
-            self.clock.tick(FPS)
-            
-            # Handle events
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
+        for event in events:
+            if event[0] == 'quit':
+                running = False
+            elif event[0] == 'key':
+                if not self.press_key(event[1]):
                     running = False
-                
-                elif event.type == pygame.KEYDOWN:
-                    if self.merchant_open:
-                        if event.key == pygame.K_ESCAPE:
-                            if self.merchant_menu == 'main':
-                                self.merchant_open = False
-                            else:
-                                self.merchant_menu = 'main'
-                        elif self.merchant_menu == 'main':
-                            if event.key == pygame.K_1:
-                                self.merchant_menu = 'sell'
-                            elif event.key == pygame.K_2:
-                                self.merchant_menu = 'buy'
-                        elif self.merchant_menu == 'sell':
-                            if event.key == pygame.K_c:
-                                self.sell_corn()
-                            elif event.key == pygame.K_t:
-                                self.sell_turnips()
-                        elif self.merchant_menu == 'buy':
-                            if event.key == pygame.K_b:
-                                self.buy_ai_helper()
-                        elif self.merchant_menu == 'shed':
-                            if event.key == pygame.K_c:
-                                self.withdraw_from_shed('corn')
-                            elif event.key == pygame.K_t:
-                                self.withdraw_from_shed('turnip')
-                    else:
-                        if event.key == pygame.K_ESCAPE:
-                            running = False
-                
-                elif event.type == pygame.MOUSEBUTTONDOWN and not self.merchant_open:
-                    if event.button == 1:  # Left click
-                        mouse_x, mouse_y = pygame.mouse.get_pos()
-                        self.handle_click(mouse_x, mouse_y)
-            
-            # Handle held keys for movement
-            if not self.merchant_open:
-                keys = pygame.key.get_pressed()
-                self.move_timer += 1
-                
-                if self.move_timer >= self.move_delay:
-                    moved = False
-                    if keys[pygame.K_w]:
-                        self.move_player(0, -1)
-                        moved = True
-                    elif keys[pygame.K_s]:
-                        self.move_player(0, 1)
-                        moved = True
-                    elif keys[pygame.K_a]:
-                        self.move_player(-1, 0)
-                        moved = True
-                    elif keys[pygame.K_d]:
-                        self.move_player(1, 0)
-                        moved = True
-                    
-                    if moved:
-                        self.move_timer = 0
-            
-            # AI Helper logic
-            if self.has_ai_helper:
-                self.ai_harvest_timer += 1
-                if self.ai_harvest_timer >= self.ai_harvest_interval:
-                    self.ai_harvest()
-                    self.ai_harvest_timer = 0
-            
-            # Grow crops every second
-            self.growth_timer += 1
-            if self.growth_timer >= FPS:
-                self.grow_crops()
-                self.growth_timer = 0
-            
-            # Draw everything
-            self.screen.fill(BLACK)
-            self.draw_grid()
-            self.draw_ui()
-            
-            if self.merchant_open:
-                if self.merchant_menu == 'shed':
-                    self.draw_shed_window()
-                else:
-                    self.draw_merchant_window()
-            
+            elif event[0] == 'click' and not self.merchant_open:
+                if event[1] == 1:  # Left click
+                    self.handle_click(event[2], event[3])
+            elif event[0] == 'area' and not self.merchant_open:
+                self.work_area(*event[1:])
+        self.profiler.lap('input')
+
+        # Handle held keys for movement
+        self.move_held(held)
+        return running
+
+    def frame(self, events, held, draw=True):
+        # One frame of the game loop; everything but drawing depends only
+        # on the input passed in, so replays play out exactly as recorded.
+        # Call profiler.start_frame() first so reading input is timed too.
+        running = self.apply_input(events, held)
+
+        # Advance AI helper and crop growth by one frame
+        self.step(1)
+        self.update_camera()
+
+        # Snapshot for the background autosave when one is due
+        if self.autosaver is not None:
+            self.autosaver.maybe_save(self)
+        self.profiler.lap('sim')
+
+        if draw:
+            self.draw()
             pygame.display.flip()
-        
+            self.profiler.lap('flip')
+        self.profiler.end_frame(self.ticks)
+        return running
+
+    def draw(self):
+        self.open_display()
+        profiler = self.profiler
+        self.screen.fill(BLACK)
+        self.draw_grid()
+        profiler.lap('draw_grid')
+        self.draw_ui()
+        profiler.lap('draw_ui')
+
+        if self.merchant_open:
+            if self.merchant_menu == 'shed':
+                self.draw_shed_window()
+            else:
+                self.draw_merchant_window()
+        if self.drag_start is not None:
+            self.draw_drag()
+        if self.show_profiler:
+            self.draw_profiler()
+        profiler.lap('overlays')
+
+    def run(self, record_path=None, profile_path=None):
+        # With record_path every frame's input is written to a recording
+        # that replay.py plays back; with profile_path every frame's
+        # section timings are written out (CSV for .csv, else JSON lines)
+        recorder = InputRecorder(record_path, self) if record_path else None
+        if profile_path:
+            self.profiler.open_export(profile_path)
+        self.open_display()  # before the first poll_input()
+        running = True
+
+        while running:
+            self.clock.tick(FPS)
+            self.profiler.start_frame()
+            events, held = self.poll_input()
+            if recorder is not None:
+                recorder.record(events, held)
+            running = self.frame(events, held)
+
+        if recorder is not None:
+            recorder.close()
+        self.profiler.close()
+        # Save on the way out and wait for the write to finish
+        if self.autosaver is not None:
+            self.autosaver.save(self)
+            self.autosaver.close()
         pygame.quit()
         sys.exit()
 
 if __name__ == "__main__":
-    game = FarmGame()
-    game.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Farm Simulator")
+    parser.add_argument('--seed', type=int, help="seed for a new farm's random choices")
+    parser.add_argument('--new', action='store_true', help="start a new farm instead of loading the autosave")
+    parser.add_argument('--record', metavar='PATH', help="record this session's input for replay.py")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="write each frame's section timings to PATH (CSV if it ends in .csv, else JSON lines)")
+    args = parser.parse_args()
+
+    game = FarmGame(seed=args.seed, resume=not args.new)
+    game.run(args.record, args.profile)
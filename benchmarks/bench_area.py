@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from farm_core import FarmSimulation, FPS
+
+# Planting and harvesting a square area cell by cell through interact()
+# versus with one batched plant_area()/harvest_area() call.
+#
+#   python benchmarks/bench_area.py [side ...]
+
+SIDES = [10, 100, 316, 1000]
+
+
+def per_cell(sim, side, action):
+    # interact() only works next to the player, so walk it over the area
+    for y in range(side):
+        for x in range(side):
+            sim.player_x, sim.player_y = x, y
+            if action == 'harvest' and sim.grid.is_ripe(x, y) or action == 'plant' and sim.grid.code_at(x, y) == 0:
+                sim.interact(x, y)
+
+
+def time_area(side, batched):
+    sim = FarmSimulation(side, seed=0)
+    start = time.perf_counter()
+    if batched:
+        sim.plant_area(0, 0, side, side)
+    else:
+        per_cell(sim, side, 'plant')
+    plant = time.perf_counter() - start
+
+    sim.step(60 * FPS)  # everything ripens
+    start = time.perf_counter()
+    if batched:
+        harvested = sim.harvest_area(0, 0, side, side)
+    else:
+        per_cell(sim, side, 'harvest')
+        harvested = sum(sim.inventory.values())
+    return plant * 1000, (time.perf_counter() - start) * 1000, harvested
+
+
+def main(sides):
+    time_area(10, batched=True)  # warm up numpy's random generators
+    print(f"{'cells':>8} {'plant loop ms':>14} {'plant batch ms':>15} {'harvest loop ms':>16} {'harvest batch ms':>17}")
+    for side in sides:
+        loop_plant, loop_harvest, _ = time_area(side, batched=False)
+        batch_plant, batch_harvest, _ = time_area(side, batched=True)
+        print(f"{side * side:>8} {loop_plant:>14.2f} {batch_plant:>15.2f} {loop_harvest:>16.2f} {batch_harvest:>17.2f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or SIDES)
@@ -0,0 +1,71 @@
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from farm_core import FarmSimulation, FPS
+from savegame import Autosaver, save_game
+
+# Main-thread cost of autosaving on a fully planted farm: the worst time
+# a frame spends saving, with the save written inline versus handed to the
+# background autosaver, which only takes a snapshot, and that snapshot as
+# a share of the frame budget. The worst frame without saving, which is a
+# growth tick, is there for scale. The farm runs for a second first, so
+# one-off setup costs don't count as a save's.
+#
+#   python benchmarks/bench_autosave.py [size ...]
+
+SIZES = [100, 1000, 2000]
+FRAMES = 600
+SAVE_EVERY = 120  # frames
+WARM_UP = FPS  # frames
+FRAME_BUDGET_MS = 1000 / FPS
+
+
+def run_frames(sim, on_frame):
+    # Worst time spent in on_frame after a frame's step, and worst step
+    worst_save = worst_step = 0.0
+    for frame in range(FRAMES):
+        start = time.perf_counter()
+        sim.step(1)
+        stepped = time.perf_counter()
+        on_frame(frame)
+        worst_step = max(worst_step, stepped - start)
+        worst_save = max(worst_save, time.perf_counter() - stepped)
+    return worst_save * 1000, worst_step * 1000
+
+
+def main(sizes):
+    tmp_dir = tempfile.mkdtemp()
+    path = os.path.join(tmp_dir, 'bench.sav')
+    print(f"frame budget at {FPS} FPS: {FRAME_BUDGET_MS:.1f} ms")
+    print(f"{'size':>6} {'frame':>9} {'inline':>9} {'background':>11} {'compressed':>11} {'of budget':>10}"
+          f"   (worst ms)")
+    for size in sizes:
+        random.seed(0)
+        sim = FarmSimulation(size)
+        sim.plant_field()
+        sim.step(WARM_UP)
+
+        _, frame_ms = run_frames(sim, lambda frame: None)
+
+        def inline(frame):
+            if frame % SAVE_EVERY == 0:
+                save_game(sim, path)
+        inline_ms, _ = run_frames(sim, inline)
+
+        results = []
+        for compress in (False, True):
+            autosaver = Autosaver(path, interval_ticks=SAVE_EVERY, compress=compress)
+            results.append(run_frames(sim, lambda frame: autosaver.maybe_save(sim))[0])
+            autosaver.close()
+
+        print(f"{size:>6} {frame_ms:>9.2f} {inline_ms:>9.2f} {results[0]:>11.2f} {results[1]:>11.2f}"
+              f" {max(results) / FRAME_BUDGET_MS:>10.0%}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
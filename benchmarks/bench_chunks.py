@@ -0,0 +1,69 @@
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chunked_world import ChunkedWorld, save_world, load_world
+from farm_core import FarmSimulation
+
+# A player walking across a farm far bigger than memory, planting as they
+# go. Only max_loaded chunks are ever in memory; the rest are paged out to
+# disk and grown in one go when they are read again.
+#
+#   python benchmarks/bench_chunks.py [max_loaded ...]
+
+WORLD_SIZE = 10_000_000  # 10^14 cells, about 200 TB as one grid
+VIEW = 20
+STEPS = 20_000
+
+
+def walk(max_loaded):
+    directory = tempfile.mkdtemp(prefix='farm_world_')
+    try:
+        random.seed(1)
+        world = ChunkedWorld(directory, WORLD_SIZE, max_loaded=max_loaded)
+        sim = FarmSimulation(WORLD_SIZE, grid=world)
+        rng = random.Random(1)
+        sim.player_x = sim.player_y = WORLD_SIZE // 2
+
+        start = time.perf_counter()
+        peak_bytes = 0
+        for step in range(STEPS):
+            # Sweep back and forth across a few chunks while drifting down,
+            # so chunks left behind are read back from disk
+            dx = 1 if step // 500 % 2 == 0 else -1
+            sim.move_player(dx, rng.choice((1, 0, 0, 0, -1)))
+            sim.interact(sim.player_x + 1, sim.player_y)
+            sim.step(8)
+            world.region(max(0, sim.player_x - VIEW // 2), max(0, sim.player_y - VIEW // 2), VIEW, VIEW)
+            peak_bytes = max(peak_bytes, world.nbytes)
+        elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        save_world(sim)
+        save_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        load_world(FarmSimulation(1), directory)
+        load_ms = (time.perf_counter() - start) * 1000
+
+        print(f"{max_loaded:>10} {elapsed / STEPS * 1000:>8.3f} {peak_bytes / 1024:>9.0f} "
+              f"{world.chunks_loaded:>8} {world.chunks_evicted:>8} {save_ms:>8.1f} {load_ms:>8.1f}")
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [4, 16, 256]
+    print(f"{STEPS} moves across a {WORLD_SIZE}x{WORLD_SIZE} farm")
+    print(f"{'max chunks':>10} {'ms/move':>8} {'peak KiB':>9} {'reloads':>8} {'evicted':>8} "
+          f"{'save ms':>8} {'load ms':>8}")
+    for max_loaded in sizes:
+        walk(max_loaded)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+# Cost of the per-cell hot paths (growth ticks, harvesting, planting) as the
+# crop catalogue grows. Every lookup goes through tables indexed by type
+# code, so the times should stay flat. The catalogue is read at import, so
+# each catalogue size runs in its own process.
+#
+#   python benchmarks/bench_crops.py [crop count ...]
+
+SIZE = 1000
+GROW_TICKS = 50
+HARVESTS = 20000
+
+
+def catalogue(count):
+    crops = []
+    for i in range(count):
+        crops.append({
+            'name': f"crop{i}", 'item': f"crop{i}s", 'growth_rate': 1 + i % 5, 'price': 1 + i % 7,
+            'symbol': chr(ord('A') + i) if i < 26 else chr(ord('a') + i - 26),
+            'color_ramp': [[100, i % 100, 0], [255, 155 + i % 100, 0]], 'ui_color': [255, 255, 255],
+        })
+    return {'crops': crops}
+
+
+def measure():
+    import random
+
+    import numpy as np
+
+    from farm_core import FarmSimulation
+    from farm_grid import CROPS
+
+    random.seed(1)
+    sim = FarmSimulation(SIZE)
+    rng = np.random.default_rng(1)
+    sim.grid.types[...] = rng.integers(CROPS[0].code, CROPS[-1].code + 1, size=(SIZE, SIZE), dtype=np.uint8)
+    sim.grid.growth[...] = rng.integers(0, 100, size=(SIZE, SIZE), dtype=np.uint8)
+    sim.grid.reindex()
+
+    start = time.perf_counter()
+    for _ in range(GROW_TICKS):
+        sim.grow_crops()
+    grow_ms = (time.perf_counter() - start) / GROW_TICKS * 1000
+
+    # Harvest ripe cells and replant them, next to the player
+    cells = np.argwhere(sim.grid.ripe_mask())[:HARVESTS]
+    start = time.perf_counter()
+    for y, x in cells.tolist():
+        sim.player_x, sim.player_y = x, y
+        sim.interact(x, y)
+        sim.interact(x, y)
+    harvest_us = (time.perf_counter() - start) / max(1, len(cells)) * 1e6
+    print(f"{len(CROPS):>6} {grow_ms:>10.2f} {harvest_us:>12.2f}")
+
+
+def main():
+    if os.environ.get('BENCH_CROPS_CHILD'):
+        measure()
+        return
+
+    counts = [int(arg) for arg in sys.argv[1:]] or [2, 10, 50]
+    print(f"{'crops':>6} {'grow ms':>10} {'harvest us':>12}   ({SIZE}x{SIZE} farm)")
+    sys.stdout.flush()
+    for count in counts:
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(catalogue(count), f)
+        try:
+            env = dict(os.environ, FARM_CROPS=f.name, BENCH_CROPS_CHILD='1')
+            subprocess.run([sys.executable, os.path.abspath(__file__)], env=env, check=True)
+        finally:
+            os.unlink(f.name)
+
+
+if __name__ == "__main__":
+    main()
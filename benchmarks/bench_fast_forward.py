@@ -0,0 +1,92 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from farm_core import FarmSimulation, FPS
+
+# Offline catch-up: fast_forward() against stepping the same span tick by
+# tick, checking that both end in the same state. Only farms without
+# helpers are caught up in bulk; with helpers fast_forward() is step(), so
+# those rows show what catching such a farm up costs. The last case is a
+# busy farm, fully planted with helpers harvesting every round, which is as
+# slow as catch-up gets (see the README). Then short sessions, with and
+# without helpers, where the player harvests and replants between
+# catch-ups, which must also end the same.
+#
+#   python benchmarks/bench_fast_forward.py
+
+# (farm size, helpers, random crops or None for a fully planted farm, hours)
+CASES = [
+    (20, 1, 0, 8),
+    (200, 0, 20000, 8),
+    (1000, 0, 300000, 8),
+    (1000, 3, 200, 8),
+    (200, 5, 2000, 8),
+    (1000, 5, None, 3),
+]
+SESSIONS = 50
+SESSION_SIZE = 30
+
+
+def make_sim(size, helpers, crops, seed=1):
+    random.seed(seed)
+    sim = FarmSimulation(size)
+    rng = random.Random(seed)
+    if crops is None:
+        sim.plant_field()
+    else:
+        for _ in range(crops):
+            x, y = rng.randrange(size), rng.randrange(size)
+            if sim.grid.types[y, x] == 0:
+                sim.grid.set(x, y, rng.choice(['corn', 'turnip']), rng.randint(0, 100))
+    for _ in range(helpers):
+        sim.buy_ai_helper()
+        sim.gold += 200
+    return sim
+
+
+def same_state(a, b):
+    return (a.get_state() == b.get_state() and (a.grid.types == b.grid.types).all()
+            and (a.grid.growth == b.grid.growth).all())
+
+
+def play_session(seed, method):
+    # The player harvests and replants patches, which can take crops helpers
+    # were walking to, with catch-ups of up to half a minute in between.
+    # Odd seeds have helpers, even seeds don't.
+    sim = make_sim(SESSION_SIZE, 3 * (seed % 2), 150, seed)
+    rng = random.Random(seed)
+    for _ in range(30):
+        x, y = rng.randrange(SESSION_SIZE), rng.randrange(SESSION_SIZE)
+        width, height = rng.randint(1, 8), rng.randint(1, 8)
+        sim.harvest_area(x, y, width, height)
+        if rng.random() < 0.5:
+            sim.plant_area(x, y, width, height)
+        getattr(sim, method)(rng.randint(1, 2000))
+    return sim
+
+
+def main():
+    print(f"{'farm':>10} {'helpers':>8} {'crops':>8} {'hours':>6} {'step':>10} {'fast_fwd':>10} same")
+    for size, helpers, crops, hours in CASES:
+        results = []
+        for method in ('step', 'fast_forward'):
+            sim = make_sim(size, helpers, crops)
+            start = time.perf_counter()
+            getattr(sim, method)(hours * 3600 * FPS)
+            results.append((time.perf_counter() - start, sim))
+        (t_step, a), (t_ff, b) = results
+        planted = 'all' if crops is None else crops
+        print(f"{size:>9}² {helpers:>8} {planted:>8} {hours:>6} {t_step:>9.3f}s {t_ff:>9.3f}s {same_state(a, b)}")
+
+    diverged = [seed for seed in range(SESSIONS)
+                if not same_state(play_session(seed, 'step'), play_session(seed, 'fast_forward'))]
+    print(f"\nplayer harvesting between catch-ups: {SESSIONS - len(diverged)}/{SESSIONS} sessions same"
+          + (f", diverged: {diverged}" if diverged else ""))
+
+
+if __name__ == '__main__':
+    main()
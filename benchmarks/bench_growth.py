@@ -0,0 +1,63 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from farm_grid import FarmGrid, CROP_TYPES, GROWTH_RATES, growth_rate_table
+
+# Compares the batched FarmGrid.grow against the old per-cell loop over a
+# list-of-dicts grid, for a range of farm sizes.
+#
+#   python benchmarks/bench_growth.py [size ...]
+
+SIZES = [20, 100, 500, 1000]
+CROP_DENSITY = 0.5
+
+
+def make_grids(size, seed=0):
+    rng = random.Random(seed)
+    dict_grid = [[{'type': 'empty', 'growth': 0} for _ in range(size)] for _ in range(size)]
+    grid = FarmGrid(size)
+    for y in range(size):
+        for x in range(size):
+            if rng.random() < CROP_DENSITY:
+                crop_type = rng.choice(CROP_TYPES)
+                growth = rng.randint(0, 100)
+                dict_grid[y][x] = {'type': crop_type, 'growth': growth}
+                grid.set(x, y, crop_type, growth)
+    return dict_grid, grid
+
+
+def loop_grow(dict_grid):
+    # The original grow_crops
+    for row in dict_grid:
+        for cell in row:
+            if cell['type'] in ['corn', 'turnip'] and cell['growth'] < 100:
+                cell['growth'] = min(100, cell['growth'] + 2)
+
+
+def time_per_call(func, min_time=0.2):
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        func()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / calls
+
+
+def main(sizes):
+    rate_lut = growth_rate_table(GROWTH_RATES)
+    print(f"{'size':>6} {'loop ms':>10} {'vectorized ms':>14} {'speedup':>8}")
+    for size in sizes:
+        dict_grid, grid = make_grids(size)
+        loop_ms = time_per_call(lambda: loop_grow(dict_grid)) * 1000
+        vec_ms = time_per_call(lambda: grid.grow(rate_lut)) * 1000
+        print(f"{size:>6} {loop_ms:>10.3f} {vec_ms:>14.3f} {loop_ms / vec_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
@@ -0,0 +1,61 @@
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from farm_core import FarmSimulation
+from scheduler import AIHelper
+
+# Scheduling cost and harvest throughput for growing numbers of AI helpers
+# on a large farm.
+#
+#   python benchmarks/bench_helpers.py
+
+GRID = 500
+CROP_DENSITY = 0.02
+HELPER_COUNTS = [1, 10, 100, 300]
+SIM_MINUTES = 5
+
+
+def make_sim(helpers, seed=0):
+    random.seed(seed)
+    sim = FarmSimulation(GRID)
+    rng = np.random.default_rng(seed)
+    crops = (rng.random((GRID, GRID)) < CROP_DENSITY) & (sim.grid.types == 0)
+    sim.grid.types[crops] = rng.choice([3, 4], size=int(crops.sum()))
+    sim.grid.growth[crops] = rng.integers(0, 101, size=int(crops.sum()))
+    sim.grid.reindex()
+    for _ in range(helpers):
+        sim.helpers.append(AIHelper(random.randrange(GRID), random.randrange(GRID)))
+    return sim
+
+
+def main():
+    print(f"{'helpers':>8} {'ripe':>7} {'round ms':>9} {'crops/min':>10}")
+    for count in HELPER_COUNTS:
+        sim = make_sim(count)
+        ripe = len(sim.grid.ripe)
+
+        # Time just the scheduling rounds
+        rounds = 0
+        scheduling = 0.0
+        original = sim.scheduler.assign
+
+        def timed_assign(helpers):
+            nonlocal rounds, scheduling
+            start = time.perf_counter()
+            original(helpers)
+            scheduling += time.perf_counter() - start
+            rounds += 1
+
+        sim.scheduler.assign = timed_assign
+        sim.step(SIM_MINUTES * 60 * 60)
+        print(f"{count:>8} {ripe:>7} {scheduling / rounds * 1000:>9.3f} {sim.helper_throughput():>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
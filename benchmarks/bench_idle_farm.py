@@ -0,0 +1,85 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import farm_grid
+from farm_core import FarmSimulation, FPS
+from farm_grid import CROPS, EMPTY, FarmGrid
+
+# Cost of a growth tick on a farm that is mostly ripe or empty, sweeping
+# the whole grid versus visiting only the growing crops, and the cost of
+# fast-forwarding such a farm while its helpers wait for crops to ripen.
+#
+#   python benchmarks/bench_idle_farm.py [size ...]
+
+SIZES = [100, 500, 1000, 2000]
+RIPE_DENSITY = 0.3
+GROWING_DENSITY = 0.002
+HELPERS = 5
+FAST_FORWARD_MINUTES = 10
+
+
+def make_sim(size, ripe_density=RIPE_DENSITY, seed=0):
+    sim = FarmSimulation(size, seed=seed)
+    rng = np.random.default_rng(seed)
+    types, growth = sim.grid.types, sim.grid.growth
+    draw = rng.random((size, size))
+    ripe = (draw < ripe_density) & (types == EMPTY)
+    growing = (draw > 1 - GROWING_DENSITY) & (types == EMPTY)
+    codes = [crop.code for crop in CROPS]
+    types[ripe] = rng.choice(codes, size=int(ripe.sum()))
+    growth[ripe] = 100
+    types[growing] = rng.choice(codes, size=int(growing.sum()))
+    growth[growing] = rng.integers(0, 100, size=int(growing.sum()))
+    sim.grid.reindex()
+    return sim
+
+
+def time_growth(sim, planes, ticks=20):
+    # Growth ticks starting from the same planes each run
+    types, growth = planes
+    sim.grid = FarmGrid(sim.grid_size, types=types.copy(), growth=growth.copy())
+    start = time.perf_counter()
+    for _ in range(ticks):
+        sim.grow_crops()
+    return (time.perf_counter() - start) / ticks * 1000
+
+
+def time_waiting_helpers(size, advance):
+    # A farm with nothing ripe yet: the helpers sit idle until a crop
+    # ripens, harvest it and wait again
+    sim = make_sim(size, ripe_density=0)
+    for _ in range(HELPERS):
+        sim.gold += sim.ai_helper_price
+        sim.buy_ai_helper()
+    start = time.perf_counter()
+    advance(sim, FAST_FORWARD_MINUTES * 60 * FPS)
+    return (time.perf_counter() - start) * 1000
+
+
+def main(sizes):
+    print(f"{'size':>6} {'growing':>8} {'sweep ms':>9} {'sparse ms':>10} {'speedup':>8}   per growth tick")
+    for size in sizes:
+        sim = make_sim(size)
+        growing = sim.grid.growing
+        planes = (sim.grid.types.copy(), sim.grid.growth.copy())
+        sparse = time_growth(sim, planes)
+        threshold = farm_grid.SPARSE_GROWTH
+        farm_grid.SPARSE_GROWTH = 0  # always sweep
+        sweep = time_growth(sim, planes)
+        farm_grid.SPARSE_GROWTH = threshold
+        print(f"{size:>6} {growing:>8} {sweep:>9.3f} {sparse:>10.3f} {sweep / sparse:>7.1f}x")
+
+    print(f"\n{'size':>6} {'step ms':>9} {'fast-forward ms':>16}   {FAST_FORWARD_MINUTES} minutes, {HELPERS} helpers")
+    for size in sizes:
+        stepped = time_waiting_helpers(size, FarmSimulation.step)
+        forwarded = time_waiting_helpers(size, FarmSimulation.fast_forward)
+        print(f"{size:>6} {stepped:>9.1f} {forwarded:>16.1f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
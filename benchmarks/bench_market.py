@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from farm_grid import CROPS
+from market import Market
+
+# Cost of merchant trades: orders per second for each order size, which
+# stays flat because an order is priced in O(1), and the cost of reading
+# the price history back out of the ring buffer.
+#
+#   python benchmarks/bench_market.py [order size ...]
+
+ORDER_SIZES = [1, 10, 100, 1000, 10000]
+ORDERS = 100000
+
+
+def time_orders(size, orders=ORDERS):
+    # Alternate selling and buying back so prices stay in range
+    market = Market({crop.name: crop.price for crop in CROPS})
+    crop = CROPS[0]
+    start = time.perf_counter()
+    for tick in range(0, orders, 2):
+        market.sell(crop, size, tick)
+        market.buy(crop, size, tick + 1, gold=10 ** 12)
+    return orders / (time.perf_counter() - start)
+
+
+def time_history(orders=ORDERS):
+    market = Market({crop.name: crop.price for crop in CROPS})
+    for tick in range(orders):
+        market.sell(CROPS[tick % len(CROPS)], 1, tick)
+    start = time.perf_counter()
+    for _ in range(100):
+        market.recent_trades(CROPS[0])
+    return (time.perf_counter() - start) / 100 * 1000, len(market.history)
+
+
+def main(sizes):
+    print(f"{'order size':>10} {'orders/s':>10} {'units/s':>14}")
+    for size in sizes:
+        rate = time_orders(size)
+        print(f"{size:>10} {rate:>10.0f} {rate * size:>14.0f}")
+    ms, kept = time_history()
+    print(f"\nprice history of one crop from the last {kept} trades: {ms:.3f} ms")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or ORDER_SIZES)
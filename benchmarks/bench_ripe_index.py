@@ -0,0 +1,62 @@
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from farm_grid import FarmGrid
+
+# Times nearest-ripe-crop queries through the ripe index against the full
+# grid scan ai_harvest used to do, for several farm sizes and ripe densities.
+#
+#   python benchmarks/bench_ripe_index.py
+
+SIZES = [20, 100, 500, 1000]
+DENSITIES = [0.001, 0.01, 0.1, 1.0]
+QUERIES = 200
+
+
+def make_grid(size, density, seed=0):
+    rng = np.random.default_rng(seed)
+    ripe = rng.random((size, size)) < density
+    grid = FarmGrid(size)
+    grid.types[ripe] = 3
+    grid.growth[ripe] = 100
+    grid.rebuild_ripe_index()
+    return grid
+
+
+def scan_nearest(grid, x, y):
+    ys, xs = np.nonzero(grid.ripe_mask())
+    if not len(xs):
+        return None
+    best = int(np.argmin(np.abs(xs - x) + np.abs(ys - y)))
+    return int(xs[best]), int(ys[best])
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{'size':>6} {'density':>8} {'ripe':>8} {'scan us':>10} {'index us':>10}")
+    for size in SIZES:
+        for density in DENSITIES:
+            grid = make_grid(size, density)
+            points = [(rng.randrange(size), rng.randrange(size)) for _ in range(QUERIES)]
+
+            start = time.perf_counter()
+            for x, y in points:
+                scan_nearest(grid, x, y)
+            scan_us = (time.perf_counter() - start) / QUERIES * 1e6
+
+            start = time.perf_counter()
+            for x, y in points:
+                grid.nearest_ripe(x, y)
+            index_us = (time.perf_counter() - start) / QUERIES * 1e6
+
+            print(f"{size:>6} {density:>8} {len(grid.ripe):>8} {scan_us:>10.1f} {index_us:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
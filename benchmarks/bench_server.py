@@ -0,0 +1,120 @@
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import net_protocol as proto
+from farm_core import FarmSimulation, FPS
+from server import FarmServer
+
+# A server on localhost with many bot clients walking around a busy farm:
+# bytes sent per client per second, server tick time, and how long it takes
+# from a client sending a step to seeing itself move (which includes
+# waiting out the player's move delay, up to MOVE_DELAY ticks).
+#
+#   python benchmarks/bench_server.py [clients ...]
+
+CLIENTS = [1, 10, 50]
+FARM_SIZE = 200
+HELPERS = 10
+SECONDS = 5
+
+
+class Bot:
+    # Walks back and forth, dragging out a work area now and then
+    def __init__(self, index):
+        self.index = index
+        self.position = None
+        self.bytes_received = 0
+        self.latencies = []
+        self._moved_at = None
+
+    async def run(self, port, stop):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        buffer = bytearray()
+        frame = 0
+        held = ''
+        reading = asyncio.ensure_future(self.read(reader, buffer))
+        while not stop.is_set():
+            frame += 1
+            direction = 'd' if frame // 240 % 2 == 0 else 'a'
+            events = []
+            if frame % 120 == self.index % 120 and self.position is not None:
+                events.append(('area', self.position[0] - 2, self.position[1] - 2, 5, 5))
+            if direction != held or events:
+                held = direction
+                if self._moved_at is None:
+                    self._moved_at = (time.perf_counter(), self.position)
+                writer.write(proto.input_message(held, events))
+            await asyncio.sleep(1 / FPS)
+        reading.cancel()
+        writer.close()
+
+    async def read(self, reader, buffer):
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                return
+            self.bytes_received += len(data)
+            buffer += data
+            for kind, payload in proto.split_frames(buffer):
+                if kind == proto.MSG_ENTITIES:
+                    position = proto.read_entities(payload)[0]
+                    if self._moved_at is not None and position != self._moved_at[1]:
+                        self.latencies.append(time.perf_counter() - self._moved_at[0])
+                        self._moved_at = None
+                    self.position = position
+
+
+def make_server():
+    sim = FarmSimulation(FARM_SIZE, seed=0)
+    sim.plant_field()
+    sim.gold = sim.ai_helper_price * HELPERS
+    for _ in range(HELPERS):
+        sim.buy_ai_helper()
+    return FarmServer(sim)
+
+
+async def run(clients):
+    server = make_server()
+    listener = await asyncio.start_server(server.handle, '127.0.0.1', 0)
+    port = listener.sockets[0].getsockname()[1]
+    ticking = asyncio.ensure_future(server.run_ticks())
+    stop = asyncio.Event()
+    bots = [Bot(i) for i in range(clients)]
+    running = [asyncio.ensure_future(bot.run(port, stop)) for bot in bots]
+
+    await asyncio.sleep(1)  # everyone connected and past their first full view
+    server.tick_times = []
+    received = sum(bot.bytes_received for bot in bots)
+    start = time.perf_counter()
+    await asyncio.sleep(SECONDS)
+    elapsed = time.perf_counter() - start
+    received = sum(bot.bytes_received for bot in bots) - received
+    tick_times = np.array(server.tick_times) * 1000
+
+    stop.set()
+    await asyncio.gather(*running)
+    ticking.cancel()
+    listener.close()
+
+    latencies = np.array([t for bot in bots for t in bot.latencies] or [0.0]) * 1000
+    print(f"{clients:>7} {received / elapsed / clients / 1024:>9.2f} {np.percentile(tick_times, 50):>8.2f}"
+          f" {np.percentile(tick_times, 99):>8.2f} {len(tick_times) / elapsed:>6.1f}"
+          f" {np.percentile(latencies, 50):>8.1f} {np.percentile(latencies, 99):>8.1f}")
+
+
+def main(counts):
+    print(f"{FARM_SIZE}x{FARM_SIZE} farm, {HELPERS} helpers, {SECONDS} s per run")
+    print(f"{'clients':>7} {'KB/s each':>9} {'tick p50':>8} {'tick p99':>8} {'ticks/s':>6}"
+          f" {'move p50':>8} {'move p99':>8}   (ms)")
+    for clients in counts:
+        asyncio.run(run(clients))
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or CLIENTS)
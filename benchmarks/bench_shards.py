@@ -0,0 +1,52 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from shards import FarmShards
+
+# How many farms the sharded pool keeps at 60 ticks per second: for each
+# worker count and number of farms, the slowest farm's tick rate, worker
+# load and the ticks dropped because a shard fell behind. Every farm is
+# planted and buys a helper with its starting gold, so there are crops
+# growing and a helper harvesting on each.
+#
+#   python benchmarks/bench_shards.py [farms ...]
+
+FARMS = [16, 64, 256, 1024]
+FARM_SIZE = 100
+SECONDS = 5
+
+
+def run(farms, workers):
+    with FarmShards(farms, FARM_SIZE, workers) as shards:
+        for farm in range(farms):
+            shards.call(farm, 'plant_field')
+            shards.call(farm, 'buy_ai_helper')
+        time.sleep(1)
+        before = shards.summary()
+        start = time.perf_counter()
+        time.sleep(SECONDS)
+        elapsed = time.perf_counter() - start
+        after = shards.summary()
+
+    rates = (np.array(after['ticks']) - np.array(before['ticks'])) / elapsed
+    busy = (np.array(after['busy']) - np.array(before['busy'])) / elapsed
+    print(f"{workers:>7} {farms:>6} {rates.min():>14.1f} {busy.mean():>9.0%} {busy.max():>9.0%}"
+          f" {after['dropped'] - before['dropped']:>8.0f}")
+
+
+def main(counts):
+    worker_counts = sorted({1, os.cpu_count()})
+    print(f"{FARM_SIZE}x{FARM_SIZE} farms, {SECONDS} s per run")
+    print(f"{'workers':>7} {'farms':>6} {'slowest tick/s':>14} {'load avg':>9} {'load max':>9} {'dropped':>8}")
+    for workers in worker_counts:
+        for farms in counts:
+            run(farms, workers)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or FARMS)
@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import Farmsim
+
+# Frame time of the UI layers (side panel plus each menu window) with the
+# static surfaces cached versus rebuilt every frame, as they used to be.
+#
+#   python benchmarks/bench_ui.py
+
+FRAMES = 300
+SCREENS = [None, 'main', 'sell', 'buy', 'shed']
+
+
+def draw_frame(game):
+    game.draw_ui()
+    if game.merchant_open:
+        if game.merchant_menu == 'shed':
+            game.draw_shed_window()
+        else:
+            game.draw_merchant_window()
+
+
+def time_frames(game, cached):
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        if not cached:
+            game.invalidate_ui_cache()
+        # Change one dynamic value every 10 frames
+        game.gold = 200 + frame // 10
+        draw_frame(game)
+    return (time.perf_counter() - start) / FRAMES * 1000
+
+
+def main():
+    game = Farmsim.FarmGame(resume=False, saves=False)
+    game.open_display()
+    print(f"{'screen':>8} {'uncached ms':>12} {'cached ms':>10}")
+    for screen in SCREENS:
+        game.merchant_open = screen is not None
+        game.merchant_menu = screen or 'main'
+        uncached = time_frames(game, cached=False)
+        cached = time_frames(game, cached=True)
+        print(f"{screen or 'panel':>8} {uncached:>12.3f} {cached:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pygame
+
+import Farmsim
+from farm_core import FarmSimulation
+from farm_grid import CROPS, EMPTY, FarmGrid
+from scheduler import AIHelper
+
+# Benchmark suite for the simulation and rendering hot paths, run on the
+# dummy SDL video driver so it needs no display. Every case runs on farms of
+# each size and crop density and records mean/p50/p99 milliseconds per call
+# to a JSON file named after the current commit. Pass an earlier file with
+# --compare to see what got faster or slower.
+#
+#   python benchmarks/suite.py
+#   python benchmarks/suite.py --quick --compare benchmarks/results/abc1234.json
+
+SIZES = [20, 100, 500, 1000]
+DENSITIES = [0.05, 0.5]
+HELPERS = 10
+SAMPLES = 200
+SEED = 0
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+REGRESSION = 1.10  # slower than the baseline by more than this is flagged
+
+
+def make_game(game, size, density, seed=SEED):
+    # Put a new farm of the given size and crop density into game; returns
+    # (state, types, growth) for restore()
+    sim = FarmSimulation(size, seed=seed)
+    rng = np.random.default_rng(seed)
+    types, growth = sim.grid.types, sim.grid.growth
+    crops = (rng.random((size, size)) < density) & (types == EMPTY)
+    types[crops] = rng.choice([crop.code for crop in CROPS], size=int(crops.sum()))
+    growth[crops] = rng.integers(0, 101, size=int(crops.sum()))
+    for _ in range(HELPERS):
+        sim.helpers.append(AIHelper(*sim.helper_spawn))
+    saved = (sim.get_state(), types.copy(), growth.copy())
+    restore(game, saved)
+    return saved
+
+
+def restore(game, saved):
+    # Back to the farm as make_game() left it
+    state, types, growth = saved
+    height, width = types.shape
+    game.set_state(state, FarmGrid(width, height, types=types.copy(), growth=growth.copy()))
+
+
+def timed(samples, func, setup=None):
+    # Milliseconds per call of func(), with setup() run untimed before each
+    times = np.empty(samples)
+    for i in range(samples):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times[i] = time.perf_counter() - start
+    return times * 1000
+
+
+def bench_grow_crops(game, saved, samples):
+    # A growth tick on a freshly loaded farm, so crops are still growing
+    return timed(samples, game.grow_crops, lambda: restore(game, saved))
+
+
+def bench_ai_harvest(game, saved, samples):
+    # Helper rounds as the farm plays out: scheduling, paths, harvests
+    return timed(samples, game.ai_harvest)
+
+
+def bench_handle_click(game, saved, samples):
+    # Click each cell around the player: harvests ripe crops, plants empty
+    # cells. The neighbourhood is reset to ripe crops and empty cells first.
+    neighbours = [(dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dx or dy]
+    cell = [0]
+
+    def setup():
+        dx, dy = neighbours[cell[0] % len(neighbours)]
+        x, y = game.player_x + dx, game.player_y + dy
+        if 0 <= x < game.grid_size and 0 <= y < game.grid_size and game.grid.code_at(x, y) not in (
+                Farmsim.MERCHANT, Farmsim.SHED):
+            if cell[0] % 2:
+                game.grid.set(x, y, CROPS[0].code, 100)
+            else:
+                game.grid.clear(x, y)
+        cell[0] += 1
+        click[:] = [(x - game.camera_x) * Farmsim.CELL_SIZE + 1, (y - game.camera_y) * Farmsim.CELL_SIZE + 1]
+
+    click = [0, 0]
+    return timed(samples, lambda: game.handle_click(*click), setup)
+
+
+def bench_draw_grid(game, saved, samples):
+    # Redraw after one growth tick, the usual per-second change on screen
+    game.draw()
+    return timed(samples, game.draw_grid, game.grow_crops)
+
+
+def bench_frame(game, saved, samples):
+    # Whole frames as in run() minus the frame limiter: input, simulation,
+    # drawing and flip, with the player walking back and forth so the view
+    # scrolls on big farms
+    frame = [0]
+
+    def one_frame():
+        events, _ = game.poll_input()
+        held = 'd' if frame[0] // 240 % 2 == 0 else 'a'
+        frame[0] += 1
+        game.frame(events, held)
+
+    return timed(samples, one_frame)
+
+
+CASES = {
+    'grow_crops': bench_grow_crops,
+    'ai_harvest': bench_ai_harvest,
+    'handle_click': bench_handle_click,
+    'draw_grid': bench_draw_grid,
+    'frame': bench_frame,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run_suite(sizes, densities, cases, samples):
+    game = Farmsim.FarmGame(resume=False, saves=False)
+    game.open_display()
+    results = []
+    for size in sizes:
+        for density in densities:
+            saved = make_game(game, size, density)
+            for name in cases:
+                restore(game, saved)
+                times = CASES[name](game, saved, samples)
+                result = {
+                    'case': name,
+                    'size': size,
+                    'density': density,
+                    'samples': samples,
+                    'mean_ms': float(times.mean()),
+                    'p50_ms': float(np.percentile(times, 50)),
+                    'p99_ms': float(np.percentile(times, 99)),
+                }
+                results.append(result)
+                print(f"{name:>13} {size:>6} {density:>8.2f} {result['mean_ms']:>9.3f} {result['p50_ms']:>9.3f}"
+                      f" {result['p99_ms']:>9.3f}")
+                sys.stdout.flush()
+    return results
+
+
+def compare(baseline, results):
+    # Print current p50 against the baseline's for every case in both
+    old = {(r['case'], r['size'], r['density']): r for r in baseline['results']}
+    print(f"\nagainst {baseline['commit']}: p50 ms, ratio > 1 is slower")
+    print(f"{'case':>13} {'size':>6} {'density':>8} {'before':>9} {'after':>9} {'ratio':>7}")
+    regressions = 0
+    for result in results:
+        before = old.get((result['case'], result['size'], result['density']))
+        if before is None:
+            continue
+        ratio = result['p50_ms'] / max(before['p50_ms'], 1e-9)
+        flag = '  slower' if ratio > REGRESSION else ''
+        regressions += bool(flag)
+        print(f"{result['case']:>13} {result['size']:>6} {result['density']:>8.2f} {before['p50_ms']:>9.3f}"
+              f" {result['p50_ms']:>9.3f} {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark simulation and rendering hot paths.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--densities', type=float, nargs='+', default=DENSITIES)
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES))
+    parser.add_argument('--samples', type=int, default=SAMPLES, help=f"calls timed per case (default {SAMPLES})")
+    parser.add_argument('--quick', action='store_true', help="a quarter of the samples, for a rough check")
+    parser.add_argument('--output', help="results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', metavar='BASELINE', help="results file of an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    samples = max(10, args.samples // 4) if args.quick else args.samples
+    commit = git_commit()
+    print(f"{'case':>13} {'size':>6} {'density':>8} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    results = run_suite(args.sizes, args.densities, args.cases, samples)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'commit': commit,
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pygame': pygame.version.ver,
+            'machine': platform.platform(),
+            'results': results,
+        }, f, indent=1)
+    print(f"results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            return 1 if compare(json.load(f), results) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,450 @@
+import json
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from farm_grid import (FarmGrid, BLOCKS_HELPERS, CELL_CODES, CELL_TYPES, EMPTY, GROWTH_RATES, IS_CROP,
+                       growth_rate_table, type_remap_table)
+from savegame import AUTOSAVE_INTERVAL, catch_up_offline, read_snapshot, write_snapshot
+
+# A farm split into square chunks, each a small FarmGrid. Chunks are only
+# created when something touches them, and at most max_loaded of them are
+# kept in memory; the least recently used one is written to disk to make
+# room for the next. Memory use stays the same however big the farm is.
+#
+# Growth is tracked as a world-wide count of growth ticks. Each chunk
+# remembers how far it has been grown and catches up in one grow() call
+# when it is next read, so chunks on disk cost nothing until someone looks
+# at them again. Loaded chunks off screen are only caught up every
+# COARSE_INTERVAL growth ticks. Either way the cells end up exactly as if
+# every chunk had grown on every tick.
+#
+# Helpers still have to find crops in chunks that are on disk. When a chunk
+# leaves memory the world notes the growth tick each of its crops ripens
+# on (see Ripening), so ripe counts and nearest-crop searches cover every
+# chunk, and a search loads a stored chunk only when it may hold the
+# answer. The chunks helpers stand in and are heading for are kept loaded.
+
+CHUNK_SIZE = 64
+MAX_LOADED_CHUNKS = 256  # 2 MB of cell planes at 64x64 cells per chunk
+COARSE_INTERVAL = 30  # growth ticks between catch-up passes over loaded chunks
+WORLD_FILE = 'world.json'
+
+
+class Chunk:
+    def __init__(self, grid, synced):
+        self.grid = grid
+        self.synced = synced  # world growth tick this chunk has been grown to
+        self.dirty = False  # changed since it was last written to disk
+
+
+class Ripening:
+    # When the crops of a chunk on disk ripen: ripe[i] of them are ripe by
+    # world growth tick ticks[i]. Crops planted together ripen together, so
+    # there are usually only a few distinct ticks.
+    def __init__(self, ticks, ripe, crops):
+        self.ticks = np.asarray(ticks, dtype=np.int64)
+        self.ripe = np.asarray(ripe, dtype=np.int64)
+        self.crops = crops  # ripe or growing
+
+    @classmethod
+    def of(cls, chunk, rate_lut):
+        grid = chunk.grid
+        crops = IS_CROP[grid.types]
+        growth = grid.growth[crops].astype(np.int64)
+        rates = rate_lut.take(grid.types[crops]).astype(np.int64)
+        ripe = growth >= 100
+        moving = ~ripe & (rates > 0)  # crops that never grow never ripen
+        ticks = np.concatenate((np.zeros(np.count_nonzero(ripe), dtype=np.int64),
+                                chunk.synced - (growth[moving] - 100) // rates[moving]))
+        ticks, counts = np.unique(ticks, return_counts=True)
+        return cls(ticks, np.cumsum(counts), int(np.count_nonzero(crops)))
+
+    def ripe_at(self, tick):
+        i = int(np.searchsorted(self.ticks, tick, side='right'))
+        return int(self.ripe[i - 1]) if i else 0
+
+    def to_json(self):
+        return {'ticks': self.ticks.tolist(), 'ripe': self.ripe.tolist(), 'crops': self.crops}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data['ticks'], data['ripe'], data['crops'])
+
+
+class WorldRipe:
+    # Stands in for FarmGrid.ripe: ripe crops anywhere in the world
+    def __init__(self, world):
+        self.world = world
+
+    def __len__(self):
+        world = self.world
+        loaded = sum(len(chunk.grid.ripe) for chunk in world.synced_chunks())
+        return loaded + sum(ripening.ripe_at(world.growth_ticks) for ripening in world.on_disk.values())
+
+    def __contains__(self, cell):
+        return bool(self.world.is_ripe(*cell))
+
+
+class ChunkedWorld:
+    # Same interface as FarmGrid as far as the simulation is concerned,
+    # in world coordinates. Cell planes are not exposed; use code_at(),
+    # growth_at() and region() instead.
+    def __init__(self, directory, width, height=None, chunk_size=CHUNK_SIZE, max_loaded=MAX_LOADED_CHUNKS):
+        if height is None:
+            height = width
+        self.directory = directory
+        self.width = width
+        self.height = height
+        self.chunk_size = chunk_size
+        self.max_loaded = max_loaded
+
+        self.chunks = OrderedDict()  # (cx, cy) -> Chunk, least recently used first
+        self.stored = set()  # chunks with a file in directory
+        self.on_disk = {}  # (cx, cy) -> Ripening, for stored chunks not loaded
+        self.pinned = set()  # chunks never evicted (see keep_loaded())
+        self.growth_ticks = 0
+        self.coarse_synced = 0
+        self.rate_lut = growth_rate_table(GROWTH_RATES)
+        self.ripe = WorldRipe(self)
+
+        # Cells that block helpers, kept for the whole world so pathfinding
+        # never has to load a chunk just to check a cell
+        self.blocking = set()
+        self.layout_version = 0
+
+        # Counters for benchmarks
+        self.chunks_loaded = 0
+        self.chunks_evicted = 0
+
+    @classmethod
+    def load(cls, directory, meta, max_loaded=MAX_LOADED_CHUNKS):
+        # Reopen a world from the metadata written by get_meta()
+        world = cls(directory, meta['width'], meta['height'], meta['chunk_size'], max_loaded)
+        world.growth_ticks = world.coarse_synced = meta['growth_ticks']
+        world.stored = {tuple(key) for key in meta['chunks']}
+        world.on_disk = {tuple(entry['chunk']): Ripening.from_json(entry) for entry in meta['ripening']}
+        world.blocking = {tuple(cell) for cell in meta['blocking']}
+        return world
+
+    def get_meta(self):
+        return {
+            'width': self.width,
+            'height': self.height,
+            'chunk_size': self.chunk_size,
+            'growth_ticks': self.growth_ticks,
+            'chunks': sorted(list(key) for key in self.stored),
+            'ripening': [dict(self._ripening(key).to_json(), chunk=list(key)) for key in sorted(self.stored)],
+            'blocking': sorted(list(cell) for cell in self.blocking),
+        }
+
+    @property
+    def growing(self):
+        loaded = sum(chunk.grid.growing for chunk in self.synced_chunks())
+        return loaded + sum(ripening.crops - ripening.ripe_at(self.growth_ticks)
+                            for ripening in self.on_disk.values())
+
+    @property
+    def nbytes(self):
+        return sum(chunk.grid.nbytes for chunk in self.chunks.values())
+
+    def chunk_path(self, cx, cy):
+        return os.path.join(self.directory, f"{cx}_{cy}.chunk")
+
+    def chunk(self, cx, cy):
+        # The chunk at chunk coordinates (cx, cy), loaded or created as
+        # needed and grown up to the current tick
+        key = (cx, cy)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self._load_chunk(cx, cy)
+            self.chunks[key] = chunk
+            self._make_room(key)
+        else:
+            self.chunks.move_to_end(key)
+        self._sync(chunk)
+        return chunk
+
+    def _make_room(self, loading):
+        # Evict least recently used chunks down to max_loaded, sparing the
+        # pinned ones; with more pinned than that, the world goes over
+        for key in [key for key in self.chunks if key not in self.pinned and key != loading]:
+            if len(self.chunks) <= self.max_loaded:
+                break
+            self._evict(key, self.chunks.pop(key))
+
+    def keep_loaded(self, cells):
+        # Pin the chunks holding these cells, replacing the last pins
+        size = self.chunk_size
+        self.pinned = {(x // size, y // size) for x, y in cells}
+
+    def _load_chunk(self, cx, cy):
+        size = self.chunk_size
+        self.on_disk.pop((cx, cy), None)
+        if (cx, cy) in self.stored:
+            state, types, growth = read_snapshot(self.chunk_path(cx, cy), mmap=False)
+            remap = type_remap_table(state['cell_types'])
+            if remap is not None:
+                types = remap.take(types)
+            self.chunks_loaded += 1
+            return Chunk(FarmGrid(size, size, types=types, growth=growth), state['synced'])
+        return Chunk(FarmGrid(size), self.growth_ticks)
+
+    def _evict(self, key, chunk):
+        # Chunks nobody changed since they were last written are dropped
+        if chunk.dirty:
+            self._write_chunk(key, chunk)
+        if key in self.stored:
+            self.on_disk[key] = Ripening.of(chunk, self.rate_lut)
+        self.chunks_evicted += 1
+
+    def _ripening(self, key):
+        # Ripening of a stored chunk, whether it is on disk or loaded
+        if key in self.on_disk:
+            return self.on_disk[key]
+        return Ripening.of(self.chunks[key], self.rate_lut)
+
+    def _write_chunk(self, key, chunk):
+        os.makedirs(self.directory, exist_ok=True)
+        meta = {'chunk': list(key), 'synced': chunk.synced, 'cell_types': CELL_TYPES}
+        write_snapshot(self.chunk_path(*key), meta, chunk.grid.types, chunk.grid.growth)
+        self.stored.add(key)
+        chunk.dirty = False
+
+    def _sync(self, chunk):
+        behind = self.growth_ticks - chunk.synced
+        if behind:
+            if behind > 0 and chunk.grid.growing:
+                chunk.grid.grow(self.rate_lut, behind)
+                chunk.dirty = True
+            chunk.synced = self.growth_ticks
+
+    def synced_chunks(self):
+        # The loaded chunks, each caught up to the current growth tick first
+        # so counts taken from them are current
+        for chunk in self.chunks.values():
+            self._sync(chunk)
+            yield chunk
+
+    def flush(self):
+        # Write every changed chunk that is still in memory
+        for key, chunk in self.chunks.items():
+            self._sync(chunk)
+            if chunk.dirty:
+                self._write_chunk(key, chunk)
+
+    def _locate(self, x, y):
+        size = self.chunk_size
+        return self.chunk(x // size, y // size), x % size, y % size
+
+    def type_at(self, x, y):
+        return CELL_TYPES[self.code_at(x, y)]
+
+    def code_at(self, x, y):
+        chunk, lx, ly = self._locate(x, y)
+        return chunk.grid.types[ly, lx]
+
+    def growth_at(self, x, y):
+        chunk, lx, ly = self._locate(x, y)
+        return chunk.grid.growth[ly, lx]
+
+    def set(self, x, y, cell_type, growth=0):
+        if isinstance(cell_type, str):
+            cell_type = CELL_CODES[cell_type]
+        chunk, lx, ly = self._locate(x, y)
+        chunk.grid.set(lx, ly, cell_type, growth)
+        chunk.dirty = True
+
+        blocks = bool(BLOCKS_HELPERS[cell_type])
+        if blocks != ((x, y) in self.blocking):
+            if blocks:
+                self.blocking.add((x, y))
+            else:
+                self.blocking.discard((x, y))
+            self.layout_version += 1
+
+    def clear(self, x, y):
+        self.set(x, y, EMPTY, 0)
+
+    def _chunks_in(self, x, y, width, height, create):
+        # (chunk, local rectangle, offset into the rectangle) for each chunk
+        # a rectangle overlaps. Without create, chunks nobody has touched
+        # yet are skipped.
+        size = self.chunk_size
+        for cy in range(y // size, (y + height - 1) // size + 1):
+            for cx in range(x // size, (x + width - 1) // size + 1):
+                if not create and (cx, cy) not in self.chunks and (cx, cy) not in self.stored:
+                    continue
+                x0, y0 = cx * size, cy * size
+                left, top = max(x, x0), max(y, y0)
+                right, bottom = min(x + width, x0 + size), min(y + height, y0 + size)
+                yield self.chunk(cx, cy), left - x0, top - y0, right - left, bottom - top, left - x, top - y
+
+    def harvest_area(self, x, y, width, height):
+        # Chunks nobody has touched have nothing to harvest
+        counts = np.zeros(256, dtype=np.int64)
+        for chunk, lx, ly, w, h, _, _ in self._chunks_in(x, y, width, height, False):
+            harvested = chunk.grid.harvest_area(lx, ly, w, h)
+            if harvested.any():
+                counts += harvested
+                chunk.dirty = True
+        return counts
+
+    def plant_area(self, x, y, width, height, pick):
+        # Crops are picked for the whole rectangle at once, in its row
+        # order, so a chunked world plants the same crops a FarmGrid would.
+        # Creates every chunk in the rectangle; keep rectangles on huge
+        # worlds to a sensible size
+        types, _ = self.region(x, y, width, height)
+        empty = types == EMPTY
+        planted = int(np.count_nonzero(empty))
+        if planted == 0:
+            return 0
+        types[empty] = pick(planted)
+        for chunk, lx, ly, w, h, rx, ry in self._chunks_in(x, y, width, height, True):
+            crops = types[ry:ry + h, rx:rx + w][empty[ry:ry + h, rx:rx + w]]
+            if chunk.grid.plant_area(lx, ly, w, h, lambda n: crops):
+                chunk.dirty = True
+        return planted
+
+    def is_passable(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height and (x, y) not in self.blocking
+
+    def is_ripe(self, x, y):
+        chunk, lx, ly = self._locate(x, y)
+        return chunk.grid.is_ripe(lx, ly)
+
+    def grow(self, rate_lut, steps=1):
+        if steps <= 0:
+            return
+        self.rate_lut = rate_lut
+        self.growth_ticks += steps
+        if self.growth_ticks - self.coarse_synced >= COARSE_INTERVAL:
+            self.coarse_synced = self.growth_ticks
+            for chunk in self.chunks.values():
+                self._sync(chunk)
+
+    def next_ripening(self, rate_lut):
+        # Growth ticks until a crop in the loaded chunks ripens, or None
+        soonest = None
+        for chunk in self.chunks.values():
+            self._sync(chunk)
+            ticks = chunk.grid.next_ripening(rate_lut)
+            if ticks is not None and (soonest is None or ticks < soonest):
+                soonest = ticks
+        return soonest
+
+    def region(self, x, y, width, height):
+        # (types, growth) of a rectangle of cells, copied out of the chunks
+        # it overlaps; no other chunk is touched
+        types = np.zeros((height, width), dtype=np.uint8)
+        growth = np.zeros((height, width), dtype=np.uint8)
+        size = self.chunk_size
+        for cy in range(y // size, (y + height - 1) // size + 1):
+            for cx in range(x // size, (x + width - 1) // size + 1):
+                chunk = self.chunk(cx, cy)
+                x0, y0 = cx * size, cy * size
+                left, top = max(x, x0), max(y, y0)
+                right, bottom = min(x + width, x0 + size), min(y + height, y0 + size)
+                types[top - y:bottom - y, left - x:right - x] = chunk.grid.types[top - y0:bottom - y0, left - x0:right - x0]
+                growth[top - y:bottom - y, left - x:right - x] = chunk.grid.growth[top - y0:bottom - y0, left - x0:right - x0]
+        return types, growth
+
+    def nearest_ripe(self, x, y, exclude=None):
+        # Nearest ripe crop anywhere in the world, same distance and
+        # tie-breaking as FarmGrid.nearest_ripe. Chunks are visited closest
+        # first and the search stops once no chunk can hold anything closer.
+        # Loaded chunks are searched as they are; a chunk on disk is only
+        # loaded if it has ripe crops by now and might beat the best so far.
+        size = self.chunk_size
+        candidates = []
+        keys = list(self.chunks)
+        keys += [key for key, ripening in self.on_disk.items() if ripening.ripe_at(self.growth_ticks)]
+        for cx, cy in keys:
+            x0, y0 = cx * size, cy * size
+            dx = max(x0 - x, 0, x - (x0 + size - 1))
+            dy = max(y0 - y, 0, y - (y0 + size - 1))
+            candidates.append((dx + dy, cy, cx))
+        candidates.sort()
+
+        best = None
+        for lower, cy, cx in candidates:
+            if best is not None and lower > best[0]:
+                break
+            chunk = self.chunks.get((cx, cy))
+            if chunk is None:
+                chunk = self.chunk(cx, cy)
+            self._sync(chunk)
+            if not len(chunk.grid.ripe):
+                continue
+
+            # Searching from the closest cell inside the chunk finds the
+            # same crop: every cell in it is the same extra distance away
+            x0, y0 = cx * size, cy * size
+            local_x = min(max(x - x0, 0), size - 1)
+            local_y = min(max(y - y0, 0), size - 1)
+            local_exclude = None
+            if exclude:
+                local_exclude = {(ex - x0, ey - y0) for ex, ey in exclude
+                                 if x0 <= ex < x0 + size and y0 <= ey < y0 + size}
+            found = chunk.grid.nearest_ripe(local_x, local_y, local_exclude)
+            if found is None:
+                continue
+            found_x, found_y = found[0] + x0, found[1] + y0
+            candidate = (abs(found_x - x) + abs(found_y - y), found_y, found_x)
+            if best is None or candidate < best:
+                best = candidate
+
+        if best is None:
+            return None
+        return best[2], best[1]
+
+
+def save_world(sim):
+    # Write the changed chunks, then the sim state and world metadata.
+    # Chunks swapped out between saves are already on disk.
+    world = sim.grid
+    world.flush()
+    state = sim.get_state()
+    state['saved_at'] = time.time()
+    path = os.path.join(world.directory, WORLD_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump({'world': world.get_meta(), 'state': state}, f)
+    os.replace(path + '.tmp', path)
+
+
+def load_world(sim, directory, catch_up=False, max_loaded=MAX_LOADED_CHUNKS):
+    # Restore sim from a world directory; returns the saved state dict
+    with open(os.path.join(directory, WORLD_FILE)) as f:
+        saved = json.load(f)
+    state = saved['state']
+    sim.set_state(state, ChunkedWorld.load(directory, saved['world'], max_loaded))
+    sim.grid.rate_lut = sim.growth_rate_lut
+    if catch_up:
+        catch_up_offline(sim, state)
+    return state
+
+
+class WorldSaver:
+    # Autosaver for chunked worlds. Only changed chunks are written and
+    # there are never many of them in memory, so saves run inline.
+    def __init__(self, interval_ticks=AUTOSAVE_INTERVAL):
+        self.interval_ticks = interval_ticks
+        self.last_save_tick = None
+        self.saves_written = 0
+
+    def maybe_save(self, sim):
+        if self.last_save_tick is None:
+            self.last_save_tick = sim.ticks
+        elif sim.ticks - self.last_save_tick >= self.interval_ticks:
+            self.save(sim)
+
+    def save(self, sim):
+        save_world(sim)
+        self.last_save_tick = sim.ticks
+        self.saves_written += 1
+
+    def close(self):
+        pass
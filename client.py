@@ -0,0 +1,204 @@
+import argparse
+import socket
+
+import numpy as np
+import pygame
+
+import net_protocol as proto
+from Farmsim import CELL_SIZE, FarmGame, LIGHT_PURPLE
+from farm_grid import type_remap_table
+from scheduler import AIHelper
+from server import DEFAULT_PORT
+
+# Thin client for server.py. The server runs the farm; this only sends the
+# player's input and draws what the server says is in view, reusing
+# FarmGame's window, renderer and menus. Escape (outside a menu) and F3 are
+# handled locally.
+#
+#   python client.py [host] [port]
+
+RECV_SIZE = 65536
+
+
+class ViewGrid:
+    # The part of the farm the server has sent: a window of cells at origin
+    # with the grid.region() interface GridRenderer draws from. width and
+    # height are the whole farm's, for the camera.
+    def __init__(self, width, height, cols, rows):
+        self.width = width
+        self.height = height
+        self.origin = (0, 0)
+        self.types = np.zeros((rows, cols), dtype=np.uint8)
+        self.growth = np.zeros((rows, cols), dtype=np.uint8)
+
+    def region(self, x, y, width, height):
+        left, top = x - self.origin[0], y - self.origin[1]
+        return self.types[top:top + height, left:left + width], self.growth[top:top + height, left:left + width]
+
+
+class FarmClient(FarmGame):
+    def __init__(self, host, port):
+        self.sock = socket.create_connection((host, port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.buffer = bytearray()
+        self.view_origin = (0, 0)
+        info = self.wait_for_welcome()
+
+        super().__init__(resume=False, saves=False)
+        self.player_id = info['player']
+        self.crop_items = info['crops']
+        self.crop_prices = info['crop_prices']
+        self.ai_helper_price = info['ai_helper_price']
+        self.remap = type_remap_table(info['cell_types'])
+        cols, rows = info['view']
+        self.grid = ViewGrid(info['width'], info['height'], cols, rows)
+        self.grid_size = info['width']
+        self.other_players = []
+        self.helpers_owned = 0
+        self.prices = {}
+        self.sent_held = ''
+        self.connected = True
+        self.sock.setblocking(False)
+        self.invalidate_ui_cache()
+        self.reset_view()
+
+    def wait_for_welcome(self):
+        while True:
+            data = self.sock.recv(RECV_SIZE)
+            if not data:
+                raise ConnectionError("server closed the connection")
+            self.buffer += data
+            messages = proto.split_frames(self.buffer)
+            if messages:
+                kind, payload = messages[0]
+                if kind != proto.MSG_WELCOME:
+                    raise proto.ProtocolError(f"expected a welcome, got message type {kind}")
+                # Anything after the welcome is handled by the first frame
+                self.pending = messages[1:]
+                return proto.read_welcome(payload)
+
+    def update_camera(self):
+        # The server decides what is in view
+        self.camera_x, self.camera_y = self.view_origin
+
+    def crop_price(self, crop):
+        # Market prices come from the server
+        return self.prices.get(crop.item, 0)
+
+    def helper_count(self):
+        # Only helpers in view are sent, so the total comes separately
+        return self.helpers_owned
+
+    def receive(self):
+        # Apply everything the server has sent since the last frame;
+        # returns False once the connection is gone
+        messages, self.pending = self.pending, []
+        while self.connected:
+            try:
+                data = self.sock.recv(RECV_SIZE)
+            except BlockingIOError:
+                break
+            except ConnectionError:
+                data = b''
+            if not data:
+                self.connected = False
+                break
+            self.buffer += data
+        messages += proto.split_frames(self.buffer)
+        for kind, payload in messages:
+            self.apply_message(kind, payload)
+        return self.connected
+
+    def apply_message(self, kind, payload):
+        if kind == proto.MSG_VIEW:
+            origin, types, growth = proto.read_view(payload)
+            if self.remap is not None:
+                types = self.remap.take(types)
+            self.grid.origin = self.view_origin = origin
+            self.grid.types[...] = types
+            self.grid.growth[...] = growth
+            self.update_camera()
+        elif kind == proto.MSG_CELLS:
+            records = proto.read_cells(payload)
+            types = records['type']
+            if self.remap is not None:
+                types = self.remap.take(types)
+            self.grid.types.reshape(-1)[records['index']] = types
+            self.grid.growth.reshape(-1)[records['index']] = records['growth']
+        elif kind == proto.MSG_ENTITIES:
+            (self.player_x, self.player_y), self.other_players, helpers = proto.read_entities(payload)
+            self.helpers = [AIHelper(x, y) for x, y in helpers]
+        elif kind == proto.MSG_ECONOMY:
+            values = proto.read_economy(payload)
+            self.gold, self.helpers_owned, merchant_open, menu = values[:4]
+            self.merchant_open = bool(merchant_open)
+            self.merchant_menu = proto.MENUS[menu]
+            count = len(self.crop_items)
+            self.inventory = dict(zip(self.crop_items, values[4:4 + count]))
+            self.shed_storage = dict(zip(self.crop_items, values[4 + count:4 + 2 * count]))
+            self.prices = {item: cents / 100 for item, cents in zip(self.crop_items, values[4 + 2 * count:])}
+        else:
+            raise proto.ProtocolError(f"unexpected message type {kind}")
+
+    def apply_input(self, events, held):
+        # Send this frame's input to the server in farm cells; returns False
+        # once the player has asked to quit
+        running = True
+        outgoing = []
+        for event in events:
+            if event[0] == 'quit':
+                running = False
+            elif event[0] == 'key':
+                if event[1] == 'f3':
+                    self.show_profiler = not self.show_profiler
+                elif event[1] == 'escape' and not self.merchant_open:
+                    running = False
+                else:
+                    outgoing.append(event)
+            elif event[0] == 'click' and event[1] == 1:
+                cell = self.screen_cell(event[2], event[3])
+                if cell is not None:
+                    outgoing.append(('click', 1) + cell)
+            elif event[0] == 'area':
+                area = self.screen_area(*event[1:])
+                if area is not None:
+                    outgoing.append(('area',) + area)
+        if outgoing or held != self.sent_held:
+            try:
+                self.sock.sendall(proto.input_message(held, outgoing))
+            except (BlockingIOError, ConnectionError):
+                self.connected = False
+            self.sent_held = held
+        self.profiler.lap('input')
+        return running
+
+    def frame(self, events, held, draw=True):
+        running = self.apply_input(events, held)
+        running = self.receive() and running
+        self.profiler.lap('sim')
+        if draw:
+            self.draw()
+            pygame.display.flip()
+            self.profiler.lap('flip')
+        self.profiler.end_frame(self.ticks)
+        return running
+
+    def draw_grid(self):
+        super().draw_grid()
+        # Other players in view
+        for player_id, x, y in self.other_players:
+            screen_x = (x - self.camera_x) * CELL_SIZE
+            screen_y = (y - self.camera_y) * CELL_SIZE
+            rect = pygame.Rect(screen_x + 5, screen_y + 5, CELL_SIZE - 10, CELL_SIZE - 10)
+            pygame.draw.rect(self.screen, LIGHT_PURPLE, rect, 3)
+            text = self.grid_renderer.glyph(str(player_id % 10), LIGHT_PURPLE, self.title_font)
+            self.screen.blit(text, text.get_rect(center=(screen_x + CELL_SIZE // 2, screen_y + CELL_SIZE // 2)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play on a farm hosted by server.py")
+    parser.add_argument('host', nargs='?', default='127.0.0.1')
+    parser.add_argument('port', nargs='?', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    FarmClient(args.host, args.port).run()
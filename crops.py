@@ -0,0 +1,80 @@
+import json
+import os
+
+# Crop catalogue. Every crop's growth rate, sell price, colours and symbol
+# come from a JSON file (crops.json next to this module, or the file named
+# by the FARM_CROPS environment variable), so adding a crop needs no code.
+#
+#   name        cell type name, e.g. "turnip"
+#   item        inventory / shed key, e.g. "turnips"
+#   growth_rate growth percentage gained per growth tick
+#   price       gold paid per item
+#   symbol      letter drawn on ripe crops; also the key that sells or
+#               withdraws the crop in menus
+#   color_ramp  cell colour at 0% and at 100% growth
+#   ui_color    colour of the crop's line in the side panel and menus
+
+CROPS_PATH = os.environ.get('FARM_CROPS', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crops.json'))
+
+MAX_CROPS = 200  # type codes are uint8 and shared with the non-crop cells
+
+
+class CropConfigError(ValueError):
+    pass
+
+
+class Crop:
+    def __init__(self, name, item, growth_rate, price, symbol, color_ramp, ui_color):
+        self.name = name
+        self.item = item
+        self.growth_rate = growth_rate
+        self.price = price
+        self.symbol = symbol
+        self.ui_color = tuple(ui_color)
+        self.code = None  # type code, assigned by farm_grid
+
+        # Cell colour for every growth percentage, worked out once
+        low, high = color_ramp
+        self.colors = [tuple(lo + int((hi - lo) * growth / 100) for lo, hi in zip(low, high))
+                       for growth in range(101)]
+
+    @property
+    def label(self):
+        # "Turnips", for inventory lines
+        return self.item.capitalize()
+
+    @property
+    def singular(self):
+        # "Turnip", for prices
+        return self.name.capitalize()
+
+
+def load_crops(path=CROPS_PATH):
+    try:
+        with open(path) as f:
+            entries = json.load(f)['crops']
+    except (OSError, ValueError, KeyError) as e:
+        raise CropConfigError(f"{path}: can't read crop catalogue ({e})")
+
+    crops = []
+    for entry in entries:
+        try:
+            crop = Crop(entry['name'], entry['item'], int(entry['growth_rate']), int(entry['price']),
+                        entry['symbol'], entry['color_ramp'], entry['ui_color'])
+        except (KeyError, TypeError, ValueError) as e:
+            raise CropConfigError(f"{path}: bad crop entry {entry!r} ({e})")
+        if len(crop.symbol) != 1:
+            raise CropConfigError(f"{path}: {crop.name} symbol must be a single character")
+        if not 0 <= crop.growth_rate <= 100:
+            raise CropConfigError(f"{path}: {crop.name} growth_rate must be between 0 and 100")
+        crops.append(crop)
+
+    if not crops:
+        raise CropConfigError(f"{path}: no crops defined")
+    if len(crops) > MAX_CROPS:
+        raise CropConfigError(f"{path}: at most {MAX_CROPS} crops are supported")
+    for field in ('name', 'item', 'symbol'):
+        values = [getattr(crop, field) for crop in crops]
+        if len(set(values)) != len(values):
+            raise CropConfigError(f"{path}: crop {field}s must be unique")
+    return crops
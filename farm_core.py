@@ -0,0 +1,421 @@
+import random
+
+import numpy as np
+
+from farm_grid import FarmGrid, EMPTY, MERCHANT, SHED, CELL_TYPES, CROPS, CROP_BY_CODE, CROP_TYPES, GROWTH_RATES, growth_rate_table
+from market import Market
+from scheduler import AIHelper, JobScheduler
+
+# Headless farm simulation. Nothing in here touches pygame, so the rules can
+# be stepped as fast as the CPU allows on machines without a display.
+
+# Constants
+GRID_SIZE = 20
+FPS = 60  # simulation ticks per second of game time
+AI_HELPER_PRICE = 200
+MOVE_DELAY = 8  # frames between moves while a movement key is held
+
+# Movement keys by name; when several are held the first one listed wins
+MOVE_DIRECTIONS = {'w': (0, -1), 's': (0, 1), 'a': (-1, 0), 'd': (1, 0)}
+
+# Menu key for each crop: its symbol
+CROP_KEYS = {crop.symbol.lower(): crop for crop in CROPS}
+
+
+class FarmSimulation:
+    def __init__(self, grid_size=GRID_SIZE, growth_rates=None, grid=None, seed=None):
+        # grid may be any object with FarmGrid's interface, e.g. a
+        # ChunkedWorld for farms too big to keep in memory
+        self.grid_size = grid_size
+
+        # Every random choice in a game comes from its own generator, so the
+        # same seed and the same input always play out the same way. Without
+        # a seed one is drawn from the global random module.
+        self.seed = seed if seed is not None else random.getrandbits(64)
+        self.rng = random.Random(self.seed)
+
+        # Per-crop growth per tick, e.g. {'corn': 2, 'turnip': 3}
+        self.growth_rates = dict(GROWTH_RATES)
+        if growth_rates:
+            self.growth_rates.update(growth_rates)
+        self.growth_rate_lut = growth_rate_table(self.growth_rates)
+
+        # Economy, adjustable per game for balancing runs
+        self.ai_helper_price = AI_HELPER_PRICE
+        self.crop_prices = {crop.name: crop.price for crop in CROPS}  # base prices
+        self.market = Market(self.crop_prices)
+
+        # Game state
+        self.player_x = min(10, grid_size - 1)
+        self.player_y = min(10, grid_size - 1)
+        self.gold = 200
+
+        # Item counts keyed by each crop's item name, e.g. 'turnips'
+        self.inventory = {crop.item: 0 for crop in CROPS}
+        self.shed_storage = {crop.item: 0 for crop in CROPS}
+        self.grid = grid if grid is not None else FarmGrid(grid_size)
+        self.merchant_open = False
+        self.merchant_menu = 'main'  # 'main', 'buy', 'sell', 'shed'
+        self.move_timer = 0
+        self.move_delay = MOVE_DELAY
+        self.growth_timer = 0
+        self.ticks = 0
+
+        # AI Helpers
+        self.helpers = []
+        self.helper_spawn = (min(3, grid_size - 1), min(3, grid_size - 1))
+        self.scheduler = JobScheduler(self.grid)
+        self.ai_harvest_timer = 0
+        self.ai_harvest_interval = 120  # ticks between AI harvests
+        self.helper_harvests = 0  # crops harvested by helpers
+        self.helper_ticks = 0  # ticks spent with at least one helper
+
+        # Place merchant
+        self.merchant_x = min(5, grid_size - 1)
+        self.merchant_y = min(5, grid_size - 1)
+        self.grid.set(self.merchant_x, self.merchant_y, MERCHANT)
+
+        # Place shed
+        self.shed_x = min(15, grid_size - 1)
+        self.shed_y = min(15, grid_size - 1)
+        self.grid.set(self.shed_x, self.shed_y, SHED)
+
+        # Initialize crops around the starting area (all of a default-sized
+        # farm; bigger farms start out empty past it)
+        start_size = min(grid_size, GRID_SIZE)
+        for _ in range(15):
+            x = self.rng.randint(0, start_size - 1)
+            y = self.rng.randint(0, start_size - 1)
+            if self.grid.code_at(x, y) == EMPTY:
+                crop_type = self.rng.choice(CROP_TYPES)
+                self.grid.set(x, y, crop_type, self.rng.randint(0, 100))
+
+    @property
+    def has_ai_helper(self):
+        return len(self.helpers) > 0
+
+    @has_ai_helper.setter
+    def has_ai_helper(self, value):
+        if value and not self.helpers:
+            self.helpers.append(AIHelper(*self.helper_spawn))
+        elif not value:
+            self.helpers.clear()
+
+    # Position of the first helper, for code written for a single helper
+    @property
+    def ai_x(self):
+        return self.helpers[0].x if self.helpers else self.helper_spawn[0]
+
+    @ai_x.setter
+    def ai_x(self, value):
+        self.helpers[0].x = value
+
+    @property
+    def ai_y(self):
+        return self.helpers[0].y if self.helpers else self.helper_spawn[1]
+
+    @ai_y.setter
+    def ai_y(self, value):
+        self.helpers[0].y = value
+
+    def interact(self, grid_x, grid_y):
+        # Harvest or plant a cell next to the player
+        if 0 <= grid_x < self.grid_size and 0 <= grid_y < self.grid_size:
+            # Check if adjacent to player
+            if abs(self.player_x - grid_x) <= 1 and abs(self.player_y - grid_y) <= 1:
+                cell_type = self.grid.code_at(grid_x, grid_y)
+                crop = CROP_BY_CODE[cell_type]
+
+                if crop is not None and self.grid.growth_at(grid_x, grid_y) == 100:
+                    self.inventory[crop.item] += 1
+                    self.grid.clear(grid_x, grid_y)
+                elif cell_type == EMPTY:
+                    crop_type = self.rng.choice(CROP_TYPES)
+                    self.grid.set(grid_x, grid_y, crop_type, 0)
+
+    def _clip_area(self, x, y, width, height):
+        # A rectangle clipped to the farm, or None if nothing is left
+        left, top = max(0, x), max(0, y)
+        right, bottom = min(self.grid.width, x + width), min(self.grid.height, y + height)
+        if left >= right or top >= bottom:
+            return None
+        return left, top, right - left, bottom - top
+
+    def harvest_area(self, x, y, width, height):
+        # Harvest every ripe crop in a rectangle into the inventory, as one
+        # grid operation and one inventory update per crop; returns the
+        # number of crops harvested
+        area = self._clip_area(x, y, width, height)
+        if area is None:
+            return 0
+        counts = self.grid.harvest_area(*area)
+        for crop in CROPS:
+            if counts[crop.code]:
+                self.inventory[crop.item] += int(counts[crop.code])
+        return int(counts.sum())
+
+    def plant_area(self, x, y, width, height):
+        # Plant a random crop on every empty cell in a rectangle; returns
+        # the number of cells planted. The crops come from a numpy generator
+        # seeded from the game's RNG, so games stay reproducible.
+        area = self._clip_area(x, y, width, height)
+        if area is None:
+            return 0
+        codes = np.array([crop.code for crop in CROPS], dtype=np.uint8)
+        picker = np.random.default_rng(self.rng.getrandbits(64))
+        return self.grid.plant_area(*area, lambda n: picker.choice(codes, n))
+
+    def harvest_field(self):
+        return self.harvest_area(0, 0, self.grid.width, self.grid.height)
+
+    def plant_field(self):
+        return self.plant_area(0, 0, self.grid.width, self.grid.height)
+
+    def move_player(self, dx, dy):
+        new_x = max(0, min(self.grid_size - 1, self.player_x + dx))
+        new_y = max(0, min(self.grid_size - 1, self.player_y + dy))
+        self.player_x = new_x
+        self.player_y = new_y
+
+        cell_type = self.grid.code_at(self.player_x, self.player_y)
+
+        # Check if on merchant
+        if cell_type == MERCHANT:
+            self.merchant_open = True
+            self.merchant_menu = 'main'
+        # Check if on shed
+        elif cell_type == SHED:
+            self.merchant_open = True
+            self.merchant_menu = 'shed'
+
+    def move_held(self, held):
+        # One frame with the movement keys in held down (e.g. 'wd'): the
+        # player takes a step every move_delay frames
+        if self.merchant_open:
+            return
+        self.move_timer += 1
+        if self.move_timer >= self.move_delay and held:
+            self.move_player(*MOVE_DIRECTIONS[held[0]])
+            self.move_timer = 0
+
+    def menu_key(self, name):
+        # A key pressed while the merchant or shed menu is open
+        if name == 'escape':
+            if self.merchant_menu == 'main':
+                self.merchant_open = False
+            else:
+                self.merchant_menu = 'main'
+        elif self.merchant_menu == 'main':
+            if name == '1':
+                self.merchant_menu = 'sell'
+            elif name == '2':
+                self.merchant_menu = 'buy'
+        elif self.merchant_menu == 'sell':
+            if name in CROP_KEYS:
+                self.sell_crop(CROP_KEYS[name])
+        elif self.merchant_menu == 'buy':
+            if name == 'b':
+                self.buy_ai_helper()
+        elif self.merchant_menu == 'shed':
+            if name in CROP_KEYS:
+                self.withdraw_from_shed(CROP_KEYS[name])
+
+    def ai_harvest(self):
+        # Give idle helpers the nearest crop nobody else is going for
+        self.scheduler.assign(self.helpers)
+
+        for index, helper in enumerate(self.helpers):
+            if helper.target is None:
+                continue
+            target_x, target_y = helper.target
+
+            # Move towards target or harvest if adjacent
+            if abs(helper.x - target_x) <= 1 and abs(helper.y - target_y) <= 1:
+                # Harvest
+                crop = CROP_BY_CODE[self.grid.code_at(target_x, target_y)]
+                if crop is not None:
+                    self.shed_storage[crop.item] += 1
+                self.grid.clear(target_x, target_y)
+                self.helper_harvests += 1
+                helper.target = None
+                helper.path.reset()
+            else:
+                # Follow the cached path towards the target
+                step = helper.path.next_step(self.grid, (helper.x, helper.y), helper.target)
+                if step is None:
+                    self.scheduler.mark_unreachable(index, helper)
+                else:
+                    helper.x, helper.y = step
+
+    def helper_throughput(self):
+        # Crops harvested by helpers per simulated minute
+        minutes = self.helper_ticks / (FPS * 60)
+        if minutes == 0:
+            return 0.0
+        return self.helper_harvests / minutes
+
+    def grow_crops(self):
+        self.grid.grow(self.growth_rate_lut)
+
+    def crop_price(self, crop):
+        # What the merchant pays for the next item of this crop right now
+        return self.market.price(crop, self.ticks)
+
+    def sell_crop(self, crop, quantity=None, min_price=0):
+        # Sell quantity items of this crop from the inventory (all of them
+        # by default) as one order at the market; returns the number sold
+        held = self.inventory[crop.item]
+        quantity = held if quantity is None else min(quantity, held)
+        if quantity <= 0:
+            return 0
+        sold, gold = self.market.sell(crop, quantity, self.ticks, min_price)
+        self.inventory[crop.item] -= sold
+        self.gold += gold
+        return sold
+
+    def buy_crop(self, crop, quantity, max_price=None):
+        # Buy up to quantity items of this crop from the merchant, as many
+        # as the gold covers; returns the number bought
+        bought, cost = self.market.buy(crop, quantity, self.ticks, self.gold, max_price)
+        self.inventory[crop.item] += bought
+        self.gold -= cost
+        return bought
+
+    def buy_ai_helper(self):
+        if self.gold >= self.ai_helper_price:
+            self.gold -= self.ai_helper_price
+            self.helpers.append(AIHelper(*self.helper_spawn))
+
+    def withdraw_from_shed(self, crop):
+        if self.shed_storage[crop.item] > 0:
+            self.inventory[crop.item] += self.shed_storage[crop.item]
+            self.shed_storage[crop.item] = 0
+
+    def get_state(self):
+        # Everything except the grid planes, as plain JSON-friendly values
+        version, internal, gauss_next = self.rng.getstate()
+        return {
+            'grid_size': self.grid_size,
+            'seed': self.seed,
+            'rng_state': [version, list(internal), gauss_next],
+            'cell_types': list(CELL_TYPES),  # what each type code meant when saved
+            'growth_rates': dict(self.growth_rates),
+            'ai_helper_price': self.ai_helper_price,
+            'crop_prices': dict(self.crop_prices),
+            'player_x': self.player_x,
+            'player_y': self.player_y,
+            'gold': self.gold,
+            'inventory': dict(self.inventory),
+            'shed_storage': dict(self.shed_storage),
+            'merchant_open': self.merchant_open,
+            'merchant_menu': self.merchant_menu,
+            'move_timer': self.move_timer,
+            'move_delay': self.move_delay,
+            'growth_timer': self.growth_timer,
+            'ticks': self.ticks,
+            'helpers': [[helper.x, helper.y, list(helper.target) if helper.target else None]
+                        for helper in self.helpers],
+            'helper_spawn': list(self.helper_spawn),
+            'unreachable': [[index, x, y] for index, cells in sorted(self.scheduler.unreachable.items())
+                            for x, y in sorted(cells)],
+            'ai_harvest_timer': self.ai_harvest_timer,
+            'ai_harvest_interval': self.ai_harvest_interval,
+            'helper_harvests': self.helper_harvests,
+            'helper_ticks': self.helper_ticks,
+            'merchant_x': self.merchant_x,
+            'merchant_y': self.merchant_y,
+            'shed_x': self.shed_x,
+            'shed_y': self.shed_y,
+            'market': self.market.get_state(),
+        }
+
+    def set_state(self, state, grid):
+        # Inverse of get_state, with the grid supplied separately
+        self.grid_size = state['grid_size']
+        self.growth_rates = dict(GROWTH_RATES)
+        self.growth_rates.update(state['growth_rates'])
+        self.growth_rate_lut = growth_rate_table(self.growth_rates)
+        self.grid = grid
+
+        # Economy settings; crops added to the catalogue since the save get
+        # the catalogue's price. crop_prices is updated in place because the
+        # market reads the same dict.
+        self.ai_helper_price = state['ai_helper_price']
+        self.crop_prices.clear()
+        self.crop_prices.update({crop.name: crop.price for crop in CROPS})
+        self.crop_prices.update(state['crop_prices'])
+        self.scheduler = JobScheduler(grid)
+        for index, x, y in state['unreachable']:
+            self.scheduler.unreachable.setdefault(index, set()).add((x, y))
+
+        for key in ('player_x', 'player_y', 'gold', 'merchant_open', 'merchant_menu', 'growth_timer',
+                    'ticks', 'ai_harvest_timer', 'ai_harvest_interval', 'helper_harvests',
+                    'helper_ticks', 'merchant_x', 'merchant_y', 'shed_x', 'shed_y'):
+            setattr(self, key, state[key])
+        # A timer already at or past its interval (say from an edited save)
+        # fires on the next tick either way
+        self.growth_timer = min(self.growth_timer, FPS - 1)
+        self.ai_harvest_timer = min(self.ai_harvest_timer, self.ai_harvest_interval - 1)
+        # Crops added to the catalogue since the save start out at zero
+        self.inventory = {crop.item: 0 for crop in CROPS}
+        self.inventory.update(state['inventory'])
+        self.shed_storage = {crop.item: 0 for crop in CROPS}
+        self.shed_storage.update(state['shed_storage'])
+        self.helper_spawn = tuple(state['helper_spawn'])
+        self.move_timer = state['move_timer']
+        self.move_delay = state['move_delay']
+        self.market.set_state(state['market'])
+
+        version, internal, gauss_next = state['rng_state']
+        self.seed = state['seed']
+        self.rng.setstate((version, tuple(internal), gauss_next))
+
+        self.helpers = []
+        for x, y, target in state['helpers']:
+            helper = AIHelper(x, y)
+            helper.target = tuple(target) if target else None
+            self.helpers.append(helper)
+
+    def step(self, n_ticks=1):
+        # Advance the simulation by a fixed number of ticks. Ticks where no
+        # timer fires are skipped in one jump instead of being looped over.
+        remaining = n_ticks
+        while remaining > 0:
+            # Ticks until the next growth / AI event fires
+            jump = min(remaining, FPS - self.growth_timer)
+            if self.helpers:
+                jump = min(jump, self.ai_harvest_interval - self.ai_harvest_timer)
+            jump = max(1, jump)
+
+            self.ticks += jump
+            remaining -= jump
+
+            # AI Helper logic
+            if self.helpers:
+                self.helper_ticks += jump
+                self.ai_harvest_timer += jump
+                if self.ai_harvest_timer >= self.ai_harvest_interval:
+                    self.ai_harvest()
+                    self.ai_harvest_timer = 0
+
+            # Grow crops every second
+            self.growth_timer += jump
+            if self.growth_timer >= FPS:
+                self.grow_crops()
+                self.growth_timer = 0
+
+    def fast_forward(self, n_ticks):
+        # Same end state as step(n_ticks). On a farm without helpers only
+        # crops grow, so the growth of the whole span is applied in one go.
+        # Helper rounds can't be skipped like that: where each helper goes
+        # next depends on what the others just took, so with helpers every
+        # round is played out by step(), which already jumps between them.
+        if n_ticks <= 0:
+            return
+        if self.helpers:
+            self.step(n_ticks)
+            return
+        growth_ticks = (self.growth_timer + n_ticks) // FPS
+        self.grid.grow(self.growth_rate_lut, growth_ticks)
+        self.growth_timer = (self.growth_timer + n_ticks) % FPS
+        self.ticks += n_ticks
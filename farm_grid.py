@@ -0,0 +1,373 @@
+import numpy as np
+
+from crops import CropConfigError, load_crops
+from ripe_index import RipeIndex
+
+# Array-backed farm grid. Cells live in two uint8 planes (type code and
+# growth percentage) instead of one dict per cell, so a 1000x1000 farm is
+# 2 MB and whole-grid scans run as numpy operations.
+
+# Cell type codes stored in the type plane: the fixed cells, then one code
+# per crop in catalogue order
+CROPS = load_crops()
+CELL_TYPES = ['empty', 'merchant', 'shed'] + [crop.name for crop in CROPS]
+CELL_CODES = {name: code for code, name in enumerate(CELL_TYPES)}
+EMPTY = CELL_CODES['empty']
+MERCHANT = CELL_CODES['merchant']
+SHED = CELL_CODES['shed']
+CROP_TYPES = [crop.name for crop in CROPS]
+if len(CELL_CODES) != len(CELL_TYPES):
+    raise CropConfigError("crop names can't reuse the names empty, merchant or shed")
+for crop in CROPS:
+    crop.code = CELL_CODES[crop.name]
+
+# Lookup table: type code -> is this a crop
+IS_CROP = np.zeros(256, dtype=bool)
+IS_CROP[[crop.code for crop in CROPS]] = True
+
+# Lookup table: type code -> Crop (None for non-crops)
+CROP_BY_CODE = [None] * 256
+for crop in CROPS:
+    CROP_BY_CODE[crop.code] = crop
+
+# Lookup table: type code -> AI helpers can't walk through this cell
+BLOCKS_HELPERS = np.zeros(256, dtype=bool)
+BLOCKS_HELPERS[[MERCHANT, SHED]] = True
+
+# Growth percentage gained per growth tick
+GROWTH_RATES = {crop.name: crop.growth_rate for crop in CROPS}
+
+# While at most this fraction of cells is growing, grow() only visits the
+# growing crops (kept in a list of cells) instead of sweeping whole planes
+SPARSE_GROWTH = 1 / 16
+
+
+def growth_rate_table(rates):
+    # Lookup table: type code -> growth per tick
+    table = np.zeros(256, dtype=np.uint8)
+    for name, rate in rates.items():
+        table[CELL_CODES[name]] = rate
+    return table
+
+
+def type_remap_table(saved_types):
+    # Lookup table: type code in a save written with cell types
+    # saved_types -> type code now, or None if they are the same
+    if saved_types == CELL_TYPES:
+        return None
+    missing = [name for name in saved_types if name not in CELL_CODES]
+    if missing:
+        raise ValueError(f"saved farm has crops missing from the catalogue: {', '.join(missing)}")
+    table = np.zeros(256, dtype=np.uint8)
+    table[:len(saved_types)] = [CELL_CODES[name] for name in saved_types]
+    return table
+
+
+class CellView:
+    # Dict-like view of one cell so code written against the old
+    # {'type': ..., 'growth': ...} cells keeps working
+    __slots__ = ('_grid', 'x', 'y')
+
+    def __init__(self, grid, x, y):
+        self._grid = grid
+        self.x = x
+        self.y = y
+
+    def __getitem__(self, key):
+        if key == 'type':
+            return CELL_TYPES[self._grid.types[self.y, self.x]]
+        elif key == 'growth':
+            return int(self._grid.growth[self.y, self.x])
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == 'type':
+            self._grid.set(self.x, self.y, value, self['growth'])
+        elif key == 'growth':
+            self._grid.set(self.x, self.y, self._grid.types[self.y, self.x], value)
+        else:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return ['type', 'growth']
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __eq__(self, other):
+        try:
+            return self['type'] == other['type'] and self['growth'] == other['growth']
+        except (KeyError, TypeError):
+            return NotImplemented
+
+    def __repr__(self):
+        return repr({'type': self['type'], 'growth': self['growth']})
+
+
+class GridRow:
+    __slots__ = ('_grid', 'y')
+
+    def __init__(self, grid, y):
+        self._grid = grid
+        self.y = y
+
+    def __getitem__(self, x):
+        if not 0 <= x < self._grid.width:
+            raise IndexError(x)
+        return CellView(self._grid, x, self.y)
+
+    def __setitem__(self, x, cell):
+        self._grid.set(x, self.y, cell['type'], cell.get('growth', 0))
+
+    def __len__(self):
+        return self._grid.width
+
+    def __iter__(self):
+        for x in range(self._grid.width):
+            yield CellView(self._grid, x, self.y)
+
+
+class FarmGrid:
+    def __init__(self, width, height=None, types=None, growth=None):
+        if height is None:
+            height = width
+        self.width = width
+        self.height = height
+
+        # Existing planes can be passed in (e.g. when loading a save)
+        if types is None:
+            types = np.zeros((height, width), dtype=np.uint8)
+        if growth is None:
+            growth = np.zeros((height, width), dtype=np.uint8)
+        self.types = types
+        self.growth = growth
+
+        # Ripe crops are indexed for nearest-crop searches. Writes must go
+        # through set()/clear()/grow() so the index stays in step; after
+        # writing to the planes directly, call reindex(). The index and the
+        # count of growing crops are only built when first needed, so
+        # opening a big saved farm doesn't read all of it up front.
+        self.ripe = RipeIndex(self)
+        self.reindex()
+
+        # Bumped whenever a cell starts or stops blocking helpers, so cached
+        # paths know when they need checking
+        self.layout_version = 0
+
+    def __getitem__(self, y):
+        if not 0 <= y < self.height:
+            raise IndexError(y)
+        return GridRow(self, y)
+
+    def __len__(self):
+        return self.height
+
+    def __iter__(self):
+        for y in range(self.height):
+            yield GridRow(self, y)
+
+    @property
+    def growing(self):
+        # Crops still growing, counted on first use after a reindex()
+        if self._growing is None:
+            self._growing = self.count_growing()
+        return self._growing
+
+    @growing.setter
+    def growing(self, count):
+        self._growing = count
+
+    @property
+    def nbytes(self):
+        return self.types.nbytes + self.growth.nbytes
+
+    def type_at(self, x, y):
+        return CELL_TYPES[self.types[y, x]]
+
+    def code_at(self, x, y):
+        return self.types[y, x]
+
+    def growth_at(self, x, y):
+        return self.growth[y, x]
+
+    def region(self, x, y, width, height):
+        # (types, growth) of a rectangle of cells, for drawing the part of
+        # the farm that is on screen
+        return self.types[y:y + height, x:x + width], self.growth[y:y + height, x:x + width]
+
+    def set(self, x, y, cell_type, growth=0):
+        # cell_type may be a name ('corn') or a type code
+        if isinstance(cell_type, str):
+            cell_type = CELL_CODES[cell_type]
+        if BLOCKS_HELPERS[cell_type] != BLOCKS_HELPERS[self.types[y, x]]:
+            self.layout_version += 1
+        was_ripe = self.is_ripe(x, y)
+        was_growing = IS_CROP[self.types[y, x]] and self.growth[y, x] < 100
+        self.types[y, x] = cell_type
+        self.growth[y, x] = growth
+        is_growing = IS_CROP[cell_type] and growth < 100
+        if self._growing is not None:
+            self._growing += int(is_growing) - int(was_growing)
+        if is_growing and not was_growing and self._growing_cells is not None:
+            self._planted.append(y * self.width + x)
+        is_ripe = IS_CROP[cell_type] and growth == 100
+        if is_ripe and not was_ripe:
+            self.ripe.add(x, y)
+        elif was_ripe and not is_ripe:
+            self.ripe.discard(x, y)
+
+    def clear(self, x, y):
+        self.set(x, y, EMPTY, 0)
+
+    def harvest_area(self, x, y, width, height):
+        # Clear every ripe crop in a rectangle in one batched operation;
+        # returns how many were cleared of each type code (length 256)
+        types, growth = self.region(x, y, width, height)
+        ripe = IS_CROP[types] & (growth == 100)
+        counts = np.bincount(types[ripe], minlength=256)
+        types[ripe] = EMPTY
+        growth[ripe] = 0
+        ys, xs = np.nonzero(ripe)
+        self.ripe.discard_many(xs + x, ys + y)
+        return counts
+
+    def plant_area(self, x, y, width, height, pick):
+        # Plant every empty cell in a rectangle in one batched operation.
+        # pick(n) returns the crop type codes for n cells, in row order.
+        # Returns the number of cells planted.
+        types, growth = self.region(x, y, width, height)
+        ys, xs = np.nonzero(types == EMPTY)
+        if len(ys) == 0:
+            return 0
+        types[ys, xs] = pick(len(ys))
+        growth[ys, xs] = 0
+        if self._growing is not None:
+            self._growing += len(ys)
+        if self._growing_cells is not None:
+            self._planted.extend(((ys + y) * self.width + xs + x).tolist())
+        return len(ys)
+
+    def is_passable(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height and not BLOCKS_HELPERS[self.types[y, x]]
+
+    def is_ripe(self, x, y):
+        return IS_CROP[self.types[y, x]] and self.growth[y, x] == 100
+
+    def grow(self, rate_lut, steps=1):
+        # Grow every crop by its per-type rate in one batched operation.
+        # rate_lut maps type code -> growth per tick (0 for non-crops).
+        # Any crop is ripe after 100 steps, so larger jumps are clamped.
+        steps = min(steps, 100)
+        if steps <= 0 or self.growing == 0:
+            return
+        if self.growing <= self.types.size * SPARSE_GROWTH:
+            self._grow_cells(rate_lut, steps)
+            return
+
+        # Most of the farm is growing: sweep both planes. The list of
+        # growing cells would go stale, so it is dropped.
+        self._growing_cells = None
+        grown = rate_lut.take(self.types)
+        if steps > 1 or rate_lut.max() > 155:
+            # Widen so the sum can't wrap around
+            grown = grown.astype(np.uint16)
+            grown *= steps
+        grown += self.growth
+        np.putmask(grown, grown > 100, 100)
+
+        # Index the crops that ripened on this tick
+        ripened = np.flatnonzero((grown == 100) & (self.growth != 100))
+        self.growth[...] = grown
+        ys, xs = np.divmod(ripened, self.width)
+        self.ripe.add_many(xs, ys)
+        self.growing -= len(ripened)
+
+    def _grow_cells(self, rate_lut, steps):
+        # grow() for just the crops on the growing list; cost is
+        # proportional to the growing crops, not the size of the farm
+        cells = self.growing_cells()
+        types = self.types.reshape(-1)
+        growth = self.growth.reshape(-1)
+        grown = rate_lut.take(types[cells]).astype(np.uint16)
+        grown *= steps
+        grown += growth[cells]
+        np.minimum(grown, 100, out=grown)
+        growth[cells] = grown
+
+        ripe = grown == 100
+        ripened = cells[ripe]
+        self._growing_cells = cells[~ripe]
+        ys, xs = np.divmod(ripened, self.width)
+        self.ripe.add_many(xs, ys)
+        self.growing -= len(ripened)
+
+    def growing_cells(self):
+        # Flat indices of the crops still growing. Built with one sweep the
+        # first time, then kept up to date: cells planted since are merged
+        # in and cells cleared or replaced since are dropped here.
+        types = self.types.reshape(-1)
+        growth = self.growth.reshape(-1)
+        if self._growing_cells is None:
+            self._growing_cells = np.flatnonzero(IS_CROP[types] & (growth < 100))
+            self._planted = []
+            return self._growing_cells
+
+        cells = self._growing_cells
+        if self._planted:
+            # A cell cleared and replanted is listed twice
+            cells = np.unique(np.concatenate([cells, np.array(self._planted, dtype=cells.dtype)]))
+            self._planted = []
+        if len(cells) != self.growing:
+            cells = cells[IS_CROP[types[cells]] & (growth[cells] < 100)]
+        self._growing_cells = cells
+        return cells
+
+    def next_ripening(self, rate_lut):
+        # Growth ticks until the next crop ripens, or None if no crop will
+        if self.growing == 0:
+            return None
+        if self.growing <= self.types.size * SPARSE_GROWTH:
+            cells = self.growing_cells()
+            types, growth = self.types.reshape(-1)[cells], self.growth.reshape(-1)[cells]
+        else:
+            growing = IS_CROP[self.types] & (self.growth < 100)
+            types, growth = self.types[growing], self.growth[growing]
+        rates = rate_lut.take(types)
+        moving = rates > 0
+        if not moving.any():
+            return None
+        needed = 100 - growth[moving].astype(np.int32)
+        return int((-(-needed // rates[moving])).min())
+
+    def ripe_mask(self, types=None, growth=None):
+        # Defaults to the whole grid; pass sub-arrays to test a region
+        if types is None:
+            types, growth = self.types, self.growth
+        return IS_CROP[types] & (growth == 100)
+
+    def count_growing(self):
+        return int(np.count_nonzero(IS_CROP[self.types] & (self.growth < 100)))
+
+    def rebuild_ripe_index(self):
+        self.ripe.rebuild()
+
+    def reindex(self):
+        # Drop everything derived from the planes; each part is recounted
+        # when it is next needed
+        self.ripe.invalidate()
+        self._growing = None
+        self._growing_cells = None
+        self._planted = []
+
+    def keep_loaded(self, cells):
+        # The whole grid is always in memory; see ChunkedWorld.keep_loaded
+        pass
+
+    def nearest_ripe(self, x, y, exclude=None):
+        return self.ripe.nearest(x, y, exclude)
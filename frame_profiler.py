@@ -0,0 +1,76 @@
+import json
+import time
+
+import numpy as np
+
+# Per-frame section timers for the game loop. The loop calls lap(name) at
+# the end of each section, which charges the time since the previous lap to
+# that section: one perf_counter() call per section, cheap enough to leave
+# on all the time. The last FRAME_HISTORY frames are kept in a ring buffer
+# for the p50/p99 overlay, and every frame can be streamed to a file:
+#
+#   .csv     frame,tick,<section ms>...,total
+#   other    one JSON object per line with the same fields
+
+SECTIONS = ('input', 'ai_harvest', 'grow_crops', 'sim', 'draw_grid', 'draw_ui', 'overlays', 'flip')
+FRAME_HISTORY = 600  # ten seconds at 60 FPS
+
+
+class FrameProfiler:
+    def __init__(self, sections=SECTIONS, history=FRAME_HISTORY):
+        self.sections = list(sections)
+        self.history = np.zeros((history, len(self.sections) + 1))  # seconds; last column is the total
+        self.frames = 0
+        self._current = dict.fromkeys(self.sections, 0.0)
+        self._last = time.perf_counter()
+        self._export = None
+        self._export_csv = False
+
+    def open_export(self, path):
+        self._export = open(path, 'w', buffering=1 << 16)
+        self._export_csv = path.lower().endswith('.csv')
+        if self._export_csv:
+            self._export.write(','.join(['frame', 'tick'] + self.sections + ['total']) + '\n')
+
+    def close(self):
+        if self._export is not None:
+            self._export.close()
+            self._export = None
+
+    def start_frame(self):
+        self._last = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self._current[name] += now - self._last
+        self._last = now
+
+    def end_frame(self, tick):
+        row = self.history[self.frames % len(self.history)]
+        current = self._current
+        for i, name in enumerate(self.sections):
+            row[i] = current[name]
+            current[name] = 0.0
+        row[-1] = row[:-1].sum()
+        if self._export is not None:
+            self._write(tick, row)
+        self.frames += 1
+
+    def _write(self, tick, row):
+        ms = [round(seconds * 1000, 4) for seconds in row.tolist()]
+        if self._export_csv:
+            self._export.write(f"{self.frames},{tick}," + ','.join(map(str, ms)) + '\n')
+        else:
+            record = {'frame': self.frames, 'tick': tick}
+            record.update(zip(self.sections + ['total'], ms))
+            self._export.write(json.dumps(record) + '\n')
+
+    def percentiles(self, q=(50, 99)):
+        # {section: [milliseconds at each percentile]} over the frames in
+        # the history, including 'total'
+        count = min(self.frames, len(self.history))
+        if count == 0:
+            values = np.zeros((len(q), len(self.sections) + 1))
+        else:
+            values = np.percentile(self.history[:count], q, axis=0) * 1000
+        return {name: values[:, i].tolist() for i, name in enumerate(self.sections + ['total'])}
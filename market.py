@@ -0,0 +1,163 @@
+import math
+
+import numpy as np
+
+from farm_grid import CROPS
+
+# The merchant's market. A crop's price drops as the player sells it and
+# climbs back to the crop's base price over time:
+#
+#   price = base price * (1 - impact) ** pressure
+#
+# pressure is the net number of units sold, halving every half_life ticks.
+# The decay is applied lazily whenever a crop is priced, so an idle market
+# costs nothing per tick and fast_forward() needs no special case.
+#
+# An order for n units walks that curve one unit at a time, like working
+# through an order book. The unit prices form a geometric series, so the
+# total, and how many units fit under a price limit or a budget, come out
+# in O(1) whatever the order size. The merchant sells crops at a spread
+# above the price it pays for them, so selling and buying back loses gold.
+#
+# Every trade goes into a fixed-size ring buffer of recent trades.
+
+PRICE_IMPACT = 0.002  # fraction the price drops per unit sold
+RECOVERY_HALF_LIFE = 60 * 60  # ticks (a minute at 60 FPS)
+BUY_SPREAD = 0.25  # merchant's markup when selling to the player
+TRADE_HISTORY = 4096  # trades kept for price history
+
+# quantity is positive for units the player sold, negative for units bought
+TRADE = np.dtype([('tick', '<i8'), ('crop', 'u1'), ('quantity', '<i4'), ('gold', '<i8'), ('price', '<f8')])
+
+# Slack for float rounding when turning a series total into whole gold
+ROUNDING = 1e-9
+
+
+def geometric_sum(ratio, n):
+    # 1 + ratio + ratio**2 + ... + ratio**(n - 1)
+    if ratio == 1:
+        return n
+    return (1 - ratio ** n) / (1 - ratio)
+
+
+class Market:
+    def __init__(self, base_prices, impact=PRICE_IMPACT, half_life=RECOVERY_HALF_LIFE, spread=BUY_SPREAD,
+                 history=TRADE_HISTORY):
+        # base_prices is {crop name: gold}, read at every trade so changes
+        # to it (e.g. FarmSimulation.crop_prices) apply straight away
+        self.base_prices = base_prices
+        self.impact = impact
+        self.half_life = half_life
+        self.spread = spread
+        self.pressure = {crop.name: 0.0 for crop in CROPS}
+        self.updated = {crop.name: 0 for crop in CROPS}  # tick pressure was last settled at
+        self.history = np.zeros(history, dtype=TRADE)
+        self.trades = 0  # trades ever recorded; the ring holds the last len(history)
+        self.change = 0.0  # fraction of a gold owed from earlier sales
+
+    def _pressure(self, crop, tick):
+        # Pressure decayed to tick
+        pressure = self.pressure[crop.name]
+        if pressure and self.half_life:
+            pressure *= 0.5 ** (max(0, tick - self.updated[crop.name]) / self.half_life)
+        return pressure
+
+    def price(self, crop, tick):
+        # What the merchant pays for the next unit
+        return self.base_prices[crop.name] * (1 - self.impact) ** self._pressure(crop, tick)
+
+    def ask(self, crop, tick):
+        # What the merchant charges for the next unit
+        return self.price(crop, tick) / (1 - self.impact) * (1 + self.spread)
+
+    def _settle(self, crop, tick, units):
+        self.pressure[crop.name] = self._pressure(crop, tick) + units
+        self.updated[crop.name] = tick
+
+    def _record(self, tick, crop, quantity, gold, price):
+        self.history[self.trades % len(self.history)] = (tick, crop.code, quantity, gold, price)
+        self.trades += 1
+
+    def sell(self, crop, quantity, tick, min_price=0):
+        # The player sells up to quantity units, stopping before the price
+        # falls below min_price; returns (units sold, gold paid)
+        price = self.price(crop, tick)
+        ratio = 1 - self.impact
+        if min_price > 0:
+            if price < min_price:
+                quantity = 0
+            elif ratio < 1:
+                quantity = min(quantity, int(math.log(min_price / price) / math.log(ratio)) + 1)
+        if quantity <= 0:
+            return 0, 0
+        # Fractions of a gold carry over to the next sale, so splitting an
+        # order up doesn't pay more or less than selling it in one go
+        total = price * geometric_sum(ratio, quantity) + self.change
+        gold = math.floor(total + ROUNDING)
+        self.change = max(0.0, total - gold)
+        self._settle(crop, tick, quantity)
+        self._record(tick, crop, quantity, gold, price)
+        return quantity, gold
+
+    def buy_cost(self, crop, quantity, tick):
+        # Gold the merchant would charge for quantity units
+        if quantity <= 0:
+            return 0
+        ask = self.ask(crop, tick)
+        return math.ceil(ask * geometric_sum(1 / (1 - self.impact), quantity) - ROUNDING)
+
+    def buy(self, crop, quantity, tick, gold=None, max_price=None):
+        # The player buys up to quantity units, as many as gold pays for
+        # and stopping before the price rises above max_price; returns
+        # (units bought, gold charged)
+        ask = self.ask(crop, tick)
+        growth = 1 / (1 - self.impact)
+        if max_price is not None:
+            if ask > max_price:
+                quantity = 0
+            elif growth > 1:
+                quantity = min(quantity, int(math.log(max_price / ask) / math.log(growth)) + 1)
+        if gold is not None and quantity > 0:
+            if growth > 1:
+                affordable = int(math.log(1 + gold * (growth - 1) / ask) / math.log(growth))
+            else:
+                affordable = int(gold // ask)
+            quantity = min(quantity, affordable)
+            # The estimate can be one over once the cost is rounded up
+            while quantity > 0 and self.buy_cost(crop, quantity, tick) > gold:
+                quantity -= 1
+        if quantity <= 0:
+            return 0, 0
+        cost = self.buy_cost(crop, quantity, tick)
+        self._settle(crop, tick, -quantity)
+        self._record(tick, crop, -quantity, cost, ask)
+        return quantity, cost
+
+    def recent_trades(self, crop=None):
+        # Trades still in the ring buffer, oldest first, optionally only
+        # those of one crop
+        size = len(self.history)
+        if self.trades <= size:
+            trades = self.history[:self.trades].copy()
+        else:
+            start = self.trades % size
+            trades = np.concatenate((self.history[start:], self.history[:start]))
+        if crop is not None:
+            trades = trades[trades['crop'] == crop.code]
+        return trades
+
+    def get_state(self):
+        # Pressures only; the trade history is just for this session
+        return {
+            'pressure': dict(self.pressure),
+            'updated': dict(self.updated),
+            'change': self.change,
+        }
+
+    def set_state(self, state):
+        # Crops added to the catalogue since the save start out at rest
+        self.pressure = {crop.name: 0.0 for crop in CROPS}
+        self.pressure.update(state['pressure'])
+        self.updated = {crop.name: 0 for crop in CROPS}
+        self.updated.update(state['updated'])
+        self.change = state['change']
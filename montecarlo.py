@@ -0,0 +1,232 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from farm_core import FarmSimulation, AI_HELPER_PRICE, FPS, MOVE_DELAY
+from farm_grid import CROPS, EMPTY, IS_CROP
+from market import PRICE_IMPACT, RECOVERY_HALF_LIFE
+
+# Monte Carlo economy evaluator. Plays thousands of independent, seeded
+# farms headlessly with a scripted player and reports how the economy
+# settings play out: how long the first AI helper takes to afford, gold
+# earned per minute and their spread across runs. Runs are spread over a
+# process pool, one farm per task, so throughput grows with core count.
+#
+#   python montecarlo.py --runs 2000 --minutes 30
+#   python montecarlo.py --helper-price 150 --harvest-interval 90 --price turnip=3
+#   python montecarlo.py --price-impact 0   # fixed prices
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+class GreedyPlayer:
+    # Scripted player: harvests and replants the cells around it, walks to
+    # the nearest ripe crop, and once it carries sell_at crops (counting
+    # what is waiting in the shed) fetches the shed and sells everything
+    # at the merchant, buying helpers whenever it can afford one.
+    def __init__(self, sell_at=20, max_helpers=10):
+        self.sell_at = sell_at
+        self.max_helpers = max_helpers
+        self.earned = 0
+        self.first_helper_tick = None
+        self.crop_target = None
+
+    def act(self, sim):
+        # Make one move; returns the ticks until the next one
+        if sim.merchant_open:
+            self.use_menu(sim)
+            return MOVE_DELAY
+
+        # Harvest ripe crops and plant empty cells next to us
+        left, top = max(0, sim.player_x - 1), max(0, sim.player_y - 1)
+        types, growth = sim.grid.region(left, top, sim.player_x + 2 - left, sim.player_y + 2 - top)
+        width = types.shape[1]
+        for cell in np.flatnonzero((types == EMPTY) | (IS_CROP[types] & (growth == 100))).tolist():
+            sim.interact(left + cell % width, top + cell // width)
+
+        carried = sum(sim.inventory.values())
+        stored = sum(sim.shed_storage.values())
+        if stored and carried + stored >= self.sell_at:
+            target = (sim.shed_x, sim.shed_y)
+        elif carried >= self.sell_at:
+            target = (sim.merchant_x, sim.merchant_y)
+        else:
+            # Keep heading for the same crop while it is still there
+            target = self.crop_target
+            if target is None or not sim.grid.is_ripe(*target):
+                target = self.crop_target = sim.grid.nearest_ripe(sim.player_x, sim.player_y)
+            if target is None or self.next_to(sim, target):
+                # Nothing to do until crops grow or a helper harvests
+                return self.ticks_to_next_event(sim)
+        self.walk_towards(sim, target)
+        return MOVE_DELAY
+
+    def ticks_to_next_event(self, sim):
+        # Waiting is done in whole moves, as a player holding still would
+        wait = FPS - sim.growth_timer
+        if sim.helpers:
+            wait = min(wait, sim.ai_harvest_interval - sim.ai_harvest_timer)
+        return max(1, -(-wait // MOVE_DELAY)) * MOVE_DELAY
+
+    def next_to(self, sim, cell):
+        return abs(sim.player_x - cell[0]) <= 1 and abs(sim.player_y - cell[1]) <= 1
+
+    def walk_towards(self, sim, target):
+        # One step, along x first, going round the merchant and shed
+        # unless one of them is where we're headed
+        dx = (target[0] > sim.player_x) - (target[0] < sim.player_x)
+        dy = (target[1] > sim.player_y) - (target[1] < sim.player_y)
+        for step_x, step_y in ((dx, 0), (0, dy), (0, 1), (1, 0), (0, -1), (-1, 0)):
+            x, y = sim.player_x + step_x, sim.player_y + step_y
+            if (step_x or step_y) and ((x, y) == target or sim.grid.is_passable(x, y)):
+                sim.move_player(step_x, step_y)
+                return
+
+    def use_menu(self, sim):
+        if sim.merchant_menu == 'shed':
+            for crop in CROPS:
+                sim.withdraw_from_shed(crop)
+        else:
+            gold = sim.gold
+            for crop in CROPS:
+                sim.sell_crop(crop)
+            self.earned += sim.gold - gold
+            while sim.gold >= sim.ai_helper_price and len(sim.helpers) < self.max_helpers:
+                sim.buy_ai_helper()
+                if self.first_helper_tick is None:
+                    self.first_helper_tick = sim.ticks
+        sim.merchant_open = False
+
+
+def run_farm(seed, settings):
+    # One complete game; returns (minutes to first helper or nan,
+    # gold per minute, helpers owned, crops harvested by helpers)
+    sim = FarmSimulation(settings['grid_size'], seed=seed)
+    sim.ai_helper_price = settings['helper_price']
+    sim.ai_harvest_interval = settings['harvest_interval']
+    sim.crop_prices.update(settings['prices'])
+    sim.market.impact = settings['price_impact']
+    sim.market.half_life = settings['price_recovery'] * FPS
+    player = GreedyPlayer(settings['sell_at'])
+
+    end = settings['minutes'] * 60 * FPS
+    while sim.ticks < end:
+        sim.step(min(player.act(sim), end - sim.ticks))
+
+    minutes = sim.ticks / (60 * FPS)
+    first_helper = np.nan
+    if player.first_helper_tick is not None:
+        first_helper = player.first_helper_tick / (60 * FPS)
+    return first_helper, player.earned / minutes, len(sim.helpers), sim.helper_harvests
+
+
+class Stats:
+    def __init__(self):
+        self.first_helper = []
+        self.gold_per_minute = []
+        self.helpers = []
+        self.helper_harvests = []
+
+    def add(self, result):
+        first_helper, gold_per_minute, helpers, helper_harvests = result
+        self.first_helper.append(first_helper)
+        self.gold_per_minute.append(gold_per_minute)
+        self.helpers.append(helpers)
+        self.helper_harvests.append(helper_harvests)
+
+    def __len__(self):
+        return len(self.gold_per_minute)
+
+    def afforded(self):
+        return np.count_nonzero(~np.isnan(self.first_helper))
+
+    def percentiles(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return [np.nan] * len(PERCENTILES)
+        return np.percentile(values, PERCENTILES)
+
+
+def progress_line(stats, elapsed):
+    helper_p = stats.percentiles(stats.first_helper)
+    gold_p = stats.percentiles(stats.gold_per_minute)
+    return (f"{len(stats):>7} runs {len(stats) / elapsed:>8.1f}/s | helper afforded {stats.afforded() / len(stats):>5.0%}"
+            f" after p50 {helper_p[2]:>6.2f} min | gold/min p5 {gold_p[0]:>6.2f} p50 {gold_p[2]:>6.2f}"
+            f" p95 {gold_p[4]:>6.2f}")
+
+
+def summary(stats):
+    lines = [f"{'':>24}" + "".join(f"{'p' + str(p):>9}" for p in PERCENTILES) + f"{'mean':>9}"]
+    for name, values in (("minutes to first helper", stats.first_helper),
+                         ("gold per minute", stats.gold_per_minute),
+                         ("helpers owned", stats.helpers),
+                         ("helper harvests", stats.helper_harvests)):
+        row = "".join(f"{value:>9.2f}" for value in stats.percentiles(values))
+        lines.append(f"{name:>24}{row}{np.nanmean(np.asarray(values, dtype=float)):>9.2f}")
+    lines.append(f"first helper afforded in {stats.afforded()} of {len(stats)} runs")
+    return "\n".join(lines)
+
+
+def parse_price(text):
+    name, _, gold = text.partition('=')
+    if name not in {crop.name for crop in CROPS} or not gold.isdigit():
+        raise argparse.ArgumentTypeError(f"expected CROP=GOLD with a crop from the catalogue, got {text!r}")
+    return name, int(gold)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play many seeded farms headlessly and report economy statistics.")
+    parser.add_argument('--runs', type=int, default=1000, help="farms to simulate (default 1000)")
+    parser.add_argument('--minutes', type=float, default=30, help="game minutes per farm (default 30)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes (default: all cores)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first farm; farm i uses seed + i")
+    parser.add_argument('--grid-size', type=int, default=20)
+    parser.add_argument('--helper-price', type=int, default=AI_HELPER_PRICE)
+    parser.add_argument('--harvest-interval', type=int, default=120, help="ticks between AI helper moves")
+    parser.add_argument('--price', type=parse_price, action='append', default=[], metavar='CROP=GOLD',
+                        help="base sell price override, e.g. turnip=3 (repeatable)")
+    parser.add_argument('--price-impact', type=float, default=PRICE_IMPACT,
+                        help=f"fraction a crop's price drops per item sold (default {PRICE_IMPACT}; 0: fixed prices)")
+    parser.add_argument('--price-recovery', type=float, default=RECOVERY_HALF_LIFE / FPS,
+                        help="seconds for the price drop from selling to halve (default %(default)g)")
+    parser.add_argument('--sell-at', type=int, default=20, help="crops the player carries before selling")
+    parser.add_argument('--report-every', type=int, default=0, help="runs between progress lines (default: ~20 lines)")
+    args = parser.parse_args(argv)
+
+    settings = {
+        'grid_size': args.grid_size,
+        'minutes': args.minutes,
+        'helper_price': args.helper_price,
+        'harvest_interval': args.harvest_interval,
+        'prices': dict(args.price),
+        'price_impact': args.price_impact,
+        'price_recovery': args.price_recovery,
+        'sell_at': args.sell_at,
+    }
+    report_every = args.report_every or max(1, args.runs // 20)
+    # Hand out farms in batches so workers aren't waiting on the queue,
+    # but small enough that progress keeps streaming in
+    chunksize = max(1, min(50, args.runs // (args.workers * 8)))
+
+    print(f"{args.runs} farms x {args.minutes:g} min on {args.workers} workers: {settings}")
+    sys.stdout.flush()
+    stats = Stats()
+    start = time.perf_counter()
+    with ProcessPoolExecutor(args.workers) as pool:
+        seeds = range(args.seed, args.seed + args.runs)
+        for result in pool.map(partial(run_farm, settings=settings), seeds, chunksize=chunksize):
+            stats.add(result)
+            if len(stats) % report_every == 0 or len(stats) == args.runs:
+                print(progress_line(stats, time.perf_counter() - start))
+                sys.stdout.flush()
+    print(summary(stats))
+
+
+if __name__ == '__main__':
+    main()
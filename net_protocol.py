@@ -0,0 +1,213 @@
+import json
+import struct
+
+import numpy as np
+
+from replay import read_varint, write_varint
+
+# Wire format between server.py and client.py. Every message is a 4-byte
+# little-endian length, a type byte and a payload. Apart from the JSON
+# welcome, payloads are packed binary, and the server only sends what
+# changed since the client's last update, inside that client's view.
+#
+# Server to client:
+#   WELCOME   JSON: player id, farm size, cell types, crops, prices, view size
+#   VIEW      u32 origin x, u32 origin y, u16 cols, u16 rows, type plane,
+#             growth plane: the whole view, sent when it scrolls
+#   CELLS     varint count, then per cell u16 index in the view, type, growth
+#   ENTITIES  varint x, y of this player; varint count, then id, x, y of the
+#             other players in view; varint count, then x, y of helpers in view
+#   ECONOMY   varint gold, helpers owned, merchant open, menu, then per crop
+#             in WELCOME order varint inventory, shed storage and market
+#             price in hundredths of gold
+#
+# Client to server:
+#   INPUT     varint length + movement keys held; varint count, then events:
+#             key (varint length + name), click (button, varint x, y in
+#             cells), area (varint x, y, width, height in cells)
+
+FRAME = struct.Struct('<I')
+VIEW_HEADER = struct.Struct('<IIHH')
+CELL = np.dtype([('index', '<u2'), ('type', 'u1'), ('growth', 'u1')])
+MAX_MESSAGE = 1 << 20
+MAX_EVENTS = 256  # per input message
+
+MSG_WELCOME = 0
+MSG_VIEW = 1
+MSG_CELLS = 2
+MSG_ENTITIES = 3
+MSG_ECONOMY = 4
+MSG_INPUT = 16
+
+MENUS = ['main', 'buy', 'sell', 'shed']
+
+EVENT_KEY = 0
+EVENT_CLICK = 1
+EVENT_AREA = 2
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+def frame(kind, payload):
+    return FRAME.pack(len(payload) + 1) + bytes([kind]) + payload
+
+
+def welcome(info):
+    return frame(MSG_WELCOME, json.dumps(info, separators=(',', ':')).encode('utf-8'))
+
+
+def view(origin, types, growth):
+    rows, cols = types.shape
+    return frame(MSG_VIEW, VIEW_HEADER.pack(origin[0], origin[1], cols, rows) + types.tobytes() + growth.tobytes())
+
+
+def cells(indices, types, growth):
+    records = np.empty(len(indices), dtype=CELL)
+    records['index'] = indices
+    records['type'] = types
+    records['growth'] = growth
+    out = bytearray()
+    write_varint(out, len(indices))
+    return frame(MSG_CELLS, bytes(out) + records.tobytes())
+
+
+def entities(player, others, helpers):
+    out = bytearray()
+    write_varint(out, player[0])
+    write_varint(out, player[1])
+    write_varint(out, len(others))
+    for player_id, x, y in others:
+        write_varint(out, player_id)
+        write_varint(out, x)
+        write_varint(out, y)
+    write_varint(out, len(helpers))
+    for x, y in helpers:
+        write_varint(out, x)
+        write_varint(out, y)
+    return frame(MSG_ENTITIES, bytes(out))
+
+
+def economy(values):
+    # values: gold, helpers, merchant open, menu index, then the counts
+    out = bytearray()
+    for value in values:
+        write_varint(out, value)
+    return frame(MSG_ECONOMY, bytes(out))
+
+
+def input_message(held, events):
+    out = bytearray()
+    write_varint(out, len(held))
+    out += held.encode('ascii')
+    write_varint(out, len(events))
+    for event in events:
+        if event[0] == 'key':
+            name = event[1].encode('utf-8')
+            out.append(EVENT_KEY)
+            write_varint(out, len(name))
+            out += name
+        elif event[0] == 'click':
+            out.append(EVENT_CLICK)
+            out.append(event[1] & 0xff)
+            write_varint(out, event[2])
+            write_varint(out, event[3])
+        elif event[0] == 'area':
+            out.append(EVENT_AREA)
+            for value in event[1:]:
+                write_varint(out, value)
+    return frame(MSG_INPUT, bytes(out))
+
+
+def split_frames(buffer):
+    # Pop every complete message off the front of a bytearray; returns a
+    # list of (type, payload)
+    messages = []
+    while len(buffer) >= FRAME.size:
+        length, = FRAME.unpack_from(buffer)
+        if not 0 < length <= MAX_MESSAGE:
+            raise ProtocolError(f"bad message length {length}")
+        if len(buffer) < FRAME.size + length:
+            break
+        messages.append((buffer[FRAME.size], bytes(buffer[FRAME.size + 1:FRAME.size + length])))
+        del buffer[:FRAME.size + length]
+    return messages
+
+
+def read_welcome(payload):
+    return json.loads(payload.decode('utf-8'))
+
+
+def read_view(payload):
+    x, y, cols, rows = VIEW_HEADER.unpack_from(payload)
+    planes = np.frombuffer(payload, dtype=np.uint8, offset=VIEW_HEADER.size, count=2 * cols * rows)
+    planes = planes.reshape(2, rows, cols)
+    return (x, y), planes[0].copy(), planes[1].copy()
+
+
+def read_cells(payload):
+    count, pos = read_varint(payload, 0)
+    return np.frombuffer(payload, dtype=CELL, offset=pos, count=count)
+
+
+def read_entities(payload):
+    player_x, pos = read_varint(payload, 0)
+    player_y, pos = read_varint(payload, pos)
+    count, pos = read_varint(payload, pos)
+    others = []
+    for _ in range(count):
+        values = []
+        for _ in range(3):
+            value, pos = read_varint(payload, pos)
+            values.append(value)
+        others.append(tuple(values))
+    count, pos = read_varint(payload, pos)
+    helpers = []
+    for _ in range(count):
+        x, pos = read_varint(payload, pos)
+        y, pos = read_varint(payload, pos)
+        helpers.append((x, y))
+    return (player_x, player_y), others, helpers
+
+
+def read_economy(payload):
+    values = []
+    pos = 0
+    while pos < len(payload):
+        value, pos = read_varint(payload, pos)
+        values.append(value)
+    return values
+
+
+def read_input(payload):
+    # Returns (held, events) in the form FarmGame.poll_input() uses, with
+    # clicks and areas in farm cells instead of screen pixels
+    length, pos = read_varint(payload, 0)
+    held = payload[pos:pos + length].decode('ascii')
+    pos += length
+    count, pos = read_varint(payload, pos)
+    if count > MAX_EVENTS:
+        raise ProtocolError(f"too many events in one input message: {count}")
+    events = []
+    for _ in range(count):
+        kind = payload[pos]
+        pos += 1
+        if kind == EVENT_KEY:
+            length, pos = read_varint(payload, pos)
+            events.append(('key', payload[pos:pos + length].decode('utf-8')))
+            pos += length
+        elif kind == EVENT_CLICK:
+            button = payload[pos]
+            x, pos = read_varint(payload, pos + 1)
+            y, pos = read_varint(payload, pos)
+            events.append(('click', button, x, y))
+        elif kind == EVENT_AREA:
+            values = []
+            for _ in range(4):
+                value, pos = read_varint(payload, pos)
+                values.append(value)
+            events.append(('area',) + tuple(values))
+        else:
+            raise ProtocolError(f"unknown input event {kind}")
+    return held, events
@@ -0,0 +1,88 @@
+import heapq
+
+# A* search for AI helper movement. Helpers move one cell at a time in the
+# four compass directions, can't walk through blocking cells (merchant,
+# shed) and harvest from any of the 8 cells around a crop.
+
+
+def _heuristic(x, y, target_x, target_y):
+    # Moves still needed to get within one cell of the target on both axes;
+    # exact on an open field, never an overestimate
+    return max(0, abs(x - target_x) - 1) + max(0, abs(y - target_y) - 1)
+
+
+def find_path(grid, start, target):
+    # Returns the cells to step through, in order, ending next to target
+    # ([] if start is already next to it), or None if it can't be reached.
+    start_x, start_y = start
+    target_x, target_y = target
+    if _heuristic(start_x, start_y, target_x, target_y) == 0:
+        return []
+
+    came_from = {start: None}
+    cost = {start: 0}
+    # Heap entries are (estimate, -cost, counter, cell). Among equally good
+    # cells the one furthest along is expanded first, so on an open field
+    # the search runs straight at the target instead of filling the whole
+    # rectangle between the two; counter keeps cells from being compared.
+    counter = 0
+    open_heap = [(_heuristic(start_x, start_y, target_x, target_y), 0, counter, start)]
+
+    while open_heap:
+        current = heapq.heappop(open_heap)[3]
+        x, y = current
+        if _heuristic(x, y, target_x, target_y) == 0:
+            # Walk back to the start
+            path = []
+            while current != start:
+                path.append(current)
+                current = came_from[current]
+            path.reverse()
+            return path
+
+        next_cost = cost[current] + 1
+        for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if not grid.is_passable(nx, ny):
+                continue
+            neighbour = (nx, ny)
+            if next_cost < cost.get(neighbour, next_cost + 1):
+                cost[neighbour] = next_cost
+                came_from[neighbour] = current
+                counter += 1
+                heapq.heappush(open_heap, (next_cost + _heuristic(nx, ny, target_x, target_y), -next_cost,
+                                           counter, neighbour))
+
+    return None
+
+
+class PathCache:
+    # A helper's current path. It stays valid until its target changes or
+    # a cell along it starts blocking helpers.
+    def __init__(self):
+        self.target = None
+        self.steps = []  # remaining cells, last one first
+        self.layout_version = -1
+
+    def next_step(self, grid, start, target):
+        # The next cell to move to, or None if target can't be reached
+        if self.target != target or not self.steps:
+            self._plan(grid, start, target)
+        elif self.layout_version != grid.layout_version:
+            # Something on the grid changed; replan only if it's on our path
+            self.layout_version = grid.layout_version
+            if not all(grid.is_passable(x, y) for x, y in self.steps):
+                self._plan(grid, start, target)
+
+        if not self.steps:
+            return None
+        return self.steps.pop()
+
+    def _plan(self, grid, start, target):
+        self.target = target
+        self.layout_version = grid.layout_version
+        path = find_path(grid, start, target)
+        self.steps = path[::-1] if path else []
+
+    def reset(self):
+        self.target = None
+        self.steps = []
@@ -0,0 +1,244 @@
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import time
+
+from farm_grid import FarmGrid, type_remap_table
+from savegame import HEADER, SaveFormatError, read_snapshot, write_snapshot
+
+# Input recordings. A recording is a regular save file of the game as it
+# was when recording started (marked with a 'recording' version in its
+# metadata), with the input of the session appended after the grid:
+#
+#   record   varint frames since the previous record, op byte, operands
+#
+#   OP_HELD  varint length, movement keys now held ('wd')
+#   OP_KEY   varint length, key name ('escape', 'f5', 'c')
+#   OP_CLICK button byte, varint x, varint y
+#   OP_QUIT  window closed
+#   OP_END   last frame of the session, written on close
+#   OP_AREA  varint x0, y0, x1, y1 of a right-button drag
+#
+# Frames without input cost nothing and held keys are only written when
+# they change, so an hour of play is typically a few kilobytes. The game
+# only consumes its own seeded RNG, so replaying the input from the same
+# start state reproduces the session exactly.
+#
+#   python Farmsim.py --record session.rec
+#   python replay.py session.rec              # headless, as fast as possible
+#   python replay.py session.rec --repeat 5   # as a deterministic benchmark
+
+RECORDING_VERSION = 1
+
+OP_HELD = 0
+OP_KEY = 1
+OP_CLICK = 2
+OP_QUIT = 3
+OP_END = 4
+OP_AREA = 5
+
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class InputRecorder:
+    def __init__(self, path, game):
+        if not hasattr(game.grid, 'types'):
+            raise ValueError("only farms kept in a single grid can be recorded")
+        state = game.get_state()
+        state['recording'] = RECORDING_VERSION
+        write_snapshot(path, state, game.grid.types, game.grid.growth)
+        self.file = open(path, 'ab')
+        self.frames = 0
+        self.last_record = 0
+        self.held = ''
+
+    def _start(self, out, op):
+        write_varint(out, self.frames - self.last_record)
+        self.last_record = self.frames
+        out.append(op)
+
+    def record(self, events, held):
+        # Input of the next frame, as returned by FarmGame.poll_input()
+        out = bytearray()
+        if held != self.held:
+            self._start(out, OP_HELD)
+            write_varint(out, len(held))
+            out += held.encode('ascii')
+            self.held = held
+        for event in events:
+            if event[0] == 'key':
+                name = event[1].encode('utf-8')
+                self._start(out, OP_KEY)
+                write_varint(out, len(name))
+                out += name
+            elif event[0] == 'click':
+                self._start(out, OP_CLICK)
+                out.append(event[1] & 0xff)
+                write_varint(out, max(0, event[2]))
+                write_varint(out, max(0, event[3]))
+            elif event[0] == 'area':
+                self._start(out, OP_AREA)
+                for value in event[1:]:
+                    write_varint(out, max(0, value))
+            elif event[0] == 'quit':
+                self._start(out, OP_QUIT)
+        if out:
+            self.file.write(out)
+        self.frames += 1
+
+    def close(self):
+        out = bytearray()
+        self._start(out, OP_END)
+        self.file.write(out)
+        self.file.close()
+
+
+def read_recording(path):
+    # Returns (state, grid, inputs, frames): the start state and grid, a
+    # list of (frame, events, held) for every frame with a change of input,
+    # and the number of frames recorded
+    state, types, growth = read_snapshot(path, mmap=False)
+    if 'recording' not in state:
+        raise SaveFormatError(f"{path}: a save file, not a recording")
+    if state['recording'] != RECORDING_VERSION:
+        raise SaveFormatError(f"{path}: unsupported recording version {state['recording']}")
+    height, width = types.shape
+    remap = type_remap_table(state['cell_types'])
+    if remap is not None:
+        types = remap.take(types)
+    grid = FarmGrid(width, height, types=types, growth=growth)
+
+    with open(path, 'rb') as f:
+        grid_offset = HEADER.unpack(f.read(HEADER.size))[-1]
+        f.seek(grid_offset + 2 * width * height)
+        data = f.read()
+
+    inputs = []
+    frame = 0
+    held = ''
+    pos = 0
+    while pos < len(data):
+        delta, pos = read_varint(data, pos)
+        op = data[pos]
+        pos += 1
+        frame += delta
+        if op == OP_END:
+            return state, grid, inputs, frame
+        if not inputs or inputs[-1][0] != frame:
+            inputs.append((frame, [], held))
+        if op == OP_HELD:
+            length, pos = read_varint(data, pos)
+            held = data[pos:pos + length].decode('ascii')
+            pos += length
+            inputs[-1] = (frame, inputs[-1][1], held)
+        elif op == OP_KEY:
+            length, pos = read_varint(data, pos)
+            inputs[-1][1].append(('key', data[pos:pos + length].decode('utf-8')))
+            pos += length
+        elif op == OP_CLICK:
+            button = data[pos]
+            x, pos = read_varint(data, pos + 1)
+            y, pos = read_varint(data, pos)
+            inputs[-1][1].append(('click', button, x, y))
+        elif op == OP_AREA:
+            corners = []
+            for _ in range(4):
+                value, pos = read_varint(data, pos)
+                corners.append(value)
+            inputs[-1][1].append(('area',) + tuple(corners))
+        elif op == OP_QUIT:
+            inputs[-1][1].append(('quit',))
+        else:
+            raise SaveFormatError(f"{path}: unknown input record {op} at byte {pos - 1}")
+    # The game didn't close the recording; play what made it to disk
+    return state, grid, inputs, frame + 1
+
+
+def state_checksum(game):
+    # Fingerprint of the whole game state, to check two runs agree
+    state = game.get_state()
+    digest = hashlib.sha1(json.dumps(state, sort_keys=True).encode('utf-8'))
+    digest.update(game.grid.types.tobytes())
+    digest.update(game.grid.growth.tobytes())
+    return digest.hexdigest()
+
+
+def replay(path, render=False, profile_path=None):
+    # Play a recording back on a fresh game with no frame limit; returns
+    # (game, frames played, seconds taken). profile_path as for
+    # FarmGame.run().
+    import Farmsim
+
+    state, grid, inputs, frames = read_recording(path)
+    game = Farmsim.FarmGame(resume=False, saves=False)
+    game.set_state(state, grid)
+    if profile_path:
+        game.profiler.open_export(profile_path)
+
+    next_input = 0
+    held = ''
+    start = time.perf_counter()
+    frame = 0
+    while frame < frames:
+        events = []
+        if next_input < len(inputs) and inputs[next_input][0] == frame:
+            events, held = inputs[next_input][1], inputs[next_input][2]
+            next_input += 1
+        frame += 1
+        game.profiler.start_frame()
+        if not game.frame(events, held, draw=render):
+            break
+    elapsed = time.perf_counter() - start
+    game.profiler.close()
+    return game, frame, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play back a recorded session headlessly at full speed.")
+    parser.add_argument('recording')
+    parser.add_argument('--render', action='store_true', help="draw every frame too, to include rendering in timings")
+    parser.add_argument('--repeat', type=int, default=1, help="play the recording this many times (default 1)")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="write the first run's per-frame section timings to PATH (CSV if it ends in .csv)")
+    args = parser.parse_args(argv)
+
+    # No window needed; pygame draws into memory
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+    times = []
+    checksums = set()
+    for run in range(args.repeat):
+        game, frames, elapsed = replay(args.recording, args.render, args.profile if run == 0 else None)
+        times.append(elapsed)
+        checksums.add(state_checksum(game))
+    best, median = min(times), statistics.median(times)
+    print(f"{frames} frames ({frames / 60:.1f} s of play) in {median * 1000:.1f} ms median, {best * 1000:.1f} ms best:"
+          f" {frames / best:.0f} frames/s")
+    print(f"gold {game.gold}, {game.ticks} ticks, state {sorted(checksums)[0]}")
+    if len(checksums) > 1:
+        print(f"replays disagree: {len(checksums)} different end states")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
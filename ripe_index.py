@@ -0,0 +1,199 @@
+import numpy as np
+
+# Spatial index of ripe crop cells. The grid is split into square buckets
+# and the index keeps a count of ripe cells per bucket, so a nearest-crop
+# search only opens buckets that have something in them, closest first,
+# instead of scanning the whole grid. Counts are plain array updates, so
+# thousands of crops ripening on one tick cost a single bincount.
+
+BUCKET_SIZE = 16
+
+# With this few ripe crops the occupied buckets are found and sorted in one
+# array pass; with more, one is almost always close by, so the search walks
+# rings of buckets outward from the searcher instead
+SPARSE_RIPE = 64
+
+# Before walking the rings, the search looks at the cells this many steps
+# or fewer from the searcher on both axes. On a busy field the nearest crop
+# is almost always in there, and one small array pass finds it.
+NEAR_WINDOW = 4
+
+
+class RipeIndex:
+    def __init__(self, grid, bucket_size=BUCKET_SIZE):
+        self.grid = grid
+        self.bucket_size = bucket_size
+        self.cols = (grid.width + bucket_size - 1) // bucket_size
+        self.rows = (grid.height + bucket_size - 1) // bucket_size
+        # Built from the grid on first use (see invalidate())
+        self.counts = None
+        self.count = 0
+
+    def __len__(self):
+        if self.counts is None:
+            self.rebuild()
+        return self.count
+
+    def __contains__(self, cell):
+        return bool(self.grid.is_ripe(*cell))
+
+    def __iter__(self):
+        ys, xs = np.nonzero(self.grid.ripe_mask())
+        return zip(xs.tolist(), ys.tolist())
+
+    def rebuild(self):
+        # Recount every bucket from the grid
+        size = self.bucket_size
+        mask = self.grid.ripe_mask()
+        padded = np.zeros((self.rows * size, self.cols * size), dtype=np.int32)
+        padded[:mask.shape[0], :mask.shape[1]] = mask
+        self.counts = padded.reshape(self.rows, size, self.cols, size).sum(axis=(1, 3), dtype=np.int32)
+        self.count = int(self.counts.sum())
+
+    def invalidate(self):
+        # Forget the counts; they are rebuilt from the grid when next needed,
+        # so a freshly loaded grid costs nothing until someone asks
+        self.counts = None
+        self.count = 0
+
+    # add/discard must only be called when a cell actually changes between
+    # ripe and not ripe; the grid takes care of that. Until the counts are
+    # built they have nothing to do, as the rebuild will see the change.
+    def add(self, x, y):
+        if self.counts is None:
+            return
+        self.counts[y // self.bucket_size, x // self.bucket_size] += 1
+        self.count += 1
+
+    def discard(self, x, y):
+        if self.counts is None:
+            return
+        self.counts[y // self.bucket_size, x // self.bucket_size] -= 1
+        self.count -= 1
+
+    def add_many(self, xs, ys):
+        if len(xs) == 0 or self.counts is None:
+            return
+        size = self.bucket_size
+        keys = (ys // size) * self.cols + xs // size
+        self.counts += np.bincount(keys, minlength=self.counts.size).reshape(self.counts.shape).astype(np.int32)
+        self.count += len(xs)
+
+    def discard_many(self, xs, ys):
+        if len(xs) == 0 or self.counts is None:
+            return
+        size = self.bucket_size
+        keys = (ys // size) * self.cols + xs // size
+        self.counts -= np.bincount(keys, minlength=self.counts.size).reshape(self.counts.shape).astype(np.int32)
+        self.count -= len(xs)
+
+    def _bucket_distance(self, x, y, bx, by):
+        # Smallest Manhattan distance from (x, y) to any cell in the bucket
+        size = self.bucket_size
+        x0, y0 = bx * size, by * size
+        dx = max(x0 - x, 0, x - (x0 + size - 1))
+        dy = max(y0 - y, 0, y - (y0 + size - 1))
+        return dx + dy
+
+    def _excluded(self, exclude):
+        # exclude as arrays of xs and ys, so each bucket can drop its
+        # excluded cells in one array operation
+        cells = np.array(list(exclude), dtype=np.int64).reshape(-1, 2)
+        return cells[:, 0], cells[:, 1]
+
+    def _best_in(self, x0, y0, x1, y1, x, y, excluded, best):
+        # Closest ripe cell to (x, y) in the cells x0 <= cx < x1, y0 <= cy
+        # < y1, if closer than best. best is (dist, y, x); ties go to the
+        # lowest row then column, the same order a row-by-row grid scan
+        # would find them in.
+        types = self.grid.types[y0:y1, x0:x1]
+        growth = self.grid.growth[y0:y1, x0:x1]
+        mask = self.grid.ripe_mask(types, growth)
+        if excluded is not None:
+            xs, ys = excluded
+            inside = (xs >= x0) & (xs < x0 + mask.shape[1]) & (ys >= y0) & (ys < y0 + mask.shape[0])
+            mask[ys[inside] - y0, xs[inside] - x0] = False
+        cys, cxs = np.nonzero(mask)
+        if not len(cys):
+            return best
+        dist = np.abs(cxs - (x - x0))
+        dist += np.abs(cys - (y - y0))
+        # nonzero lists cells row by row, so argmin's pick among equally
+        # close cells is already the lowest row then column
+        i = dist.argmin()
+        candidate = (int(dist[i]), y0 + int(cys[i]), x0 + int(cxs[i]))
+        if best is None or candidate < best:
+            return candidate
+        return best
+
+    def nearest(self, x, y, exclude=None):
+        # Nearest ripe cell to (x, y) by Manhattan distance, skipping any
+        # cells in the set exclude. Returns (x, y) or None.
+        if len(self) == 0:
+            return None
+        excluded = None
+        if exclude:
+            excluded = self._excluded(exclude)
+            # Only when there are as many exclusions as ripe cells can they
+            # cover them all; then count how many of them are still ripe
+            if len(exclude) >= self.count:
+                xs, ys = excluded
+                on_grid = (xs >= 0) & (xs < self.grid.width) & (ys >= 0) & (ys < self.grid.height)
+                xs, ys = xs[on_grid], ys[on_grid]
+                if np.count_nonzero(self.grid.ripe_mask(self.grid.types[ys, xs], self.grid.growth[ys, xs])) >= self.count:
+                    return None
+
+        best = None
+        size = self.bucket_size
+        if self.count > SPARSE_RIPE:
+            # Every cell within NEAR_WINDOW steps by Manhattan distance is
+            # in the window, so a crop found that close is the answer
+            best = self._best_in(max(0, x - NEAR_WINDOW), max(0, y - NEAR_WINDOW), x + NEAR_WINDOW + 1,
+                                 y + NEAR_WINDOW + 1, x, y, excluded, None)
+            if best is not None and best[0] <= NEAR_WINDOW:
+                return best[2], best[1]
+            best = None
+
+        if self.count <= SPARSE_RIPE:
+            # Visit occupied buckets closest first
+            occupied = np.flatnonzero(self.counts)
+            bys, bxs = np.divmod(occupied, self.cols)
+            dx = np.maximum(np.maximum(bxs * size - x, x - (bxs * size + size - 1)), 0)
+            dy = np.maximum(np.maximum(bys * size - y, y - (bys * size + size - 1)), 0)
+            lower = dx + dy
+            for i in np.argsort(lower, kind='stable').tolist():
+                if best is not None and lower[i] > best[0]:
+                    break
+                bx, by = int(bxs[i]), int(bys[i])
+                best = self._best_in(bx * size, by * size, bx * size + size, by * size + size, x, y, excluded, best)
+        else:
+            # Walk rings of buckets outward from the searcher's bucket
+            cbx, cby = x // size, y // size
+            max_ring = max(cbx, self.cols - 1 - cbx, cby, self.rows - 1 - cby)
+            for ring in range(max_ring + 1):
+                # Every cell in this ring is at least this far away
+                if best is not None and ring > 0 and (ring - 1) * size + 1 > best[0]:
+                    break
+                for bx, by in self._ring(cbx, cby, ring):
+                    if self.counts[by, bx]:
+                        best = self._best_in(bx * size, by * size, bx * size + size, by * size + size,
+                                             x, y, excluded, best)
+
+        if best is None:
+            return None
+        return best[2], best[1]
+
+    def _ring(self, cbx, cby, ring):
+        if ring == 0:
+            yield cbx, cby
+            return
+        for bx in range(max(0, cbx - ring), min(self.cols, cbx + ring + 1)):
+            if cby - ring >= 0:
+                yield bx, cby - ring
+            if cby + ring < self.rows:
+                yield bx, cby + ring
+        for by in range(max(0, cby - ring + 1), min(self.rows, cby + ring)):
+            if cbx - ring >= 0:
+                yield cbx - ring, by
+            if cbx + ring < self.cols:
+                yield cbx + ring, by
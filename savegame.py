@@ -0,0 +1,216 @@
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from farm_core import FPS
+from farm_grid import FarmGrid, type_remap_table
+
+# Versioned binary save format:
+#
+#   header   magic, version, flags, width, height, metadata length, grid offset
+#   metadata UTF-8 JSON of FarmSimulation.get_state()
+#   padding  up to a 64-byte boundary
+#   grid     raw uint8 type plane, then raw uint8 growth plane (row-major),
+#            or the two planes zlib-compressed if FLAG_ZLIB is set
+#
+# The grid section is stored exactly as it sits in memory, so loading maps it
+# straight from the file instead of parsing it; a multi-million-cell farm
+# opens without reading the whole grid up front: the ripe index and the
+# count of growing crops are only built once something needs them, and
+# the planes stay mapped until the farm is saved over that same file.
+# Compressed saves are smaller but have to be inflated on load.
+
+SAVE_MAGIC = b'FARM'
+SAVE_VERSION = 1
+HEADER = struct.Struct('<4sHHIIIQ')
+GRID_ALIGN = 64
+FLAG_ZLIB = 1
+
+AUTOSAVE_INTERVAL = 60 * 60  # ticks (one minute of game time)
+
+
+class SaveFormatError(ValueError):
+    pass
+
+
+def write_snapshot(path, state, types, growth, compress=False):
+    meta = json.dumps(state, separators=(',', ':')).encode('utf-8')
+    height, width = types.shape
+    grid_offset = HEADER.size + len(meta)
+    grid_offset += -grid_offset % GRID_ALIGN
+
+    # Write next to the target and swap it in, so a crash mid-save never
+    # leaves a half-written file behind
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        flags = FLAG_ZLIB if compress else 0
+        f.write(HEADER.pack(SAVE_MAGIC, SAVE_VERSION, flags, width, height, len(meta), grid_offset))
+        f.write(meta)
+        f.write(b'\0' * (grid_offset - HEADER.size - len(meta)))
+        if compress:
+            packer = zlib.compressobj(1)
+            f.write(packer.compress(np.ascontiguousarray(types, dtype=np.uint8).data))
+            f.write(packer.compress(np.ascontiguousarray(growth, dtype=np.uint8).data))
+            f.write(packer.flush())
+        else:
+            f.write(np.ascontiguousarray(types, dtype=np.uint8).data)
+            f.write(np.ascontiguousarray(growth, dtype=np.uint8).data)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path, mmap=True):
+    # Returns (state, types, growth). With mmap the planes are copy-on-write
+    # maps of the file: pages load on first touch and edits stay in memory.
+    # While they are mapped, Windows won't let the file be replaced; see
+    # release_file().
+    # Compressed saves are always read into memory.
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise SaveFormatError(f"{path}: file is too short to be a save")
+        magic, version, flags, width, height, meta_len, grid_offset = HEADER.unpack(header)
+        if magic != SAVE_MAGIC:
+            raise SaveFormatError(f"{path}: not a farm save file")
+        if version != SAVE_VERSION:
+            raise SaveFormatError(f"{path}: unsupported save version {version}")
+        state = json.loads(f.read(meta_len).decode('utf-8'))
+
+        cells = width * height
+        if flags & FLAG_ZLIB:
+            f.seek(grid_offset)
+            planes = np.frombuffer(zlib.decompress(f.read()), dtype=np.uint8)
+            planes = planes.reshape(2, height, width).copy()
+        elif mmap:
+            planes = np.memmap(path, dtype=np.uint8, mode='c', offset=grid_offset, shape=(2, height, width))
+        else:
+            f.seek(grid_offset)
+            planes = np.frombuffer(f.read(2 * cells), dtype=np.uint8).reshape(2, height, width).copy()
+    return state, planes[0], planes[1]
+
+
+def take_snapshot(sim):
+    # A consistent copy of the sim's state that later ticks can't touch.
+    # Copying the two uint8 planes is a flat memcpy (about 2 MB for a
+    # 1000x1000 farm), far cheaper than serializing them.
+    state = sim.get_state()
+    state['saved_at'] = time.time()
+    return state, sim.grid.types.copy(), sim.grid.growth.copy()
+
+
+def save_game(sim, path, compress=False):
+    release_file(sim.grid, path)
+    state = sim.get_state()
+    state['saved_at'] = time.time()
+    write_snapshot(path, state, sim.grid.types, sim.grid.growth, compress)
+
+
+def load_game(sim, path, mmap=True, catch_up=False):
+    # Restore sim in place from a save file; returns the saved state dict.
+    # With catch_up the farm is fast-forwarded by the wall-clock time that
+    # passed since the save was written.
+    state, types, growth = read_snapshot(path, mmap)
+    height, width = types.shape
+    remap = type_remap_table(state['cell_types'])
+    if remap is not None:
+        # The crop catalogue changed since this save; renumber the cells
+        types = remap.take(types)
+    sim.set_state(state, FarmGrid(width, height, types=types, growth=growth))
+    if catch_up:
+        catch_up_offline(sim, state)
+    return state
+
+
+def release_file(grid, path):
+    # Windows won't replace a file that is still mapped, so before saving
+    # over the file a grid's planes were loaded from, read them into memory
+    path = os.path.abspath(path)
+    for name in ('types', 'growth'):
+        plane = getattr(grid, name)
+        if isinstance(plane, np.memmap) and plane.filename == path:
+            setattr(grid, name, np.array(plane))
+
+
+def catch_up_offline(sim, state):
+    # Fast-forward sim by the wall-clock time since state was saved
+    if 'saved_at' in state:
+        elapsed = max(0.0, time.time() - state['saved_at'])
+        sim.fast_forward(int(elapsed * FPS))
+
+
+class Autosaver:
+    # Periodic saves that don't stall the frame loop. The main thread only
+    # takes a snapshot; serializing, compressing and replacing the file
+    # happen on a worker thread. If a save is still being written when the
+    # next one is due, the newer snapshot replaces the queued one.
+    def __init__(self, path, interval_ticks=AUTOSAVE_INTERVAL, compress=False):
+        self.path = path
+        self.interval_ticks = interval_ticks
+        self.compress = compress
+        self.last_save_tick = None
+        self.saves_written = 0
+        self.last_error = None
+        self.last_snapshot_ms = 0.0  # main-thread cost of the last snapshot
+
+        self._pending = None
+        self._busy = False
+        self._closed = False
+        self._lock = threading.Condition()
+        self._thread = threading.Thread(target=self._worker, name="autosave", daemon=True)
+        self._thread.start()
+
+    def maybe_save(self, sim):
+        if self.last_save_tick is None:
+            self.last_save_tick = sim.ticks
+        elif sim.ticks - self.last_save_tick >= self.interval_ticks:
+            self.save(sim)
+
+    def save(self, sim):
+        start = time.perf_counter()
+        release_file(sim.grid, self.path)
+        snapshot = take_snapshot(sim)
+        self.last_snapshot_ms = (time.perf_counter() - start) * 1000
+        self.last_save_tick = sim.ticks
+        with self._lock:
+            self._pending = snapshot
+            self._lock.notify_all()
+
+    def flush(self):
+        # Block until every queued save is on disk
+        with self._lock:
+            while self._pending is not None or self._busy:
+                self._lock.wait()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+        self._thread.join()
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                while self._pending is None and not self._closed:
+                    self._lock.wait()
+                if self._pending is None:
+                    return
+                state, types, growth = self._pending
+                self._pending = None
+                self._busy = True
+
+            try:
+                write_snapshot(self.path, state, types, growth, self.compress)
+                self.saves_written += 1
+            except Exception as e:
+                # Whatever went wrong, the worker carries on: flush() and
+                # close() wait for it, so it must never die mid-save
+                self.last_error = e
+            finally:
+                with self._lock:
+                    self._busy = False
+                    self._lock.notify_all()
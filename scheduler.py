@@ -0,0 +1,79 @@
+# Hands out harvest jobs to AI helpers. Each ripe crop is claimed by at most
+# one helper, so helpers spread over the field instead of all chasing the
+# same nearest cell.
+
+from pathfinding import PathCache
+
+
+class AIHelper:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.target = None  # (x, y) of the crop this helper is assigned to
+        self.path = PathCache()
+
+
+class JobScheduler:
+    def __init__(self, grid):
+        self.grid = grid
+        # Ripe crops each helper couldn't path to, by index in the helper
+        # list. Kept per helper: a helper boxed in by sheds mustn't stop
+        # the others from taking crops they can reach.
+        self.unreachable = {}
+
+    def mark_unreachable(self, index, helper):
+        self.unreachable.setdefault(index, set()).add(helper.target)
+        helper.target = None
+        helper.path.reset()
+
+    def unreachable_for(self, index):
+        return self.unreachable.get(index, ())
+
+    def assign(self, helpers):
+        # A chunked world keeps where the helpers are and where they're
+        # headed in memory; they'll be back there every step
+        self.grid.keep_loaded(self._busy_cells(helpers))
+
+        # Crops that turned out to be unreachable stay off a helper's job
+        # list until they are harvested or replaced
+        pruned = {}
+        for index, cells in self.unreachable.items():
+            cells = {cell for cell in cells if self.grid.is_ripe(*cell)}
+            if cells and index < len(helpers):
+                pruned[index] = cells
+        self.unreachable = pruned
+
+        # Keep jobs that are still valid; a crop harvested by someone else
+        # (or replaced) frees its helper up again
+        claimed = set()
+        idle = []
+        for index, helper in enumerate(helpers):
+            if helper.target is not None and helper.target not in claimed and self.grid.is_ripe(*helper.target):
+                claimed.add(helper.target)
+            else:
+                helper.target = None
+                idle.append(index)
+
+        # Greedy matching: each idle helper takes the nearest crop nobody
+        # has claimed and it hasn't failed to reach. One index query per
+        # idle helper keeps a round bounded even with hundreds of helpers
+        # and ripe crops.
+        for index in idle:
+            if len(claimed) >= len(self.grid.ripe):
+                break
+            helper = helpers[index]
+            exclude = claimed
+            if index in self.unreachable:
+                exclude = claimed | self.unreachable[index]
+            target = self.grid.nearest_ripe(helper.x, helper.y, exclude=exclude)
+            if target is None:
+                continue
+            helper.target = target
+            claimed.add(target)
+
+        self.grid.keep_loaded(self._busy_cells(helpers))
+
+    def _busy_cells(self, helpers):
+        cells = [(helper.x, helper.y) for helper in helpers]
+        cells += [helper.target for helper in helpers if helper.target is not None]
+        return cells
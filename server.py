@@ -0,0 +1,278 @@
+import argparse
+import asyncio
+import os
+import time
+
+import numpy as np
+
+import net_protocol as proto
+from farm_core import FarmSimulation, FPS, GRID_SIZE, MOVE_DIRECTIONS
+from farm_grid import CELL_TYPES, CROPS
+from savegame import Autosaver, load_game
+
+# Authoritative multiplayer server. One headless FarmSimulation is shared by
+# every connected player: the field, gold, shed and AI helpers are common,
+# while each player has their own position, inventory and menu. Clients
+# send their input; the server runs the game at FPS ticks per second and,
+# every SYNC_EVERY ticks, sends each client what changed inside its view
+# (see net_protocol.py). A client's traffic depends on its view size, not
+# on the size of the farm or how many others are playing.
+#
+#   python server.py --port 7777 --size 100
+#   python client.py localhost 7777
+
+DEFAULT_PORT = 7777
+VIEW_SIZE = GRID_SIZE  # cells each client sees in each direction
+SYNC_EVERY = 3  # ticks between updates to clients (20 per second)
+MAX_BUFFERED = 256 * 1024  # bytes queued for a client before its updates are held back
+MAX_PENDING_EVENTS = 120  # input events queued per client between ticks
+
+# Fields of FarmSimulation that belong to each player rather than the farm
+PLAYER_FIELDS = ('player_x', 'player_y', 'inventory', 'merchant_open', 'merchant_menu', 'move_timer')
+
+
+class Client:
+    def __init__(self, player_id, writer, sim):
+        self.player_id = player_id
+        self.writer = writer
+        self.player = {
+            'player_x': sim.player_x,
+            'player_y': sim.player_y,
+            'inventory': {crop.item: 0 for crop in CROPS},
+            'merchant_open': False,
+            'merchant_menu': 'main',
+            'move_timer': 0,
+        }
+        self.held = ''
+        self.events = []
+
+        # What this client was last sent, so only changes go out
+        self.origin = None
+        self.sent_types = None
+        self.sent_growth = None
+        self.sent_entities = None
+        self.sent_economy = None
+        self.bytes_sent = 0
+        self.updates_held = 0  # syncs skipped because the client fell behind
+
+    def send(self, message):
+        self.writer.write(message)
+        self.bytes_sent += len(message)
+
+
+class FarmServer:
+    def __init__(self, sim, view_size=VIEW_SIZE, sync_every=SYNC_EVERY, autosaver=None):
+        self.sim = sim
+        self.view_cols = min(view_size, sim.grid.width)
+        self.view_rows = min(view_size, sim.grid.height)
+        self.sync_every = sync_every
+        self.autosaver = autosaver
+        self.clients = {}
+        self.next_player_id = 1
+        self.tick_times = []  # seconds per tick since the last stats line
+
+    def welcome(self, client):
+        return proto.welcome({
+            'player': client.player_id,
+            'width': self.sim.grid.width,
+            'height': self.sim.grid.height,
+            'cell_types': CELL_TYPES,
+            'crops': [crop.item for crop in CROPS],
+            'crop_prices': self.sim.crop_prices,
+            'ai_helper_price': self.sim.ai_helper_price,
+            'view': [self.view_cols, self.view_rows],
+        })
+
+    async def handle(self, reader, writer):
+        client = Client(self.next_player_id, writer, self.sim)
+        self.next_player_id += 1
+        self.clients[client.player_id] = client
+        client.send(self.welcome(client))
+        buffer = bytearray()
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                buffer += data
+                for kind, payload in proto.split_frames(buffer):
+                    if kind != proto.MSG_INPUT:
+                        raise proto.ProtocolError(f"unexpected message type {kind}")
+                    held, events = proto.read_input(payload)
+                    client.held = ''.join(key for key in held if key in MOVE_DIRECTIONS)
+                    # A client flooding input only loses its own events
+                    client.events.extend(events[:MAX_PENDING_EVENTS - len(client.events)])
+        except (ConnectionError, proto.ProtocolError, IndexError, UnicodeDecodeError):
+            pass
+        finally:
+            del self.clients[client.player_id]
+            writer.close()
+
+    def apply_input(self, client):
+        # Run one client's input against the shared farm as that player
+        sim = self.sim
+        for field in PLAYER_FIELDS:
+            setattr(sim, field, client.player[field])
+        for event in client.events:
+            if event[0] == 'key':
+                if sim.merchant_open:
+                    sim.menu_key(event[1])
+            elif event[0] == 'click' and not sim.merchant_open:
+                if event[1] == 1:
+                    sim.interact(event[2], event[3])
+            elif event[0] == 'area' and not sim.merchant_open:
+                area = self.clip_to_view(client, *event[1:])
+                if area is not None:
+                    sim.harvest_area(*area)
+                    sim.plant_area(*area)
+        client.events = []
+        sim.move_held(client.held)
+        for field in PLAYER_FIELDS:
+            client.player[field] = getattr(sim, field)
+
+    def clip_to_view(self, client, x, y, width, height):
+        # Players can only work the part of the farm they can see, as in
+        # FarmGame.work_area()
+        if client.origin is None:
+            return None
+        left, top = max(x, client.origin[0]), max(y, client.origin[1])
+        right = min(x + width, client.origin[0] + self.view_cols)
+        bottom = min(y + height, client.origin[1] + self.view_rows)
+        if left >= right or top >= bottom:
+            return None
+        return left, top, right - left, bottom - top
+
+    def tick(self):
+        for client in list(self.clients.values()):
+            self.apply_input(client)
+        self.sim.step(1)
+        if self.sim.ticks % self.sync_every == 0:
+            self.sync()
+        if self.autosaver is not None:
+            self.autosaver.maybe_save(self.sim)
+
+    def view_origin(self, player):
+        # Same framing as FarmGame.update_camera()
+        grid = self.sim.grid
+        x = max(0, min(grid.width - self.view_cols, player['player_x'] - self.view_cols // 2))
+        y = max(0, min(grid.height - self.view_rows, player['player_y'] - self.view_rows // 2))
+        return x, y
+
+    def sync(self):
+        sim = self.sim
+        for client in list(self.clients.values()):
+            # A client that can't keep up gets nothing more queued; what it
+            # missed goes out in one update once its buffer drains
+            if client.writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+                client.updates_held += 1
+                continue
+            self.sync_client(client, sim)
+
+    def sync_client(self, client, sim):
+        origin = self.view_origin(client.player)
+        types, growth = sim.grid.region(origin[0], origin[1], self.view_cols, self.view_rows)
+        if origin != client.origin:
+            client.send(proto.view(origin, types, growth))
+            client.origin = origin
+            client.sent_types = types.copy()
+            client.sent_growth = growth.copy()
+        else:
+            changed = np.flatnonzero((types != client.sent_types) | (growth != client.sent_growth))
+            if len(changed):
+                client.send(proto.cells(changed, types.reshape(-1)[changed], growth.reshape(-1)[changed]))
+                client.sent_types[...] = types
+                client.sent_growth[...] = growth
+
+        left, top = origin
+        right, bottom = left + self.view_cols, top + self.view_rows
+        player = (client.player['player_x'], client.player['player_y'])
+        others = [(other.player_id, other.player['player_x'], other.player['player_y'])
+                  for other in self.clients.values() if other is not client
+                  and left <= other.player['player_x'] < right and top <= other.player['player_y'] < bottom]
+        helpers = [(helper.x, helper.y) for helper in sim.helpers
+                   if left <= helper.x < right and top <= helper.y < bottom]
+        entities = (player, others, helpers)
+        if entities != client.sent_entities:
+            client.send(proto.entities(player, others, helpers))
+            client.sent_entities = entities
+
+        economy = [sim.gold, len(sim.helpers), int(client.player['merchant_open']),
+                   proto.MENUS.index(client.player['merchant_menu'])]
+        economy += [client.player['inventory'][crop.item] for crop in CROPS]
+        economy += [sim.shed_storage[crop.item] for crop in CROPS]
+        economy += [round(sim.crop_price(crop) * 100) for crop in CROPS]
+        if economy != client.sent_economy:
+            client.send(proto.economy(economy))
+            client.sent_economy = economy
+
+    async def run_ticks(self, report_every=0):
+        # Fixed-rate game loop. If a tick runs late the next ones follow
+        # straight away to catch up, but never more than a quarter second's
+        # worth, so a stall doesn't turn into a burst.
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        last_report = time.perf_counter()
+        sent_at_report = 0
+        while True:
+            start = time.perf_counter()
+            self.tick()
+            self.tick_times.append(time.perf_counter() - start)
+
+            if report_every and time.perf_counter() - last_report >= report_every:
+                sent = sum(client.bytes_sent for client in self.clients.values())
+                print(self.stats_line(time.perf_counter() - last_report, sent - sent_at_report))
+                last_report = time.perf_counter()
+                sent_at_report = sent
+                self.tick_times = []
+
+            next_tick += 1 / FPS
+            now = loop.time()
+            if next_tick < now - 0.25:
+                next_tick = now
+            await asyncio.sleep(max(0.0, next_tick - now))
+
+    def stats_line(self, elapsed, sent):
+        times = np.array(self.tick_times or [0.0]) * 1000
+        clients = max(1, len(self.clients))
+        return (f"{len(self.clients)} clients | tick p50 {np.percentile(times, 50):.2f} ms"
+                f" p99 {np.percentile(times, 99):.2f} ms | {sent / elapsed / 1024:.1f} KB/s out,"
+                f" {sent / elapsed / clients / 1024:.2f} KB/s per client")
+
+
+async def serve(server, host, port, report_every=0):
+    listener = await asyncio.start_server(server.handle, host, port)
+    async with listener:
+        await server.run_ticks(report_every)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Host a shared farm for client.py to connect to.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--size', type=int, default=GRID_SIZE, help="farm size in cells (default 20)")
+    parser.add_argument('--seed', type=int, help="seed for a new farm")
+    parser.add_argument('--save', metavar='PATH', help="load the farm from PATH if it exists and autosave to it")
+    parser.add_argument('--sync-every', type=int, default=SYNC_EVERY, help="ticks between client updates")
+    parser.add_argument('--report-every', type=float, default=10, help="seconds between stats lines (0: off)")
+    args = parser.parse_args(argv)
+
+    sim = FarmSimulation(args.size, seed=args.seed)
+    autosaver = None
+    if args.save:
+        if os.path.exists(args.save):
+            load_game(sim, args.save, catch_up=True)
+        autosaver = Autosaver(args.save)
+    server = FarmServer(sim, sync_every=args.sync_every, autosaver=autosaver)
+    print(f"serving a {sim.grid.width}x{sim.grid.height} farm on {args.host}:{args.port}")
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.report_every))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if autosaver is not None:
+            autosaver.save(sim)
+            autosaver.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+import argparse
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from farm_core import FarmSimulation, FPS, GRID_SIZE
+from farm_grid import FarmGrid
+
+# Many independent farms (one per tenant) run in a pool of worker
+# processes. Farm i belongs to shard i % workers, and each shard's worker
+# steps all of its farms at FPS ticks per second with the event-jumping
+# FarmSimulation.step(), so adding cores adds farms.
+#
+# Nothing big crosses a pipe. Every farm's type and growth planes live in a
+# shared memory block that the worker's FarmGrid works on directly, and
+# per-farm and per-shard stats are written to two more shared arrays that
+# the coordinator reads whenever it likes. Each farm's stats row starts
+# with a sequence number the worker makes odd while it steps that farm, so
+# a reader can take a consistent copy of a farm without locking (see
+# FarmShards.snapshot()). Only small commands and their results, e.g.
+# call(farm, 'buy_ai_helper'), go through the pipes.
+#
+#   python shards.py --farms 64 --size 100
+
+# Columns of the per-farm stats array
+FARM_FIELDS = ('seq', 'ticks', 'gold', 'helpers', 'growing', 'ripe', 'helper_harvests')
+SEQ, TICKS, GOLD, HELPERS, GROWING, RIPE, HELPER_HARVESTS = range(len(FARM_FIELDS))
+
+# Columns of the per-shard stats array: ticks stepped, seconds spent
+# stepping, and ticks given up on because the shard fell too far behind
+SHARD_FIELDS = ('ticks', 'busy', 'dropped')
+SHARD_TICKS, SHARD_BUSY, SHARD_DROPPED = range(len(SHARD_FIELDS))
+
+MAX_CATCH_UP = FPS // 4  # ticks a late shard steps at once before it lets its farms fall behind
+REPORT_EVERY = 5  # seconds between stats lines
+
+
+class ShardError(RuntimeError):
+    pass
+
+
+def plane_views(block, size):
+    # (types, growth) of a farm, as views on its shared memory block
+    planes = np.ndarray((2, size, size), dtype=np.uint8, buffer=block.buf)
+    return planes[0], planes[1]
+
+
+def run_shard(shard, farm_ids, size, seed, plane_names, stats_name, shard_stats_name, farms, workers, conn):
+    # Worker process: step this shard's farms in real time until told to stop
+    blocks = [shared_memory.SharedMemory(name=name) for name in plane_names]
+    stats_block = shared_memory.SharedMemory(name=stats_name)
+    shard_block = shared_memory.SharedMemory(name=shard_stats_name)
+    stats = np.ndarray((farms, len(FARM_FIELDS)), dtype=np.float64, buffer=stats_block.buf)
+    shard_stats = np.ndarray((workers, len(SHARD_FIELDS)), dtype=np.float64, buffer=shard_block.buf)[shard]
+
+    sims = {}
+    for farm, block in zip(farm_ids, blocks):
+        grid = FarmGrid(size, size, *plane_views(block, size))
+        sims[farm] = FarmSimulation(size, grid=grid, seed=seed + farm)
+        publish(stats[farm], sims[farm])
+
+    start = time.perf_counter()
+    stepped = 0
+    running = True
+    while running:
+        owed = int((time.perf_counter() - start) * FPS) + 1 - stepped
+        if owed > MAX_CATCH_UP:
+            # Too far behind to catch up: these farms' clocks slip instead
+            shard_stats[SHARD_DROPPED] += owed - MAX_CATCH_UP
+            start += (owed - MAX_CATCH_UP) / FPS
+            owed = MAX_CATCH_UP
+        if owed > 0:
+            busy = time.perf_counter()
+            for farm, sim in sims.items():
+                row = stats[farm]
+                row[SEQ] += 1
+                sim.step(owed)
+                publish(row, sim)
+                row[SEQ] += 1
+            stepped += owed
+            shard_stats[SHARD_TICKS] += owed
+            shard_stats[SHARD_BUSY] += time.perf_counter() - busy
+
+        # Wait for the next tick, waking early for commands
+        wait = start + stepped / FPS - time.perf_counter()
+        while conn.poll(max(0.0, wait)):
+            running = handle_command(conn, sims, stats)
+            if not running:
+                break
+            wait = start + stepped / FPS - time.perf_counter()
+
+    # Views on shared memory have to go before the blocks can be closed
+    del sims, grid, stats, shard_stats
+    for block in blocks + [stats_block, shard_block]:
+        block.close()
+    conn.close()
+
+
+def publish(row, sim):
+    row[TICKS] = sim.ticks
+    row[GOLD] = sim.gold
+    row[HELPERS] = len(sim.helpers)
+    row[GROWING] = sim.grid.growing
+    row[RIPE] = len(sim.grid.ripe)
+    row[HELPER_HARVESTS] = sim.helper_harvests
+
+
+def handle_command(conn, sims, stats):
+    # Returns False on 'stop'
+    command = conn.recv()
+    if command[0] == 'stop':
+        conn.send(('ok', None))
+        return False
+    if command[0] == 'call':
+        farm, method, args = command[1:]
+        sim = sims[farm]
+        try:
+            if method.startswith('_'):
+                raise AttributeError(f"{method} is private")
+            row = stats[farm]
+            row[SEQ] += 1
+            try:
+                result = getattr(sim, method)(*args)
+            finally:
+                # Even when the method raises, so seq is never left odd
+                publish(row, sim)
+                row[SEQ] += 1
+            conn.send(('ok', result))
+        except Exception as e:
+            conn.send(('error', f"{type(e).__name__}: {e}"))
+    else:
+        conn.send(('error', f"unknown command {command[0]!r}"))
+    return True
+
+
+class FarmShards:
+    def __init__(self, farms, size=GRID_SIZE, workers=None, seed=0):
+        self.farms = farms
+        self.size = size
+        self.workers = max(1, min(farms, workers or os.cpu_count()))
+        self.seed = seed
+        self.processes = []
+        self.conns = []
+
+        # Shared memory: cell planes per farm, then the two stats arrays
+        self.plane_blocks = [shared_memory.SharedMemory(create=True, size=2 * size * size) for _ in range(farms)]
+        self.planes = [plane_views(block, size) for block in self.plane_blocks]
+        self.stats_block = shared_memory.SharedMemory(create=True, size=farms * len(FARM_FIELDS) * 8)
+        self.shard_block = shared_memory.SharedMemory(create=True, size=self.workers * len(SHARD_FIELDS) * 8)
+        self.farm_stats = np.ndarray((farms, len(FARM_FIELDS)), dtype=np.float64, buffer=self.stats_block.buf)
+        self.shard_stats = np.ndarray((self.workers, len(SHARD_FIELDS)), dtype=np.float64,
+                                      buffer=self.shard_block.buf)
+        self.farm_stats[:] = 0
+        self.shard_stats[:] = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def shard_of(self, farm):
+        return farm % self.workers
+
+    def start(self):
+        for shard in range(self.workers):
+            farm_ids = list(range(shard, self.farms, self.workers))
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=run_shard, daemon=True,
+                args=(shard, farm_ids, self.size, self.seed, [self.plane_blocks[farm].name for farm in farm_ids],
+                      self.stats_block.name, self.shard_block.name, self.farms, self.workers, child))
+            process.start()
+            child.close()
+            self.processes.append(process)
+            self.conns.append(parent)
+
+    def call(self, farm, method, *args):
+        # Run a public FarmSimulation method on a farm in its worker and
+        # return the result, e.g. call(3, 'sell_crop', crop)
+        conn = self.conns[self.shard_of(farm)]
+        conn.send(('call', farm, method, args))
+        status, result = conn.recv()
+        if status != 'ok':
+            raise ShardError(result)
+        return result
+
+    def snapshot(self, farm):
+        # (stats row, types, growth) of one farm from between two of its
+        # ticks, copied without stopping its worker
+        row = self.farm_stats[farm]
+        types, growth = self.planes[farm]
+        while True:
+            seq = row[SEQ]
+            if seq % 2 == 0:
+                copy = (row.copy(), types.copy(), growth.copy())
+                if row[SEQ] == seq:
+                    return copy
+            time.sleep(0)
+
+    def summary(self):
+        # Totals across all farms and shards, from the shared stats
+        farm_stats = self.farm_stats.copy()
+        shard_stats = self.shard_stats.copy()
+        return {
+            'farms': self.farms,
+            'workers': self.workers,
+            'ticks': farm_stats[:, TICKS].tolist(),
+            'gold': float(farm_stats[:, GOLD].sum()),
+            'helpers': float(farm_stats[:, HELPERS].sum()),
+            'growing': float(farm_stats[:, GROWING].sum()),
+            'ripe': float(farm_stats[:, RIPE].sum()),
+            'helper_harvests': float(farm_stats[:, HELPER_HARVESTS].sum()),
+            'busy': shard_stats[:, SHARD_BUSY].tolist(),
+            'dropped': float(shard_stats[:, SHARD_DROPPED].sum()),
+        }
+
+    def close(self):
+        for conn in self.conns:
+            try:
+                conn.send(('stop',))
+                conn.recv()
+            except (EOFError, OSError):
+                pass
+        for process in self.processes:
+            process.join(5)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+        self.conns = []
+
+        # Views on shared memory have to go before the blocks can be closed
+        self.planes = []
+        self.farm_stats = self.shard_stats = None
+        for block in self.plane_blocks + [self.stats_block, self.shard_block]:
+            block.close()
+            block.unlink()
+        self.plane_blocks = []
+
+
+def report(shards, last, elapsed):
+    # One stats line: tick rates of the slowest and fastest farms since
+    # the last line, worker load and the farms' totals. last is the
+    # previous summary.
+    summary = shards.summary()
+    rates = (np.array(summary['ticks']) - np.array(last['ticks'])) / elapsed
+    busy = (np.array(summary['busy']) - np.array(last['busy'])) / elapsed
+    print(f"{summary['farms']} farms on {summary['workers']} workers | {rates.min():.1f}-{rates.max():.1f} ticks/s"
+          f" per farm | worker load {busy.mean():.0%} avg {busy.max():.0%} max | dropped {summary['dropped']:.0f}"
+          f" ticks | gold {summary['gold']:.0f}, helpers {summary['helpers']:.0f}, ripe {summary['ripe']:.0f}")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run many independent farms across worker processes.")
+    parser.add_argument('--farms', type=int, default=16)
+    parser.add_argument('--size', type=int, default=GRID_SIZE, help="cells per side of each farm (default 20)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes (default: all cores)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first farm; farm i uses seed + i")
+    parser.add_argument('--seconds', type=float, default=0, help="stop after this long (default: run until Ctrl+C)")
+    parser.add_argument('--planted', action='store_true', help="plant every farm and give each a helper to start")
+    args = parser.parse_args(argv)
+
+    with FarmShards(args.farms, args.size, args.workers, args.seed) as shards:
+        if args.planted:
+            for farm in range(args.farms):
+                shards.call(farm, 'plant_field')
+                shards.call(farm, 'buy_ai_helper')
+        last = shards.summary()
+        started = last_time = time.perf_counter()
+        try:
+            while not args.seconds or time.perf_counter() - started < args.seconds:
+                time.sleep(REPORT_EVERY if not args.seconds else min(REPORT_EVERY, args.seconds))
+                now = time.perf_counter()
+                last = report(shards, last, now - last_time)
+                last_time = now
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()